@@ -0,0 +1,283 @@
+# benchmarks/run.py
+# Times the parts of the game that players actually wait on, and compares
+# them against the stored baseline (benchmarks/baseline.json). Usage:
+#   python benchmarks/run.py                 run everything and flag regressions
+#   python benchmarks/run.py --save          run everything and store the results as the new baseline
+#   python benchmarks/run.py combat_turn     run only the benchmarks named
+#
+# The game-side benchmarks run a main.GameSession's own methods against a
+# scratch save folder holding three late-game characters (everything in the
+# catalog owned, 20 rounds of upgrades), with scripted answers standing in
+# for the keyboard (the same ReplayInput that --replay uses) and the
+# output thrown away. A benchmark is repeated for at least --time seconds
+# and the median time is what's compared; anything slower than the
+# baseline by more than --threshold counts as a regression and makes the
+# exit status 1. Baselines are only comparable on the same machine, so
+# --save one before changing things.
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import argparse
+import platform
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+import dungeon
+import simulate
+from dice import parse
+from policies import AutoPlayer, Efficient, Lookahead
+from pacing import Pacer
+from replay import ReplayInput, ReplayFinished
+from game_data import drop_table, skill_table
+
+baseline_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+# === Late-game saves ===
+def late_game_player(name):
+    player = dungeon.new_player(name)
+    player.update({"level": 40, "xp": 0, "xp_to_next": 4000, "coins": 25000, "skill_points": 10 ** 6})
+    for _ in range(20):
+        for stat in ("max_health", "max_mana", "damage"):
+            dungeon.upgrade_stat(player, stat)
+    player["skill_points"] = 0
+    for skill in skill_table:
+        if skill["name"] not in player["skills"]:
+            dungeon.learn_skill(player, skill)
+    player["inventory"] = [dict(item) for item in drop_table]
+    best = {}
+    for item in player["inventory"]:
+        if item["value"] > best.get(item["type"], {"value": -1})["value"]:
+            best[item["type"]] = item
+    player["equipped"] = list(best.values())
+    main.apply_equipment_bonuses_for(player)
+    player["health"], player["mana"] = player["max_health"], player["max_mana"]
+    return player
+
+def late_game_stats():
+    stats = dungeon.new_run_stats(seed=1)
+    stats.update({"floor": 30, "room": 5, "monster_rotation_index": 7, "turns": 2000, "current_version": main.current_version})
+    return stats
+
+def open_world(directory):
+    """
+    A GameSession on directory, with the three late-game saves written there
+    and the first character loaded like the character menu does.
+    """
+    main.show_odds = False  # timed on its own below
+    game = main.GameSession(directory, pacer=Pacer("instant"))
+    game.open_save_directory(directory)
+    saves = {name: {"player": late_game_player(name), "persistent_stats": late_game_stats()} for name in main.characters}
+    game.party_store.flush_saves(saves)
+    name = main.characters[0]
+    game.save_path = game.character_save_path(name)
+    game.current_save_name = os.path.basename(game.save_path)
+    if not game.load_from_file(game.current_save_name):
+        raise RuntimeError(f"Couldn't load the late-game save for {name}")
+    return game
+
+def fixed_group(game):
+    # The same three monsters every round, so the timings don't depend on the group drawn
+    return dungeon.monster_group(game.persistent_stats["monster_rotation_index"], random.Random(7))
+
+def script(game, *inputs):
+    # What game.ask() answers with until the next script() (ReplayFinished after the last one)
+    game.input_source = ReplayInput(list(inputs))
+
+def scripted(func, *args):
+    try:
+        return func(*args)
+    except ReplayFinished:
+        pass
+
+
+# === Benchmarks ===
+# Each one takes the GameSession and returns setup() -> value, which isn't
+# timed, and op(value), which is
+benchmarks = {}
+
+def benchmark(func):
+    benchmarks[func.__name__] = func
+    return func
+
+@benchmark
+def save_to_file(game):
+    """One turn's save of the active character (a journal entry) and the allies it touched."""
+    def setup():
+        game.player_data["health"] = game.player_data["max_health"] - random.randint(1, 10)
+        game.party_store.get(main.characters[1])["player"]["health"] -= 1
+        game.party_store.mark_dirty(main.characters[1])
+    return setup, lambda _: game.save_to_file()
+
+@benchmark
+def save_compact(game):
+    """A full snapshot of the active character (floor change, exit)."""
+    return (lambda: None), lambda _: game.save_to_file(compact=True)
+
+@benchmark
+def load_from_file(game):
+    """Loading the active character's save, as picking them in the menu does."""
+    return (lambda: None), lambda _: game.load_from_file(game.current_save_name)
+
+@benchmark
+def combat_turn(game):
+    """
+    One attack in combat() with the other two characters fighting alongside:
+    drawing the screen, the turn, and the save with the allies' changes.
+    """
+    def setup():
+        game.player_data["health"] = game.player_data["max_health"]
+        monsters = fixed_group(game)
+        for monster in monsters:
+            monster["health"] = monster["max_health"] = 10 ** 9
+        script(game, *(["1", "1"] if len(monsters) > 1 else ["1"]))  # attack (the first monster)
+        return monsters
+    return setup, lambda monsters: scripted(game.combat, monsters)
+
+@benchmark
+def combat_odds(game):
+    """Solving the odds shown on the combat screen, the first turn of a fight."""
+    def setup():
+        game.player_data["health"] = game.player_data["max_health"]
+        game.encounters.clear()  # a fresh solve, not the one remembered from the last round
+        return fixed_group(game)
+    return setup, lambda monsters: game.combat_odds(game.player_data, monsters)
+
+@benchmark
+def generate_monster_group(game):
+    """Picking the monsters for a room."""
+    return (lambda: None), lambda _: game.generate_monster_group()
+
+@benchmark
+def inventory_menu(game):
+    """One pass of the party inventory menu over everything the three characters own."""
+    return (lambda: script(game, "exit")), lambda _: game.open_inventory_menu()
+
+@benchmark
+def roll_dice(game):
+    """Rolling 2000d6 (damage dice get that big late in a run)."""
+    dice = parse("2000d6")
+    rng = random.Random(1)
+    return (lambda: None), lambda _: dice.roll(rng)
+
+@benchmark
+def efficient_decision(game):
+    """One combat decision by the efficient policy, the priciest of those kept under 100 us."""
+    policy = Efficient()
+    return (lambda: game.combat_state(game.player_data, fixed_group(game))), lambda state: policy.combat_action(state, random)
+
+@benchmark
+def lookahead_decision(game):
+    """One combat decision by the lookahead policy (the "auto" command's), with every skill known."""
+    policy = Lookahead()
+    return (lambda: game.combat_state(game.player_data, fixed_group(game))), lambda state: policy.combat_action(state, random)
+
+@benchmark
+def headless_floor(game):
+    """A whole floor played by simulate.py with the basic policy, 10 rooms and the boss."""
+    policy = AutoPlayer()
+    return (lambda: simulate.new_run(1)), lambda run: simulate.play_floor(run, policy)
+
+
+# === Running ===
+def measure(setup, op, seconds, min_rounds=5):
+    """
+    Times op(setup()) until seconds have gone by (and at least min_rounds
+    times), with the game's output thrown away. Returns the times in seconds.
+    """
+    times = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        deadline = time.perf_counter() + seconds
+        while len(times) < min_rounds or time.perf_counter() < deadline:
+            value = setup()
+            start = time.perf_counter()
+            op(value)
+            times.append(time.perf_counter() - start)
+    return times
+
+def run(names, seconds):
+    results = {}
+    game = None
+    scratch = tempfile.mkdtemp(prefix="eyum-bench-")
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            game = open_world(scratch)
+        for name in names:
+            times = sorted(measure(*benchmarks[name](game), seconds))
+            results[name] = {
+                "median_us": round(times[len(times) // 2] * 1e6, 2),
+                "min_us": round(times[0] * 1e6, 2),
+                "p95_us": round(times[min(len(times) - 1, int(0.95 * len(times)))] * 1e6, 2),
+                "rounds": len(times),
+            }
+    finally:
+        if game is not None and game.party_store.database is not None:
+            game.party_store.database.close()
+        shutil.rmtree(scratch, ignore_errors=True)
+    return results
+
+def machine():
+    return {"python": platform.python_version(), "platform": platform.platform(), "processor": platform.machine()}
+
+def report(results, baseline, threshold):
+    """
+    Prints each result next to its baseline and returns the names of the
+    ones more than threshold (a fraction) slower.
+    """
+    old = baseline.get("results", {}) if baseline else {}
+    if baseline and baseline.get("machine") != machine():
+        print("Note: the baseline was recorded on a different machine or Python, so the changes aren't comparable.\n")
+    print(f"  {'benchmark':<24}{'median us':>12}{'p95 us':>12}{'rounds':>8}{'baseline':>12}{'change':>9}")
+    regressions = []
+    for name, result in results.items():
+        line = f"  {name:<24}{result['median_us']:>12.1f}{result['p95_us']:>12.1f}{result['rounds']:>8}"
+        if name in old:
+            change = result["median_us"] / old[name]["median_us"] - 1
+            line += f"{old[name]['median_us']:>12.1f}{change * 100:>+8.0f}%"
+            if change > threshold:
+                regressions.append(name)
+                line += "  SLOWER"
+        print(line)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the game's hot paths and compare them against a stored baseline.")
+    parser.add_argument("names", nargs="*", metavar="benchmark", help=f"benchmarks to run (default: all of {', '.join(benchmarks)})")
+    parser.add_argument("--time", type=float, default=0.5, help="seconds to repeat each benchmark for")
+    parser.add_argument("--threshold", type=float, default=0.25, help="how much slower than the baseline is a regression (0.25 = 25%%)")
+    parser.add_argument("--baseline", default=baseline_path, help="baseline file to compare against or --save to")
+    parser.add_argument("--save", action="store_true", help="store these results as the baseline instead of comparing")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in benchmarks]
+    if unknown:
+        parser.error(f"unknown benchmark {', '.join(unknown)} (choose from {', '.join(benchmarks)})")
+
+    results = run(args.names or list(benchmarks), args.time)
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = report(results, None if args.save else baseline, args.threshold)
+
+    if args.save:
+        # Merge so that saving a few benchmarks keeps the others' baselines
+        merged = dict(baseline.get("results", {})) if baseline else {}
+        merged.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump({"machine": machine(), "results": merged}, f, indent=2)
+            f.write("\n")
+        print(f"\nSaved the baseline to {args.baseline}")
+    elif baseline is None:
+        print(f"\nNo baseline at {args.baseline} yet, store one with --save")
+    elif regressions:
+        print(f"\n{len(regressions)} slower than the baseline by more than {args.threshold * 100:.0f}%: {', '.join(regressions)}")
+        sys.exit(1)
+    else:
+        print("\nNo regressions")
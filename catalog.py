@@ -0,0 +1,189 @@
+# catalog.py
+# Indexes over game_data, built once when the content is loaded (and
+# cached with it, see content.py), so lookups by name, item type or rarity
+# are dict lookups instead of scans over the tables.
+#
+# Every item, skill and monster gets an integer ID (its position in its
+# table), and what a character owns is a bitset of those IDs: bit i of the
+# item bitset is set if drop_table[i] is in the inventory. Checking one
+# entry or "owns everything" is then a single integer operation. A
+# character's inventory and skills are OwnedLists (see track()), which keep
+# their bitset up to date as entries are added and removed, so nothing
+# extra goes in the saves. A plain list still works, it's just counted
+# every time it's asked about.
+from game_data import drop_table, skill_table, monster_list, content
+from content import build_indexes
+
+
+class Catalog:
+    """
+    item_ids, skill_ids, monster_ids     name: ID
+    items_by_type                        type: IDs of the items of that type
+    items_by_rarity, skills_by_rarity    weight: IDs with that weight
+    all_items, all_skills                bitsets with every ID set
+    """
+
+    def __init__(self, items, skills, monsters, indexes=None):
+        self.items = items
+        self.skills = skills
+        self.monsters = monsters
+        # The game's own catalog gets its indexes from the content cache
+        indexes = indexes or build_indexes(items, skills, monsters)
+        self.item_ids = indexes["item_ids"]
+        self.skill_ids = indexes["skill_ids"]
+        self.monster_ids = indexes["monster_ids"]
+        self.items_by_type = indexes["items_by_type"]
+        self.items_by_rarity = indexes["items_by_rarity"]
+        self.skills_by_rarity = indexes["skills_by_rarity"]
+        self.all_items = (1 << len(items)) - 1
+        self.all_skills = (1 << len(skills)) - 1
+
+    # === Lookups ===
+    def item(self, name):
+        i = self.item_ids.get(name)
+        return None if i is None else self.items[i]
+
+    def skill(self, name):
+        i = self.skill_ids.get(name)
+        return None if i is None else self.skills[i]
+
+    def monster(self, name):
+        i = self.monster_ids.get(name)
+        return None if i is None else self.monsters[i]
+
+    def items_of_type(self, item_type):
+        return [self.items[i] for i in self.items_by_type.get(item_type, ())]
+
+    # === Ownership ===
+    def owned_items(self, inventory):
+        """
+        Bitset of the catalog items in an inventory (a list of item dicts).
+        Items that aren't in drop_table are left out.
+        """
+        if isinstance(inventory, OwnedList) and inventory.kind == "items":
+            return inventory.bits
+        return OwnedList(inventory, "items").bits
+
+    def owned_skills(self, skills):
+        # Bitset of the catalog skills in a list of skill names
+        if isinstance(skills, OwnedList) and skills.kind == "skills":
+            return skills.bits
+        return OwnedList(skills, "skills").bits
+
+    def track(self, player):
+        """
+        Turns a player dict's inventory and skills into OwnedLists, so their
+        bitsets are kept instead of counted on every check. Call it where the
+        player is created or loaded, before anything holds on to the lists.
+        """
+        for key, kind in (("inventory", "items"), ("skills", "skills")):
+            entries = player.get(key)
+            if isinstance(entries, list) and not isinstance(entries, OwnedList):
+                player[key] = OwnedList(entries, kind)
+        return player
+
+    def owns_item(self, inventory, name):
+        i = self.item_ids.get(name)
+        return i is not None and self.owned_items(inventory) >> i & 1 == 1
+
+    def owns_skill(self, skills, name):
+        i = self.skill_ids.get(name)
+        return i is not None and self.owned_skills(skills) >> i & 1 == 1
+
+
+class OwnedList(list):
+    """
+    A list of item dicts (kind "items") or skill names (kind "skills") that
+    keeps the catalog bitset of what's in it (bits) up to date as it
+    changes. Counts per ID keep a bit set while any copy of the entry is
+    left. Otherwise it's an ordinary list, and saves the same way.
+    """
+
+    def __init__(self, entries=(), kind="items"):
+        super().__init__()
+        self.kind = kind
+        self.counts = {}
+        self.bits = 0
+        self.extend(entries)
+
+    def __reduce__(self):
+        # Copies and pickles rebuild the counts from the entries
+        return OwnedList, (list(self), self.kind)
+
+    def id_of(self, entry):
+        if self.kind == "items":
+            return catalog.item_ids.get(entry.get("name")) if isinstance(entry, dict) else None
+        return catalog.skill_ids.get(entry) if isinstance(entry, str) else None
+
+    def added(self, entry):
+        i = self.id_of(entry)
+        if i is not None:
+            self.counts[i] = self.counts.get(i, 0) + 1
+            self.bits |= 1 << i
+
+    def removed(self, entry):
+        i = self.id_of(entry)
+        if i is not None:
+            self.counts[i] -= 1
+            if not self.counts[i]:
+                del self.counts[i]
+                self.bits &= ~(1 << i)
+
+    def recount(self):
+        self.counts = {}
+        self.bits = 0
+        for entry in self:
+            self.added(entry)
+
+    def append(self, entry):
+        super().append(entry)
+        self.added(entry)
+
+    def extend(self, entries):
+        for entry in entries:
+            self.append(entry)
+
+    def __iadd__(self, entries):
+        self.extend(entries)
+        return self
+
+    def insert(self, index, entry):
+        super().insert(index, entry)
+        self.added(entry)
+
+    def remove(self, entry):
+        super().remove(entry)
+        self.removed(entry)
+
+    def pop(self, index=-1):
+        entry = super().pop(index)
+        self.removed(entry)
+        return entry
+
+    def clear(self):
+        super().clear()
+        self.recount()
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self.recount()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self.recount()
+
+    def __imul__(self, n):
+        super().__imul__(n)
+        self.recount()
+        return self
+
+
+def bit_indices(bits):
+    # The IDs set in a bitset, lowest first
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+catalog = Catalog(drop_table, skill_table, monster_list, content["indexes"])
@@ -0,0 +1,46 @@
+# colors.py
+# The color codes the game prints, under the same names colorama uses
+# (Fore.RED, Style.RESET_ALL, ...). Importing colorama also loads its
+# Windows console wrapper, which took longer than the rest of the game's
+# startup and isn't needed on terminals that understand the codes, so
+# they're defined here and colorama is only loaded on Windows (see
+# fix_windows_console()).
+import os
+
+
+class Fore:
+    BLACK = "\x1b[30m"
+    RED = "\x1b[31m"
+    GREEN = "\x1b[32m"
+    YELLOW = "\x1b[33m"
+    BLUE = "\x1b[34m"
+    MAGENTA = "\x1b[35m"
+    CYAN = "\x1b[36m"
+    WHITE = "\x1b[37m"
+    RESET = "\x1b[39m"
+    LIGHTBLACK_EX = "\x1b[90m"
+    LIGHTRED_EX = "\x1b[91m"
+    LIGHTGREEN_EX = "\x1b[92m"
+    LIGHTYELLOW_EX = "\x1b[93m"
+    LIGHTBLUE_EX = "\x1b[94m"
+    LIGHTMAGENTA_EX = "\x1b[95m"
+    LIGHTCYAN_EX = "\x1b[96m"
+    LIGHTWHITE_EX = "\x1b[97m"
+
+
+class Style:
+    BRIGHT = "\x1b[1m"
+    DIM = "\x1b[2m"
+    NORMAL = "\x1b[22m"
+    RESET_ALL = "\x1b[0m"
+
+
+def fix_windows_console():
+    # Consoles older than Windows 10 don't understand the codes, colorama translates them there
+    if os.name != "nt":
+        return
+    try:
+        import colorama
+        colorama.just_fix_windows_console()
+    except (ImportError, AttributeError):
+        pass  # no colorama (or one older than 0.4.6): the codes are printed as they are
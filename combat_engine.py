@@ -0,0 +1,286 @@
+# combat_engine.py
+# The combat rules with no input(), print() or sleeping, so fights can run
+# headless. main.GameSession.combat() is the terminal driver on top of this.
+#
+#   state, events = resolve_turn(state, {"type": "attack", "target": 0}, rng)
+#
+# rng is anything with the random module's interface (random itself, or a
+# random.Random). Events are plain dicts describing what happened, in order.
+from dice import parse, dice
+
+# === State ===
+def make_state(player, monsters, allies, roster, floor):
+    """
+    Builds a combat state.
+    player: the active character's player dict
+    monsters: list of monster dicts (name, health, damage, max_health)
+    allies: the other characters that have a save, as dicts with
+            name, level, health, max_health and is_dead
+    roster: every character name, in the order allies act and get healed
+    """
+    return {
+        "player": dict(player),
+        "allies": [dict(a) for a in allies],
+        "roster": list(roster),
+        "monsters": [dict(m) for m in monsters],
+        "floor": floor,
+        "outcome": None,  # "won", "died" or "fled" once the fight is over
+    }
+
+def copy_state(state):
+    new = dict(state)
+    new["player"] = dict(state["player"])
+    new["allies"] = [dict(a) for a in state["allies"]]
+    new["monsters"] = [dict(m) for m in state["monsters"]]
+    return new
+
+def alive_targets(state):
+    return [i for i, m in enumerate(state["monsters"]) if m["health"] > 0]
+
+def is_over(state):
+    return state["outcome"] is not None
+
+
+# === Dice ===
+def basic_attack_damage(damage, rng):
+    dmg = dice(damage, 2).roll(rng)  # Roll a bunch of d2's
+    return int(dmg * rng.uniform(0.9, 1.2))  # then randomize it even more!
+
+
+# === Turn Resolution ===
+def resolve_turn(state, action, rng):
+    """
+    Plays one player action plus everything that follows it (ally idle
+    effects, the enemy turn, rewards) and returns (new_state, events).
+    The given state is left untouched.
+
+    Actions:
+      {"type": "attack", "target": monster index}
+      {"type": "skill", "index": skill index, "target": monster index (single-hit skills)}
+      {"type": "retreat"}
+
+    An invalid action returns the state unchanged with a single "invalid" event.
+    """
+    problem = check_action(state, action)
+    if problem:
+        return state, [{"type": "invalid", "reason": problem}]
+
+    kind = action["type"]
+    state = copy_state(state)
+    events = []
+    if kind == "attack":
+        basic_attack(state, action["target"], rng, events)
+        ally_idle_effects(state, rng, events)
+    elif kind == "skill":
+        use_skill(state, action["index"], action.get("target"), rng, events)
+    else:
+        if rng.random() < 0.75:
+            events.append({"type": "fled"})
+            state["outcome"] = "fled"
+            return state, events
+        events.append({"type": "retreat_failed"})
+
+    enemy_turn(state, events)
+    finish_turn(state, rng, events)
+    return state, events
+
+def check_action(state, action):
+    """
+    Why action can't be played in state, or None if it can.
+    """
+    if is_over(state):
+        return "The fight is already over."
+    kind = action.get("type")
+    if kind == "attack":
+        return check_target(state, action.get("target"))
+    if kind == "skill":
+        return check_skill(state, action)
+    if kind == "retreat":
+        return None
+    return f"Unknown action '{kind}'."
+
+def check_target(state, target):
+    if target not in alive_targets(state):
+        return "Invalid target."
+    return None
+
+def check_skill(state, action):
+    player = state["player"]
+    skills = player.get("skills", [])
+    idx = action.get("index")
+    if not skills:
+        return "No skills available."
+    if not isinstance(idx, int) or idx < 0 or idx >= len(skills):
+        return "Invalid skill."
+    if player["mana"] < player["skill_data"]["mana_costs"][idx]:
+        return "Not enough mana."
+    if not alive_targets(state):
+        return "No valid targets."
+    if player["skill_data"]["attacks"][idx] == 1:
+        return check_target(state, action.get("target"))
+    return None
+
+def basic_attack(state, target, rng, events):
+    player = state["player"]
+    m = state["monsters"][target]
+    dmg = basic_attack_damage(player.get("damage", 1), rng)
+    m["health"] -= dmg
+    events.append({"type": "attack", "target": target, "name": m["name"], "amount": dmg})
+    restore_amount = max(1, player["max_mana"] // 10)
+    player["mana"] = min(player["mana"] + restore_amount, player["max_mana"])
+
+def use_skill(state, idx, target, rng, events):
+    player = state["player"]
+    sd = player["skill_data"]
+    skill_name = player["skills"][idx]
+    player["mana"] -= sd["mana_costs"][idx]
+    attacks = sd["attacks"][idx]
+    damage_dice = parse(sd["damage"][idx])
+
+    if attacks == 1:
+        m = state["monsters"][target]
+        dmg = damage_dice.roll(rng)
+        m["health"] -= dmg
+        events.append({"type": "skill_hit", "skill": skill_name, "target": target, "name": m["name"], "amount": dmg})
+    else:
+        for _ in range(attacks):
+            valid_targets = alive_targets(state)
+            if not valid_targets:
+                break
+            target = rng.choice(valid_targets)
+            m = state["monsters"][target]
+            dmg = damage_dice.roll(rng)
+            m["health"] -= dmg
+            events.append({"type": "skill_hit", "skill": skill_name, "target": target, "name": m["name"], "amount": dmg})
+
+    healing = sd["healing"][idx]
+    if healing:
+        heal = dice(healing, 4).roll(rng)
+        pre_heal = player["health"]
+        player["health"] = min(player["health"] + heal, player["max_health"])
+        used = player["health"] - pre_heal
+        overflow = heal - used
+        events.append({"type": "self_heal", "amount": used})
+        if overflow > 0:
+            events.append({"type": "overflow", "amount": overflow})
+            overflow_heal(state, overflow, events)
+
+def overflow_heal(state, overflow, events):
+    # Healing past full HP spills over to the allies in roster order
+    for ally in state["allies"]:
+        if ally["is_dead"]:
+            continue
+        if ally["health"] < ally["max_health"]:
+            healed = min(overflow, ally["max_health"] - ally["health"])
+            ally["health"] += healed
+            overflow -= healed
+            events.append({"type": "overflow_heal", "target": ally["name"], "amount": healed})
+            if overflow <= 0:
+                break
+
+def ally_idle_effects(state, rng, events):
+    """
+    What the characters you're not playing do after your basic attack:
+    Lucian hits every enemy, George hits a random one, Ilana heals everyone.
+    """
+    monsters = state["monsters"]
+    for ally in state["allies"]:
+        if ally["is_dead"]:
+            continue
+        name = ally["name"]
+        level = ally.get("level", 1)
+        if name == "George":
+            targetable = alive_targets(state)
+            if targetable:
+                target = rng.choice(targetable)
+                dmg = dice(level, 4).roll(rng)
+                monsters[target]["health"] -= dmg
+                events.append({"type": "ally_strike", "ally": name, "target": target, "name": monsters[target]["name"], "amount": dmg})
+        elif name == "Lucian":
+            dmg = dice(level, 2).roll(rng)
+            for m in monsters:
+                if m["health"] > 0:
+                    m["health"] -= dmg
+            events.append({"type": "ally_sweep", "ally": name, "amount": dmg})
+        elif name == "Ilana":
+            heal = dice(level, 2).roll(rng)
+            for member in party_in_roster_order(state):
+                if member.get("is_dead"):
+                    continue
+                old = member["health"]
+                member["health"] = min(member["max_health"], member["health"] + heal)
+                healed = member["health"] - old
+                if healed > 0:
+                    events.append({"type": "ally_heal", "ally": name, "target": member_name(state, member), "amount": healed})
+
+def party_in_roster_order(state):
+    by_name = {a["name"]: a for a in state["allies"]}
+    by_name[state["player"]["character"]] = state["player"]
+    return [by_name[name] for name in state["roster"] if name in by_name]
+
+def member_name(state, member):
+    return member["character"] if member is state["player"] else member["name"]
+
+def enemy_turn(state, events):
+    player = state["player"]
+    for m in state["monsters"]:
+        if m["health"] > 0:
+            player["health"] -= m["damage"]
+            events.append({"type": "monster_hit", "name": m["name"], "amount": m["damage"]})
+
+def finish_turn(state, rng, events):
+    if state["player"]["health"] <= 0:
+        state["outcome"] = "died"
+    elif not alive_targets(state):
+        state["outcome"] = "won"
+        events.extend(grant_rewards(state, rng))
+
+
+# === Rewards ===
+def grant_rewards(state, rng):
+    """
+    Adds the coins and XP for a beaten monster group to the player and
+    returns the events for it.
+    """
+    player = state["player"]
+    monsters = state["monsters"]
+    min_reward = 5 + state["floor"]  # e.g. floor 3 = min 8 coins
+    coin_total = sum((m["damage"] + m["health"] // 2) for m in monsters)
+    coin_reward = max(min_reward, int(rng.uniform(0.75, 1.25) * coin_total))
+    player["coins"] += coin_reward
+    events = [{"type": "coins", "amount": coin_reward}]
+    xp_total = sum((m["damage"] * 2 + 2) for m in monsters)
+    events.extend(apply_xp(player, int(xp_total * 1.5), state["floor"]))
+    return events
+
+def apply_xp(player, amount, floor):
+    """
+    Adds XP to a player dict in place, levelling up as many times as it
+    covers, and returns the events for it.
+    """
+    events = [{"type": "xp", "amount": amount}]
+    player["xp"] += amount
+
+    while player["xp"] >= player["xp_to_next"]:
+        player["xp"] -= player["xp_to_next"]
+        player["level"] += 1
+
+        earned_points = max(1, floor)  # guarantees at least 1
+        player["skill_points"] += earned_points
+
+        player["xp_to_next"] = int(player["xp_to_next"] * 1.5)
+
+        # Scale and restore mana and health
+        player["max_mana"] = int(player["max_mana"] * 1.2)
+        player["mana"] = player["max_mana"]
+
+        player["max_health"] = int(player["max_health"] * 1.1)
+        player["health"] = player["max_health"]
+
+        player["base_stats"] = {
+            "damage": player["damage"],
+            "max_health": player["max_health"],
+            "max_mana": player["max_mana"],
+        }
+        events.append({"type": "level_up", "level": player["level"], "points": earned_points, "total": player["skill_points"]})
+    return events
@@ -0,0 +1,381 @@
+# content.py
+# Loads the game's content (items, skills, monsters and each character's
+# starting skills) from the JSON files in content/, plus any mods in
+# eyum/mods/, and checks every entry against the schemas below.
+#
+# A mod is a .json file holding any of "items", "skills" and "monsters",
+# each a list of entries just like the ones in content/. Mod entries come
+# after the built-in ones (mods in file name order) and can't reuse a name.
+#
+# Parsing and checking thousands of entries takes a while, so the checked
+# tables and the catalog indexes are cached in eyum/cache/content.cache,
+# keyed by a hash of every source file. Startups that find a cache with
+# the same hash just load it; changing, adding or removing any file
+# builds it again.
+#
+#   python content.py check    check the content and mods, and list what was loaded
+#   python content.py bench    time a cold load against a cached one, with generated mods
+import os
+import sys
+import json
+import time
+import marshal
+import hashlib
+import argparse
+
+from dice import parse as parse_dice
+
+content_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "content")
+mods_directory = "eyum/mods"
+cache_path = "eyum/cache/content.cache"
+
+CACHE_MAGIC = b"EYCC"
+CACHE_VERSION = 2
+digest_size = 20
+
+item_types = ("weapon", "armor", "magic", "relic", "potion")
+bonus_stats = ("damage", "max_health", "max_mana")
+character_lists = ("skills", "damage", "attacks", "healing", "mana_costs")
+
+
+class ContentError(ValueError):
+    """
+    Raised when a content file can't be read or an entry doesn't fit its
+    schema. The message lists every problem found, one per line.
+    """
+
+
+# === Schemas ===
+# Each check returns what's wrong with a value, or None if it's fine
+def is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def positive(value):
+    return None if is_int(value) and value > 0 else "must be a whole number above 0"
+
+def non_negative(value):
+    return None if is_int(value) and value >= 0 else "must be a whole number, 0 or more"
+
+def text(value):
+    return None if isinstance(value, str) and value.strip() else "must be a non-empty string"
+
+def flag(value):
+    return None if isinstance(value, bool) else "must be true or false"
+
+def dice_text(value):
+    # Compiled the same way combat will, so anything that passes here can be rolled
+    if not isinstance(value, str) or not value.strip():
+        return "must be a dice expression like \"2d6\", \"1d4+1\" or \"0\""
+    try:
+        parse_dice(value)
+    except ValueError as e:
+        return f"must be a dice expression like \"2d6\", \"1d4+1\" or \"0\" ({e})"
+    return None
+
+def item_type(value):
+    return None if value in item_types else f"must be one of {', '.join(item_types)}"
+
+def bonus(value):
+    if not isinstance(value, dict):
+        return "must be an object"
+    for stat, amount in value.items():
+        if stat not in bonus_stats:
+            return f"has unknown stat '{stat}' (use {', '.join(bonus_stats)})"
+        if not is_int(amount):
+            return f"'{stat}' must be a whole number"
+    return None
+
+# field: (check, required)
+schemas = {
+    "items": {
+        "name": (text, True),
+        "type": (item_type, True),
+        "bonus": (bonus, False),
+        "restore_full": (flag, False),
+        "value": (non_negative, True),
+        "weight": (positive, True),
+    },
+    "skills": {
+        "name": (text, True),
+        "damage": (dice_text, True),
+        "attacks": (non_negative, True),
+        "healing": (non_negative, True),
+        "mana_cost": (non_negative, True),
+        "weight": (positive, True),
+    },
+    "monsters": {
+        "name": (text, True),
+        "health": (positive, True),
+        "damage": (non_negative, True),
+    },
+}
+character_checks = {"skills": text, "damage": dice_text, "attacks": non_negative,
+                    "healing": non_negative, "mana_costs": non_negative}
+
+
+def check_entries(table, entries, source, names, errors):
+    if not isinstance(entries, list):
+        errors.append(f"{source}: '{table}' must be a list")
+        return
+    schema = schemas[table]
+    for n, entry in enumerate(entries, 1):
+        where = f"{source}: {table} #{n}"
+        if not isinstance(entry, dict):
+            errors.append(f"{where} must be an object")
+            continue
+        if isinstance(entry.get("name"), str):
+            where += f" ({entry['name']})"
+        for field, (check, required) in schema.items():
+            if field not in entry:
+                if required:
+                    errors.append(f"{where}: missing '{field}'")
+                continue
+            problem = check(entry[field])
+            if problem:
+                errors.append(f"{where}: '{field}' {problem}")
+        for field in entry:
+            if field not in schema:
+                errors.append(f"{where}: unknown field '{field}'")
+        name = entry.get("name")
+        if isinstance(name, str):
+            if name in names:
+                errors.append(f"{where}: the name is already used by {names[name]}")
+            else:
+                names[name] = source
+
+def check_characters(characters, source, errors):
+    if not isinstance(characters, dict) or not characters:
+        errors.append(f"{source} must be an object with at least one character")
+        return
+    for name, character in characters.items():
+        where = f"{source}: {name}"
+        if not isinstance(character, dict):
+            errors.append(f"{where} must be an object")
+            continue
+        for field in character:
+            if field not in character_checks:
+                errors.append(f"{where}: unknown field '{field}'")
+        lengths = set()
+        for field, check in character_checks.items():
+            values = character.get(field)
+            if not isinstance(values, list):
+                errors.append(f"{where}: '{field}' must be a list")
+                continue
+            lengths.add(len(values))
+            for value in values:
+                problem = check(value)
+                if problem:
+                    errors.append(f"{where}: '{field}' entry {value!r} {problem}")
+        if len(lengths) > 1:
+            errors.append(f"{where}: {', '.join(character_lists)} must all be the same length")
+
+
+# === Indexes ===
+def build_indexes(items, skills, monsters):
+    """
+    The name, type and rarity indexes the catalog uses (see catalog.py).
+    """
+    return {
+        "item_ids": {item["name"]: i for i, item in enumerate(items)},
+        "skill_ids": {skill["name"]: i for i, skill in enumerate(skills)},
+        "monster_ids": {monster["name"]: i for i, monster in enumerate(monsters)},
+        "items_by_type": group_ids(items, "type"),
+        "items_by_rarity": group_ids(items, "weight"),
+        "skills_by_rarity": group_ids(skills, "weight"),
+    }
+
+def group_ids(entries, key):
+    groups = {}
+    for i, entry in enumerate(entries):
+        groups.setdefault(entry[key], []).append(i)
+    return {value: tuple(ids) for value, ids in groups.items()}
+
+
+# === Loading ===
+def source_files(directory, mods):
+    # (label, path) for every file the content comes from, in load order
+    files = [(f"content/{name}", os.path.join(directory, name))
+             for name in ("items.json", "skills.json", "monsters.json", "characters.json")]
+    if mods and os.path.isdir(mods):
+        for name in sorted(os.listdir(mods)):
+            if name.endswith(".json"):
+                files.append((f"mods/{name}", os.path.join(mods, name)))
+    return files
+
+def read_sources(files):
+    sources = []
+    for label, path in files:
+        try:
+            with open(path, "rb") as f:
+                sources.append((label, f.read()))
+        except OSError as e:
+            raise ContentError(f"{label}: {e.strerror or e}")
+    return sources
+
+def sources_digest(sources):
+    # marshal's format can change between Python versions, so they don't share caches
+    h = hashlib.blake2b(digest_size=digest_size)
+    h.update(f"{CACHE_VERSION}:{sys.version_info[:2]}".encode("ascii"))
+    for label, raw in sources:
+        h.update(label.encode("utf-8") + b"\0" + len(raw).to_bytes(8, "little"))
+        h.update(raw)
+    return h.digest()
+
+def parse(label, raw):
+    try:
+        return json.loads(raw.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ContentError(f"{label}: not valid JSON ({e})")
+
+def build(sources):
+    """
+    Parses and checks the sources, returning the content dict that gets
+    cached: items, skills, monsters, characters and indexes.
+    """
+    parsed = [(label, parse(label, raw)) for label, raw in sources]
+    tables = {"items": [], "skills": [], "monsters": []}
+    names = {table: {} for table in tables}
+    errors = []
+    characters = None
+    for label, data in parsed:
+        if label == "content/characters.json":
+            check_characters(data, label, errors)
+            characters = data
+        elif label.startswith("content/"):
+            table = label[len("content/"):-len(".json")]
+            check_entries(table, data, label, names[table], errors)
+            if isinstance(data, list):
+                tables[table].extend(data)
+        else:
+            if not isinstance(data, dict):
+                errors.append(f"{label} must be an object with \"items\", \"skills\" and/or \"monsters\"")
+                continue
+            for key in data:
+                if key not in tables:
+                    errors.append(f"{label}: unknown section '{key}'")
+            for table in tables:
+                if table in data:
+                    check_entries(table, data[table], label, names[table], errors)
+                    if isinstance(data[table], list):
+                        tables[table].extend(data[table])
+    if errors:
+        raise ContentError("\n".join(errors))
+    for table, entries in tables.items():
+        if not entries:
+            raise ContentError(f"There are no {table}")
+    return {
+        "items": tables["items"],
+        "skills": tables["skills"],
+        "monsters": tables["monsters"],
+        "characters": characters,
+        "indexes": build_indexes(tables["items"], tables["skills"], tables["monsters"]),
+    }
+
+def read_cache(path, digest):
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except OSError:
+        return None
+    header = CACHE_MAGIC + bytes([CACHE_VERSION]) + digest
+    if not raw.startswith(header):
+        return None
+    try:
+        return marshal.loads(raw[len(header):])
+    except (EOFError, ValueError, TypeError):
+        return None  # damaged, so it's just built again
+
+def write_cache(path, digest, content):
+    # Written to a temporary file first so a crash never leaves half a cache
+    try:
+        folder = os.path.dirname(path) or "."
+        if not os.path.isdir(folder):
+            # Only made inside an existing game folder, so importing the game from elsewhere leaves nothing behind
+            os.mkdir(folder)
+        temp = path + ".tmp"
+        with open(temp, "wb") as f:
+            f.write(CACHE_MAGIC + bytes([CACHE_VERSION]) + digest)
+            f.write(marshal.dumps(content))
+        os.replace(temp, path)
+    except OSError:
+        pass  # no cache this time (read-only folder, say), the next start just checks everything again
+
+def load_content(directory=content_directory, mods=mods_directory, cache=cache_path):
+    """
+    The checked content, from the cache when the sources haven't changed.
+    Raises ContentError if a file is missing or anything fails its schema.
+    Pass cache=None to always build it.
+    """
+    sources = read_sources(source_files(directory, mods))
+    digest = sources_digest(sources)
+    if cache:
+        content = read_cache(cache, digest)
+        if content is not None:
+            return content
+    content = build(sources)
+    if cache:
+        write_cache(cache, digest, content)
+    return content
+
+
+# === Command line ===
+def check(mods):
+    try:
+        content = load_content(mods=mods, cache=None)
+    except ContentError as e:
+        print(e)
+        return False
+    mod_count = len(source_files(content_directory, mods)) - 4
+    print(f"{len(content['items'])} items, {len(content['skills'])} skills, {len(content['monsters'])} monsters, "
+          f"{len(content['characters'])} characters ({mod_count} mods)")
+    return True
+
+def generated_mod(entries):
+    return {
+        "items": [{"name": f"Mod Item {i}", "type": item_types[i % len(item_types)],
+                   "bonus": {"damage": i % 7}, "value": 10 + i % 90, "weight": 1 + i % 10} for i in range(entries)],
+        "skills": [{"name": f"Mod Skill {i}", "damage": f"{1 + i % 3}d{4 + 2 * (i % 4)}", "attacks": 1 + i % 3,
+                    "healing": i % 2, "mana_cost": 2 + i % 12, "weight": 1 + i % 10} for i in range(entries)],
+        "monsters": [{"name": f"Mod Monster {i}", "health": 10 + i, "damage": 2 + i // 10} for i in range(entries)],
+    }
+
+def bench(entries, rounds):
+    import shutil
+    import tempfile
+    scratch = tempfile.mkdtemp(prefix="eyum-content-")
+    try:
+        mods = os.path.join(scratch, "mods")
+        cache = os.path.join(scratch, "content.cache")
+        print(f"{'mod entries':<14}{'cold ms':>10}{'warm ms':>10}{'cache KB':>10}")
+        for count in sorted({0, entries // 10, entries}):
+            shutil.rmtree(mods, ignore_errors=True)
+            os.makedirs(mods)
+            if count:
+                with open(os.path.join(mods, "generated.json"), "w", encoding="utf-8") as f:
+                    json.dump(generated_mod(count), f)
+            cold = warm = 0.0
+            for _ in range(rounds):
+                if os.path.exists(cache):
+                    os.remove(cache)
+                start = time.perf_counter()
+                load_content(mods=mods, cache=cache)
+                cold += time.perf_counter() - start
+                start = time.perf_counter()
+                load_content(mods=mods, cache=cache)
+                warm += time.perf_counter() - start
+            size = os.path.getsize(cache) / 1024
+            print(f"{count * 3:<14}{cold / rounds * 1000:>10.2f}{warm / rounds * 1000:>10.2f}{size:>10.0f}")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check Eyum's content files or time loading them.")
+    parser.add_argument("command", choices=["check", "bench"])
+    parser.add_argument("--mods", default=mods_directory, help="folder of mod files to load with the built-in content")
+    parser.add_argument("--entries", type=int, default=5000, help="items, skills and monsters each in the generated mod (bench)")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    if args.command == "check":
+        sys.exit(0 if check(args.mods) else 1)
+    bench(args.entries, args.rounds)
@@ -0,0 +1,122 @@
+# damage_tables.py
+# Exact damage distributions, worked out by convolution instead of sampling.
+# Each table is a {damage: probability} dict, computed the first time it's
+# asked for and cached after that (so don't modify the dicts you get back).
+#
+#   python damage_tables.py            every skill in game_data
+#   python damage_tables.py --basic 12 the basic attack at 12 damage
+import argparse
+from functools import lru_cache
+
+from dice import parse, sum_distribution
+from game_data import skill_table, character_skills
+
+
+def convolve(a, b):
+    # Distribution of the sum of two independent amounts
+    out = {}
+    for x, px in a.items():
+        for y, py in b.items():
+            out[x + y] = out.get(x + y, 0.0) + px * py
+    return out
+
+@lru_cache(maxsize=None)
+def dice_pmf(text):
+    """
+    Distribution of one roll of a dice expression ("2d8", "1d4+1", "0").
+    """
+    d = parse(text)
+    if d.count == 0:
+        return {d.modifier: 1.0}
+    low = d.count + d.modifier
+    return {low + i: p for i, p in enumerate(sum_distribution(d.count, d.sides)) if p > 0}
+
+@lru_cache(maxsize=None)
+def skill_pmf(damage, attacks):
+    """
+    Total damage of a skill use: attacks independent rolls of damage. Multi-hit
+    skills spread their hits over random targets, so this is the damage dealt
+    to the whole group (ignoring overkill on monsters that die mid-skill).
+    Upgrades change damage and attacks, so each upgrade level gets its own table.
+    """
+    if attacks <= 0:
+        return {0: 1.0}
+    if attacks == 1:
+        return dice_pmf(damage)
+    half = skill_pmf(damage, attacks // 2)
+    total = convolve(half, half)
+    if attacks % 2:
+        total = convolve(total, dice_pmf(damage))
+    return total
+
+@lru_cache(maxsize=None)
+def healing_pmf(healing):
+    # Healing skills heal {healing}d4
+    return dice_pmf(f"{healing}d4") if healing else {0: 1.0}
+
+@lru_cache(maxsize=None)
+def basic_attack_pmf(damage):
+    """
+    The basic attack: damage d2's, times a uniform 0.9-1.2 multiplier, rounded down.
+    """
+    out = {}
+    for offset, p_sum in enumerate(sum_distribution(damage, 2) if damage > 0 else [1.0]):
+        total = damage + offset if damage > 0 else 0
+        if total == 0:
+            out[0] = out.get(0, 0.0) + p_sum
+            continue
+        # int(total * u) == k for u in [k / total, (k + 1) / total), u uniform over [0.9, 1.2)
+        for k in range(int(total * 0.9), int(total * 1.2) + 1):
+            low = max(0.9, k / total)
+            high = min(1.2, (k + 1) / total)
+            if high > low:
+                out[k] = out.get(k, 0.0) + p_sum * (high - low) / 0.3
+    return out
+
+
+# === Summaries ===
+def mean(pmf):
+    return sum(x * p for x, p in pmf.items())
+
+def chance_at_least(pmf, amount):
+    return sum(p for x, p in pmf.items() if x >= amount)
+
+def percentile(pmf, q):
+    total = 0.0
+    for x in sorted(pmf):
+        total += pmf[x]
+        if total >= q / 100:
+            return x
+    return max(pmf)
+
+def skill_expected_damage(skill_data, idx):
+    return mean(skill_pmf(skill_data["damage"][idx], skill_data["attacks"][idx]))
+
+def all_skills():
+    """
+    (name, damage, attacks, healing) for every skill in the shop table and the
+    characters' starting skills.
+    """
+    rows = [(s["name"], s["damage"], s["attacks"], s["healing"]) for s in skill_table]
+    for data in character_skills.values():
+        rows.extend(zip(data["skills"], data["damage"], data["attacks"], data["healing"]))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print exact damage distributions.")
+    parser.add_argument("--basic", type=int, metavar="DAMAGE", help="show the basic attack at this damage stat instead")
+    args = parser.parse_args()
+
+    if args.basic is not None:
+        pmf = basic_attack_pmf(args.basic)
+        print(f"Basic attack at {args.basic} damage: mean {mean(pmf):.2f}")
+        for x in sorted(pmf):
+            print(f"  {x:>5} {100 * pmf[x]:6.2f}%  {'#' * round(200 * pmf[x])}")
+    else:
+        print(f"{'skill':<18}{'dice':>7}{'hits':>5}{'min':>6}{'p10':>6}{'mean':>8}{'p90':>6}{'max':>6}{'heal':>7}")
+        for name, damage, attacks, healing in all_skills():
+            pmf = skill_pmf(damage, attacks)
+            heal = mean(healing_pmf(healing))
+            print(f"{name:<18}{damage:>7}{attacks:>5}{min(pmf):>6}{percentile(pmf, 10):>6}"
+                  f"{mean(pmf):>8.2f}{percentile(pmf, 90):>6}{max(pmf):>6}{heal:>7.1f}")
@@ -0,0 +1,319 @@
+# dungeon.py
+# The run rules outside of combat: new characters, monster groups and bosses,
+# which room comes next, treasure, the shop and skill point upgrades.
+# Nothing here prints, reads input or touches the saves; anything random
+# takes an rng (the random module, or a random.Random) so runs can be
+# replayed and simulated.
+from functools import lru_cache
+
+from game_data import drop_table, skill_table, monster_list, character_skills
+from catalog import catalog
+from samplers import AliasTable, WeightedPool
+
+item_pool = WeightedPool(drop_table)
+skill_pool = WeightedPool(skill_table)
+
+upgrade_stats = ("max_health", "max_mana", "damage")
+
+
+# === Characters ===
+def new_player(name):
+    """
+    A fresh level 1 player dict for one of the characters in character_skills.
+    """
+    base_stats = {
+        "max_health": 25,
+        "health": 25,
+        "mana": 7,
+        "max_mana": 7,
+        "damage": 1,
+    }
+
+    # Apply character-specific bonuses
+    if name == "Lucian":
+        base_stats["mana"] += 3
+        base_stats["max_mana"] += 3
+    elif name == "Ilana":
+        base_stats["health"] += 5
+        base_stats["max_health"] += 5
+    elif name == "George":
+        base_stats["damage"] += 1
+
+    base = character_skills[name]
+    player = {
+        "character": name,
+        "level": 1,
+        "coins": 0,
+        "xp": 0,
+        "xp_to_next": 10,
+        "skill_points": 0,
+        "skills": list(base["skills"]),
+        "skill_data": {
+            "damage": list(base["damage"]),
+            "attacks": list(base["attacks"]),
+            "healing": list(base["healing"]),
+            "mana_costs": list(base["mana_costs"]),
+        },
+        "learned_skills": {},
+        "inventory": [],
+        "equipped": [],
+    }
+    player["base_stats"] = base_stats.copy()
+    player.update(base_stats)
+    return catalog.track(player)
+
+def new_run_stats(seed=None):
+    return {
+        "seed": seed,  # what rng_streams derives the run's random streams from
+        "turns": 0,  # combat turns so far, which is where the combat stream is in the run
+        "is_dead": False,
+        "floor": 1,
+        "room": 1,
+        "current_monsters": None,
+        "rooms_since_shop": 0,
+        "rooms_since_treasure": 0,
+        "monster_rotation_index": 0,
+    }
+
+
+# === Monsters ===
+@lru_cache(maxsize=None)
+def monster_pool(rotation_index):
+    """
+    (monsters, AliasTable) for the monsters that can show up at this
+    rotation: the next 3 in monster_list, weakest most often.
+    """
+    pool = monster_list[rotation_index:rotation_index + 3]
+    weights = [10, 7, 3][:len(pool)]  # Favors weakest in current pool
+    return pool, AliasTable(weights)
+
+def monster_group(rotation_index, rng):
+    pool, table = monster_pool(rotation_index)
+
+    group = [pool[table.sample(rng)].copy()]
+    if rng.random() < 0.30:
+        group.append(pool[table.sample(rng)].copy())
+        if rng.random() < 0.15:
+            group.append(pool[table.sample(rng)].copy())
+            if rng.random() < 0.10:
+                group.append(pool[table.sample(rng)].copy())
+                if rng.random() < 0.05:
+                    group.append(pool[table.sample(rng)].copy())
+
+    for m in group:
+        m["max_health"] = m["health"]
+
+    return group
+
+def boss_template(rotation_index):
+    # The monster right above the current pool guards the floor
+    return monster_list[min(rotation_index + 3, len(monster_list) - 1)]
+
+def boss_group(rotation_index):
+    boss = boss_template(rotation_index).copy()
+    boss["max_health"] = boss["health"]
+    return [boss]
+
+def next_rotation(rotation_index):
+    # Shift the pool up by one monster after each boss, until the list runs out
+    if rotation_index + 3 < len(monster_list):
+        return rotation_index + 1
+    return rotation_index
+
+
+# === Rooms ===
+def room_kind(stats, coins, rng):
+    """
+    Decides what the next room is: "shop", "treasure" or "fight".
+    """
+    guaranteed_shop = stats.get("rooms_since_shop", 0) >= 10
+    guaranteed_treasure = stats.get("rooms_since_treasure", 0) >= 20
+
+    rand = rng.random()
+    shop_trigger = rand < 0.10 or guaranteed_shop
+    treasure_trigger = rand < 0.15 or guaranteed_treasure
+
+    if shop_trigger and coins > 0:
+        return "shop"
+    elif treasure_trigger:
+        return "treasure"
+    return "fight"
+
+def unique_items(owned, count, rng):
+    # Up to count different items not in owned (a catalog bitset), rarer items (lower weight) less often
+    return item_pool.sample(owned, count, rng)
+
+def unique_skill(owned, rng):
+    return skill_pool.choice(owned, rng)
+
+def has_all_items(player):
+    return catalog.owned_items(player["inventory"]) == catalog.all_items
+
+def has_all_skills(player):
+    return catalog.owned_skills(player["skills"]) == catalog.all_skills
+
+def learn_skill(player, skill):
+    player["skills"].append(skill["name"])
+    if "skill_upgrade_costs" not in player:
+        player["skill_upgrade_costs"] = []
+    player["skill_upgrade_costs"].append(1)
+    sd = player["skill_data"]
+    sd.setdefault("damage", []).append(skill["damage"])
+    sd.setdefault("attacks", []).append(skill["attacks"])
+    sd.setdefault("healing", []).append(skill["healing"])
+    sd.setdefault("mana_costs", []).append(skill["mana_cost"])
+
+def open_treasure(player, rng):
+    """
+    Rolls and hands out a treasure room. Returns (coins, item, skill, already_known):
+    item/skill are None when none was found, already_known is True when the
+    skill roll hit but every skill is already learned.
+    """
+    coin_reward = rng.randint(40, 80)
+    player["coins"] += coin_reward
+
+    # 25% chance of item
+    item = None
+    if rng.random() < 0.25:
+        found = unique_items(catalog.owned_items(player["inventory"]), 1, rng)
+        if found:
+            item = found[0]
+            player["inventory"].append(item)
+
+    # 10% chance of skill
+    skill = None
+    already_known = False
+    if rng.random() < 0.10:
+        skill = unique_skill(catalog.owned_skills(player["skills"]), rng)
+        if skill:
+            learn_skill(player, skill)
+        else:
+            already_known = True
+
+    return coin_reward, item, skill, already_known
+
+
+# === Shop ===
+def shop_stock(player, rng):
+    """
+    Returns (items, skill_offer) for a shop visit, or None when the merchant
+    has nothing new (every item and skill already owned).
+    """
+    owned_items = catalog.owned_items(player["inventory"])
+    owned_skills = catalog.owned_skills(player["skills"])
+    all_items_owned = owned_items == catalog.all_items
+    all_skills_owned = owned_skills == catalog.all_skills
+    if all_items_owned and all_skills_owned:
+        return None
+
+    items = unique_items(owned_items, 3, rng) if not all_items_owned else []
+    # Force a skill to show if any are left
+    skill_offer = unique_skill(owned_skills, rng) if not all_skills_owned else None
+    return items, skill_offer
+
+def floor_multiplier(floor):
+    return 1 + (floor - 1) * 0.1  # 10% more per floor
+
+def skill_base_price(skill):
+    return 20 + (10 - skill["weight"]) * 3
+
+def buy_item(player, item):
+    # Items are charged their base value
+    if player["coins"] < item["value"]:
+        return False
+    player["coins"] -= item["value"]
+    player["inventory"].append(item)
+    return True
+
+def buy_skill(player, skill):
+    price = skill_base_price(skill)
+    if player["coins"] < price or catalog.owns_skill(player["skills"], skill["name"]):
+        return False
+    player["coins"] -= price
+    learn_skill(player, skill)
+    return True
+
+
+# === Upgrades ===
+def ensure_upgrade_costs(player):
+    # initialize upgrade cost trackers if not present
+    if "upgrade_costs" not in player:
+        player["upgrade_costs"] = {
+            "max_health": 1,
+            "max_mana": 1,
+            "damage": 1
+        }
+    if "skill_upgrade_costs" not in player:
+        player["skill_upgrade_costs"] = [1 for _ in player["skills"]]
+    # Ensure skill_upgrade_costs list is the same length as skills
+    if len(player["skill_upgrade_costs"]) < len(player["skills"]):
+        missing = len(player["skills"]) - len(player["skill_upgrade_costs"])
+        player["skill_upgrade_costs"].extend([1] * missing)
+
+def save_base_stats(player):
+    player["base_stats"] = {
+        "damage": player["damage"],
+        "max_health": player["max_health"],
+        "max_mana": player["max_mana"]
+    }
+
+def upgrade_stat(player, stat):
+    """
+    Spends skill points on +5 max health, +2 mana (+3 max) or +1 damage.
+    Returns False if there aren't enough points.
+    """
+    ensure_upgrade_costs(player)
+    cost = player["upgrade_costs"][stat]
+    if player["skill_points"] < cost:
+        return False
+    if stat == "max_health":
+        player["max_health"] += 5
+        player["health"] += 5
+    elif stat == "max_mana":
+        player["max_mana"] += 3
+        player["mana"] += 2
+    else:
+        player["damage"] += 1
+    player["skill_points"] -= cost
+    save_base_stats(player)
+    player["upgrade_costs"][stat] = max(int(cost * 1.2), cost + 1)
+    return True
+
+def upgrade_skill(player, idx):
+    """
+    Bumps a 1dX skill to 1d(X+2) with one more hit. Returns None on success,
+    or why it couldn't be done.
+    """
+    ensure_upgrade_costs(player)
+    cost = player["skill_upgrade_costs"][idx]
+    if player["skill_points"] < cost:
+        return f"Not enough points (cost: {cost})"
+
+    dmg_str = player["skill_data"]["damage"][idx]
+    if not dmg_str.startswith("1d"):
+        return "Unsupported Format."
+
+    new_die = int(dmg_str[2:]) + 2
+    player["skill_data"]["damage"][idx] = f"1d{new_die}"
+    player["skill_data"]["attacks"][idx] += 1
+    player["skill_points"] -= cost
+    save_base_stats(player)
+    player["skill_upgrade_costs"][idx] = max(cost * 2, cost + 1)
+    return None
+
+def xp_heal_cost(player, floor):
+    min_cost = (floor + 1) * 10
+    return max(min_cost, int(player["xp"] * 0.25))
+
+def xp_heal(player, floor):
+    """
+    Trades 25% of XP (at least (floor + 1) * 10) for 10% HP. Returns the
+    (xp_cost, heal_amount) spent, or None if there isn't enough XP.
+    """
+    xp_cost = xp_heal_cost(player, floor)
+    if player["xp"] < xp_cost:
+        return None
+    heal_amount = max(1, int(player["max_health"] * 0.1))
+    player["xp"] -= xp_cost
+    player["health"] = min(player["health"] + heal_amount, player["max_health"])
+    return xp_cost, heal_amount
@@ -0,0 +1,399 @@
+# encounter_solver.py
+# Works out the odds of a fight exactly (up to HP rounding) instead of
+# playing it thousands of times: chance to win or die, and the expected
+# turns, HP lost, coins and XP.
+#
+# The player is assumed to basic-attack the weakest monster every turn,
+# with the allies' idle effects after each attack, the same turn order as
+# combat_engine. HP is counted in buckets (at most `buckets` per character,
+# fewer per monster in big groups) so even 200,000 HP bosses and five-monster
+# groups only have a few thousand states, and identical monsters are
+# interchangeable so their HPs are kept sorted. Dead monsters all share one
+# state; how far past 0 HP they were hit (which lowers the coin reward) is
+# carried along as a mean and spread instead.
+#
+#   python encounter_solver.py --health 40 --damage 3 --monsters Slime,Goblin
+#   python encounter_solver.py --health 400 --damage 60 --boss 12
+import time
+import math
+import argparse
+from functools import lru_cache
+
+import dungeon
+from dice import dice
+from damage_tables import basic_attack_pmf, dice_pmf
+from catalog import catalog
+
+exact_attack_limit = 64  # above this damage stat the basic attack is treated as normally distributed
+coin_spread_points = [z / 4 for z in range(-12, 13)]  # standard deviations sampled when averaging coin rewards
+monster_state_budget = 1500  # bigger groups get coarser buckets per monster to stay under this many HP combinations
+
+
+# === Quantizing ===
+def to_units(pmf, unit):
+    """
+    Rescales a {amount: probability} table into HP buckets of size unit, splitting
+    each amount between the two nearest buckets so the mean stays exact.
+    """
+    out = {}
+    for amount, p in pmf.items():
+        low, frac = divmod(amount, unit)
+        low = int(low)
+        frac = frac / unit
+        if frac:
+            out[low + 1] = out.get(low + 1, 0.0) + p * frac
+        out[low] = out.get(low, 0.0) + p * (1 - frac)
+    return out
+
+def normal_pmf(mean, deviation, low, high):
+    # A normal curve over the integers low..high, for sums too big to tabulate exactly
+    if deviation <= 0:
+        return {round(mean): 1.0}
+    cdf = lambda x: 0.5 * math.erfc(-(x - mean) / (deviation * math.sqrt(2)))
+    start = max(low, int(mean - 6 * deviation))
+    stop = min(high, int(mean + 6 * deviation) + 1)
+    pmf = {x: cdf(x + 0.5) - cdf(x - 0.5) for x in range(start, stop + 1)}
+    total = sum(pmf.values())
+    return {x: p / total for x, p in pmf.items() if p > 0}
+
+@lru_cache(maxsize=256)
+def attack_pmf(damage):
+    if damage <= exact_attack_limit:
+        return basic_attack_pmf(damage)
+    # damage d2's have mean 1.5 * damage and variance damage / 4; the multiplier adds the rest
+    sum_mean, sum_var = 1.5 * damage, damage / 4
+    u_mean, u_var = 1.05, 0.3 ** 2 / 12
+    mean = sum_mean * u_mean - 0.5  # int() rounds down half a point on average
+    var = sum_var * (u_var + u_mean ** 2) + sum_mean ** 2 * u_var
+    return normal_pmf(mean, math.sqrt(var), int(damage * 0.9), int(2 * damage * 1.2))
+
+@lru_cache(maxsize=256)
+def dice_units(count, sides, unit):
+    d = dice(count, sides)
+    if count <= exact_attack_limit:
+        return to_units(dice_pmf(str(d)), unit)
+    return to_units(normal_pmf(d.mean, d.deviation, d.minimum, d.maximum), unit)
+
+
+# === Solver ===
+class Encounter:
+    """
+    One fight set up for solving: the player's HP and damage, the monsters and
+    which allies are alive. solve() runs the Markov chain forward turn by turn
+    until (almost) all of the probability has ended in a win or a death.
+    """
+
+    def __init__(self, player, monsters, allies=(), floor=1, buckets=48, budget=monster_state_budget):
+        self.player = player
+        self.stats = (player["max_health"], player.get("damage", 1))  # what the tables below were built for
+        self.monsters = [dict(m) for m in monsters]
+        self.allies = [(a["name"], a.get("level", 1)) for a in allies if not a.get("is_dead")]
+        self.floor = floor
+
+        self.player_unit = max(1, math.ceil(player["max_health"] / buckets))
+        per_monster = max(3, min(buckets, int(budget ** (1 / max(1, len(monsters))))))
+        self.monster_units = [max(1, math.ceil(m["max_health"] / per_monster)) for m in monsters]
+        self.max_player = player["max_health"] // self.player_unit
+        # Identical monsters are interchangeable, so states only differ by which HPs they hold, not who holds them
+        kinds = {}
+        for i, m in enumerate(self.monsters):
+            kinds.setdefault((m["max_health"], m["damage"]), []).append(i)
+        self.twins = [group for group in kinds.values() if len(group) > 1]
+        self.attack = [to_units(attack_pmf(player.get("damage", 1)), unit) for unit in self.monster_units]
+        self.hits = {}
+        self.transitions = {}
+        self.monster_transitions = {}
+        self.deltas = {}
+        self.player_transitions = {}
+        self.results = {}
+
+    def start(self):
+        return self.state_of(self.player, self.monsters)
+
+    def state_of(self, player, monsters):
+        # HP rounded up to whole buckets
+        php = -(-player["health"] // self.player_unit)
+        mhps = tuple(-(-m["health"] // unit) if m["health"] > 0 else 0
+                     for m, unit in zip(monsters, self.monster_units))
+        return php, self.canonical(mhps)
+
+    def canonical(self, mhps):
+        if not self.twins:
+            return mhps
+        mhps = list(mhps)
+        for group in self.twins:
+            for i, hp in zip(group, sorted(mhps[i] for i in group)):
+                mhps[i] = hp
+        return tuple(mhps)
+
+    def step(self, state):
+        """
+        {next state: (probability, probability * coins lost, probability * coins lost²)} after one full turn
+        from state. The monsters' side of the turn (attack, George, Lucian)
+        doesn't depend on the player's HP and the player's side (Ilana, the
+        enemy turn) only on which monsters are left, so both halves are
+        worked out separately and cached.
+        """
+        cached = self.transitions.get(state)
+        if cached is not None:
+            return cached
+        php, mhps = state
+        out = {}
+        for hps, (p, first, second) in self.monster_step(mhps).items():
+            for hp, q in self.player_step(php, tuple(hp > 0 for hp in hps)).items():
+                out[(hp, hps)] = (p * q, first * q, second * q)
+        self.transitions[state] = out
+        return out
+
+    def monster_step(self, mhps):
+        cached = self.monster_transitions.get(mhps)
+        if cached is not None:
+            return cached
+
+        # Player attacks the weakest monster
+        alive = [i for i, hp in enumerate(mhps) if hp > 0]
+        target = min(alive, key=lambda i: (mhps[i] * self.monster_units[i], i))
+        dist = {}
+        for dmg, p in self.attack[target].items():
+            new = list(mhps)
+            new[target] -= dmg
+            key = tuple(new)
+            dist[key] = dist.get(key, 0.0) + p
+
+        # Allies act in roster order
+        for name, level in self.allies:
+            if name != "Ilana":
+                dist = self.apply_ally(dist, name, level)
+
+        # Monsters that died this turn collapse to 0, remembering the coins their overkill costs
+        out = {}
+        for hps, p in dist.items():
+            lost = sum(self.coins_lost(hp, unit) for hp, unit in zip(hps, self.monster_units) if hp < 0)
+            key = self.canonical(tuple(max(hp, 0) for hp in hps))
+            entry = out.get(key, (0.0, 0.0, 0.0))
+            out[key] = (entry[0] + p, entry[1] + p * lost, entry[2] + p * lost ** 2)
+        self.monster_transitions[mhps] = out
+        return out
+
+    def coins_lost(self, hp, unit):
+        # Coins a monster left at hp buckets (below 0) takes off the reward
+        if unit == 1:
+            return -(hp // 2)
+        # Its true HP could be anywhere in the bucket, (unit - 1) / 2 further down on
+        # average, and health // 2 rounds odd amounts down another half coin
+        return (-hp * unit + (unit - 1) / 2) / 2 + 0.25
+
+    def apply_ally(self, dist, name, level):
+        out = {}
+        for mhps, p in dist.items():
+            alive = tuple(hp > 0 for hp in mhps)
+            for delta, q in self.ally_deltas(name, level, alive).items():
+                key = tuple(hp - d for hp, d in zip(mhps, delta))
+                out[key] = out.get(key, 0.0) + p * q
+        return out
+
+    def ally_deltas(self, name, level, alive):
+        """
+        {damage to each monster, in buckets: probability} for one ally's idle
+        effect, which only depends on which monsters are still alive.
+        """
+        key = (name, level, alive)
+        cached = self.deltas.get(key)
+        if cached is not None:
+            return cached
+        targets = [i for i, up in enumerate(alive) if up]
+        none = (0,) * len(alive)
+        out = {}
+        if name == "George" and targets:
+            # level d4 on a random monster
+            for i in targets:
+                for dmg, q in dice_units(level, 4, self.monster_units[i]).items():
+                    delta = list(none)
+                    delta[i] = dmg
+                    delta = tuple(delta)
+                    out[delta] = out.get(delta, 0.0) + q / len(targets)
+        elif name == "Lucian" and targets:
+            # level d2 to every monster, one roll for all of them
+            for dmg, q in dice_pmf(f"{level}d2").items():
+                hits = {none: q}
+                for i in targets:
+                    split = to_units({dmg: 1.0}, self.monster_units[i])
+                    next_hits = {}
+                    for delta, r in hits.items():
+                        for d, pd in split.items():
+                            new = list(delta)
+                            new[i] = d
+                            new = tuple(new)
+                            next_hits[new] = next_hits.get(new, 0.0) + r * pd
+                    hits = next_hits
+                for delta, r in hits.items():
+                    out[delta] = out.get(delta, 0.0) + r
+        else:
+            out[none] = 1.0
+        self.deltas[key] = out
+        return out
+
+    def player_step(self, php, alive):
+        key = (php, alive)
+        cached = self.player_transitions.get(key)
+        if cached is not None:
+            return cached
+        dist = {php: 1.0}
+        for name, level in self.allies:
+            if name == "Ilana":
+                # level d2 healing, capped at max HP
+                healed = {}
+                for hp, p in dist.items():
+                    for heal, q in dice_units(level, 2, self.player_unit).items():
+                        new = min(hp + heal, self.max_player)
+                        healed[new] = healed.get(new, 0.0) + p * q
+                dist = healed
+        # Enemy turn: every monster still standing hits the player
+        out = {}
+        for hp, p in dist.items():
+            for d, q in self.enemy_hit(alive).items():
+                new = max(hp - d, 0)
+                out[new] = out.get(new, 0.0) + p * q
+        self.player_transitions[key] = out
+        return out
+
+    def enemy_hit(self, alive):
+        # Monsters always hit for their damage stat, so only the bucket split is random
+        hit = self.hits.get(alive)
+        if hit is None:
+            total = sum(m["damage"] for m, up in zip(self.monsters, alive) if up)
+            hit = self.hits[alive] = to_units({total: 1.0}, self.player_unit)
+        return hit
+
+    def solve(self, start=None, health=None, max_turns=2000, tolerance=1e-9):
+        """
+        Returns a dict with the chance to win, die or still be fighting after
+        max_turns, and the expected turns, HP lost, coins and XP. start is a
+        state from state_of() to solve from partway through the fight, and
+        health the player's actual HP there (HP lost is capped at it); the
+        transitions worked out for earlier calls are reused, and so is the
+        result when the same state is solved again.
+        """
+        if start is None:
+            start = self.start()
+            health = self.player["health"] if health is None else health
+        elif health is None:
+            health = min(start[0] * self.player_unit, self.player["max_health"])
+        key = (start, health, max_turns, tolerance)
+        cached = self.results.get(key)
+        if cached is not None:
+            return dict(cached)
+        start_php = start[0]
+        # state: (probability, probability * coins lost so far, probability * coins lost² so far)
+        dist = {start: (1.0, 0.0, 0.0)}
+        result = {"win": 0.0, "death": 0.0, "unresolved": 0.0, "turns": 0.0,
+                  "hp_lost": 0.0, "coins": 0.0, "xp": 0.0}
+        xp = int(sum((m["damage"] * 2 + 2) for m in self.monsters) * 1.5)
+        turn = 0
+        while dist and turn < max_turns:
+            turn += 1
+            new = {}
+            for state, (p, w1, w2) in dist.items():
+                for nxt, (q, q1, q2) in self.step(state).items():
+                    entry = new.setdefault(nxt, [0.0, 0.0, 0.0])
+                    entry[0] += p * q
+                    entry[1] += w1 * q + p * q1
+                    entry[2] += w2 * q + 2 * w1 * q1 + p * q2
+            dist = {}
+            for (php, mhps), (p, w1, w2) in new.items():
+                if php <= 0:
+                    result["death"] += p
+                    result["turns"] += p * turn
+                    result["hp_lost"] += p * health
+                elif not any(mhps):
+                    result["win"] += p
+                    result["turns"] += p * turn
+                    result["hp_lost"] += p * min(health, max(0, (start_php - php) * self.player_unit))
+                    lost = w1 / p
+                    result["coins"] += p * self.expected_coins(lost, math.sqrt(max(0.0, w2 / p - lost ** 2)))
+                    result["xp"] += p * xp
+                elif p > tolerance:
+                    dist[(php, mhps)] = (p, w1, w2)
+        result["unresolved"] = sum(entry[0] for entry in dist.values())
+        result["states"] = len(self.transitions)
+        self.results[key] = result
+        return dict(result)
+
+    def expected_coins(self, lost, spread):
+        """
+        Overkill lowers the reward (each monster pays damage + health // 2, with
+        health <= 0), and the minimum reward makes the average depend on how
+        much that varies, not just its mean, so it's averaged over a normal curve.
+        """
+        damage = sum(m["damage"] for m in self.monsters)
+        if not spread:
+            return expected_coin_reward(damage - lost, self.floor)
+        total = weights = 0.0
+        for z in coin_spread_points:
+            weight = math.exp(-z * z / 2)
+            total += weight * expected_coin_reward(damage - max(0.0, lost + z * spread), self.floor)
+            weights += weight
+        return total / weights
+
+def expected_coin_reward(coin_total, floor):
+    """
+    Mean of max(5 + floor, int(uniform(0.75, 1.25) * coin_total)).
+    """
+    min_reward = 5 + floor
+    if coin_total <= 0:
+        return min_reward
+    if coin_total * 0.75 > min_reward + 1:
+        return coin_total - 0.5  # int() rounds down half a coin on average
+    mean = 0.0
+    for k in range(int(coin_total * 0.75), int(coin_total * 1.25) + 1):
+        low = max(0.75, k / coin_total)
+        high = min(1.25, (k + 1) / coin_total)
+        if high > low:
+            mean += max(min_reward, k) * (high - low) / 0.5
+    return mean
+
+def solve(player, monsters, allies=(), floor=1, buckets=48, budget=monster_state_budget, max_turns=2000):
+    """
+    Odds for a fight between player (a player dict) and monsters (dicts with
+    health, max_health and damage), with the given allies helping.
+    """
+    return Encounter(player, monsters, allies, floor, buckets, budget).solve(max_turns=max_turns)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve the odds of a fight without simulating it.")
+    parser.add_argument("--health", type=int, default=25, help="player health (also max health)")
+    parser.add_argument("--damage", type=int, default=1, help="player damage stat")
+    parser.add_argument("--monsters", default=None, help="comma-separated monster names")
+    parser.add_argument("--boss", type=int, default=None, metavar="ROTATION", help="the boss at this monster_rotation_index")
+    parser.add_argument("--allies", default="", help="comma-separated name:level, e.g. George:3,Ilana:2")
+    parser.add_argument("--floor", type=int, default=1)
+    parser.add_argument("--buckets", type=int, default=48, help="HP buckets for the player and a lone monster")
+    parser.add_argument("--budget", type=int, default=monster_state_budget, help="HP combinations allowed for a monster group")
+    args = parser.parse_args()
+
+    player = {"health": args.health, "max_health": args.health, "damage": args.damage}
+    if args.boss is not None:
+        monsters = dungeon.boss_group(args.boss)
+    else:
+        monsters = []
+        for name in (args.monsters or "Slime").split(","):
+            template = catalog.monster(name.strip())
+            if template is None:
+                parser.error(f"Unknown monster '{name.strip()}'")
+            m = dict(template)
+            m["max_health"] = m["health"]
+            monsters.append(m)
+    allies = []
+    for entry in filter(None, args.allies.split(",")):
+        name, _, level = entry.partition(":")
+        allies.append({"name": name.strip().capitalize(), "level": int(level or 1)})
+
+    start = time.perf_counter()
+    result = solve(player, monsters, allies, args.floor, args.buckets, args.budget)
+    elapsed = time.perf_counter() - start
+    print("vs " + ", ".join(f"{m['name']} ({m['health']} HP, {m['damage']} dmg)" for m in monsters))
+    print(f"Win {100 * result['win']:.2f}%  Death {100 * result['death']:.2f}%  Unresolved {100 * result['unresolved']:.2f}%")
+    print(f"Expected: {result['turns']:.1f} turns, {result['hp_lost']:.1f} HP lost, "
+          f"{result['coins']:.1f} coins, {result['xp']:.1f} XP")
+    print(f"{result['states']} states in {1000 * elapsed:.1f} ms")
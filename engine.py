@@ -0,0 +1,449 @@
+# engine.py
+# The game as a JSON-lines engine, for other frontends and bots to drive:
+#   python main.py --engine [--seed 1234] < commands.jsonl
+#
+# One JSON command per line comes in on stdin and one JSON object per line
+# goes out on stdout, with no colors, screen clears or pauses. It's the
+# same game as the terminal one (an EngineSession is a main.GameSession
+# with combat(), open_shop(), open_upgrade_menu() and the character menu
+# swapped for commands), using the same saves, so the same choices play
+# out the same way in either.
+#
+# Out:
+#   {"type": "state", "patch": {...}}   changes to the game state, as an RFC 7396
+#                                       merge patch on the last one (the first patch
+#                                       is the whole state, null removes a key)
+#   {"type": "ready", "menu": "combat", "actions": [...]}
+#                                       waiting for a command, one of actions
+#   {"type": "invalid", "reason": "..."}  the last command couldn't be played
+#   {"type": "attack", ...}             what happened, as combat_engine's events
+#                                       and the ones below (treasure, bought, ...)
+#   {"type": "message", "text": "..."}  anything else the game says
+#
+# In (indexes count from 0, like the state's lists):
+#   characters  {"action": "play", "character": "Lucian"}, {"action": "reset", "confirm": true}, {"action": "quit"}
+#   combat      {"action": "attack", "target": 2}, {"action": "skill", "index": 1, "target": 0},
+#               {"action": "retreat"}, {"action": "auto"} (one turn played by main.auto_policy),
+#               {"action": "equip", "item": "Iron Sword", "character": "George"},
+#               {"action": "unequip", "character": "Ilana", "slot": "armor"},
+#               {"action": "upgrade_menu"}, {"action": "exit"}
+#   shop        {"action": "buy", "item": 0}, {"action": "learn"}, {"action": "leave"}
+#   upgrade     {"action": "upgrade", "stat": "damage"}, {"action": "upgrade_skill", "index": 0},
+#               {"action": "heal"}, {"action": "auto"} (spend the points), {"action": "leave"}
+#   any         {"action": "state"} sends the whole state again
+# The engine stops at the end of its input.
+import os
+import re
+import sys
+import json
+
+from main import GameSession, characters, save_directory, reward_events
+from combat_engine import check_action
+from dungeon import (new_player, open_treasure, shop_stock, skill_base_price, buy_item, buy_skill,
+                     upgrade_stats, ensure_upgrade_costs, upgrade_stat, upgrade_skill, xp_heal_cost, xp_heal)
+from pacing import Pacer
+
+color_code = re.compile(r"\x1b\[[0-9;]*m")
+
+menu_actions = {
+    "characters": ["play", "reset", "quit"],
+    "combat": ["attack", "skill", "retreat", "auto", "equip", "unequip", "upgrade_menu", "exit"],
+    "shop": ["buy", "learn", "leave"],
+    "upgrade": ["upgrade", "upgrade_skill", "heal", "auto", "leave"],
+}
+
+
+def merge_patch(old, new):
+    """
+    The RFC 7396 merge patch that turns dict old into dict new ({} if
+    they're the same). Lists are replaced whole.
+    """
+    patch = {key: None for key in old if key not in new}
+    for key, value in new.items():
+        if key not in old:
+            patch[key] = value
+        elif isinstance(value, dict) and isinstance(old[key], dict):
+            inner = merge_patch(old[key], value)
+            if inner:
+                patch[key] = inner
+        elif value != old[key]:
+            patch[key] = value
+    return patch
+
+def item_view(item, price=None):
+    view = {"name": item["name"], "type": item["type"], "bonus": item.get("bonus", {})}
+    if item.get("restore_full"):
+        view["restore_full"] = True
+    if price is not None:
+        view["price"] = price
+    return view
+
+def party_member_view(name, data):
+    player, stats = data["player"], data["persistent_stats"]
+    return {
+        "name": name,
+        "level": player.get("level", 1),
+        "health": player["health"],
+        "max_health": player["max_health"],
+        "is_dead": stats.get("is_dead", False),
+        "inventory": [item["name"] for item in player.get("inventory", [])],
+        "equipped": {item["type"]: item["name"] for item in player.get("equipped", [])},
+    }
+
+
+class Messages:
+    """
+    Stands in for sys.stdout while the engine runs, so whatever the shared
+    game code prints goes out as message lines without its color codes.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.partial = ""
+
+    def write(self, text):
+        *lines, self.partial = (self.partial + text).split("\n")
+        for line in lines:
+            line = color_code.sub("", line).strip()
+            if line:
+                self.session.send({"type": "message", "text": line})
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+class EngineSession(GameSession):
+    """
+    A GameSession that reads JSON commands from commands and writes JSON
+    lines to out (see the top of this file) instead of drawing menus.
+    """
+
+    def __init__(self, save_directory=save_directory, seed=None, commands=None, out=None):
+        super().__init__(save_directory, seed=seed, pacer=Pacer("instant"), turbo=True)
+        self.commands = commands or sys.stdin
+        self.out = out or sys.stdout
+        self.menu = "characters"
+        self.sent = {}  # the state as the frontend has it
+        self.monsters = None  # the fight in progress
+        self.offer = None  # the shop's items and skill while it's open
+
+    # === Output ===
+    def send(self, message):
+        self.out.write(json.dumps(message, separators=(",", ":")) + "\n")
+        self.out.flush()
+
+    def send_events(self, events):
+        for event in events:
+            self.send(event)
+
+    def invalid(self, reason):
+        self.send({"type": "invalid", "reason": reason})
+
+    def state(self):
+        state = {"menu": self.menu}
+        if self.menu == "characters":
+            state["characters"] = {name: self.character_summary(name) for name in characters}
+            return state
+        p = self.player_data
+        floor = self.persistent_stats["floor"]
+        state["floor"] = floor
+        state["room"] = self.persistent_stats["room"]
+        sd = p["skill_data"]
+        state["player"] = {
+            **party_member_view(p["character"], self.get_party_save(p["character"])),
+            "xp": p["xp"],
+            "xp_to_next": p["xp_to_next"],
+            "mana": p["mana"],
+            "max_mana": p["max_mana"],
+            "damage": p["damage"],
+            "coins": p["coins"],
+            "skill_points": p["skill_points"],
+            "skills": [{"name": name, "damage": sd["damage"][i], "attacks": sd["attacks"][i],
+                        "healing": sd["healing"][i], "mana_cost": sd["mana_costs"][i]}
+                       for i, name in enumerate(p["skills"])],
+            "upgrade_costs": dict(p.get("upgrade_costs", {})),
+            "skill_upgrade_costs": list(p.get("skill_upgrade_costs", [])),
+            "xp_heal_cost": xp_heal_cost(p, floor),
+        }
+        state["allies"] = {}
+        for name in characters:
+            data = self.party_store.get(name) if name != p["character"] else None
+            if data is not None:
+                state["allies"][name] = party_member_view(name, data)
+        if self.monsters is not None:
+            state["monsters"] = [{"name": m["name"], "health": m["health"], "max_health": m["max_health"],
+                                  "damage": m["damage"]} for m in self.monsters]
+        if self.menu == "shop":
+            state["shop"] = self.offer
+        return state
+
+    def character_summary(self, name):
+        summary = self.party_store.summary(name)  # from the save index, like the terminal menu
+        if summary is None:
+            new = new_player(name)
+            return {"new": True, "level": 1, "floor": 1, "health": new["health"], "max_health": new["max_health"], "is_dead": False}
+        if summary.get("corrupt"):
+            return {"corrupt": True}
+        return {key: summary[key] for key in ("level", "floor", "health", "max_health", "is_dead")}
+
+    # === Input ===
+    def command(self, menu):
+        """
+        Sends what changed, then waits for a command that menu has. Returns
+        it as a dict.
+        """
+        self.menu = menu
+        actions = menu_actions[menu]
+        while True:
+            state = self.state()
+            patch = merge_patch(self.sent, state)
+            if patch:
+                self.send({"type": "state", "patch": patch})
+            self.sent = state
+            self.send({"type": "ready", "menu": menu, "actions": actions})
+
+            line = self.commands.readline()
+            if not line:
+                raise EOFError()
+            if not line.strip():
+                continue
+            try:
+                command = json.loads(line)
+            except ValueError:
+                self.invalid("Commands are one JSON object per line.")
+                continue
+            action = command.get("action") if isinstance(command, dict) else None
+            if action == "state":
+                self.sent = {}
+            elif action not in actions:
+                self.invalid(f"Can't '{action}' here, expected one of {', '.join(actions)}.")
+            else:
+                return command
+
+    def ask(self, prompt=""):
+        raise RuntimeError(f"The engine has no text prompts (asked {color_code.sub('', prompt)!r})")
+
+    def pause(self, event):
+        pass
+
+    def press_enter(self):
+        pass
+
+    def clear_screen(self):
+        pass
+
+    # === Menus ===
+    def startup(self):
+        while True:
+            command = self.command("characters")
+            action = command["action"]
+            if action == "quit":
+                return "exit"
+            if action == "reset":
+                if command.get("confirm") is not True:
+                    self.invalid('Resetting deletes every save, send {"action": "reset", "confirm": true} to do it.')
+                    continue
+                self.reset_game_state()
+                self.send({"type": "reset"})
+                continue
+            name = command.get("character")
+            if name not in characters:
+                self.invalid(f"Unknown character, choose from {', '.join(characters)}.")
+                continue
+            # The others fight alongside whoever is picked, so everyone needs a save by now
+            self.create_missing_saves()
+            self.save_path = self.character_save_path(name)
+            self.current_save_name = os.path.basename(self.save_path)
+            if not self.load_from_file(self.current_save_name):
+                self.invalid("Failed to load.")
+                continue
+            if self.persistent_stats.get("is_dead", False):
+                self.invalid("Character is dead, reset to play again (this resets every character).")
+                continue
+            return None
+
+    def combat(self, monsters):
+        self.monsters = monsters
+        try:
+            return self.fight(monsters)
+        finally:
+            self.monsters = None
+
+    def fight(self, monsters):
+        outcome = None
+        rewards = []
+        while self.player_data["health"] > 0 and any(m["health"] > 0 for m in monsters):
+            command = self.command("combat")
+            action = command["action"]
+            if action in ("attack", "skill", "retreat", "auto"):
+                state = self.combat_state(self.player_data, monsters)
+                if action == "auto":
+                    turn = self.auto().combat_action(state, self.rng("combat", "auto"))
+                    self.send({"type": "auto", "action": turn})
+                else:
+                    turn = {"type": action}
+                    turn.update({key: command[key] for key in ("target", "index") if key in command})
+                problem = check_action(state, turn)
+                if problem:
+                    self.invalid(problem)
+                    continue
+                outcome, events = self.take_turn(monsters, turn)
+                rewards = [e for e in events if e["type"] in reward_events]
+                self.send_events([e for e in events if e["type"] not in reward_events])
+                if outcome == "fled":
+                    return True
+            elif action == "equip":
+                self.equip(command)
+            elif action == "unequip":
+                self.unequip(command)
+            elif action == "upgrade_menu":
+                self.open_upgrade_menu()
+            else:
+                self.save_to_file(compact=True)
+                return "exit"
+
+        rewards = self.end_combat(monsters, outcome, rewards)
+        if rewards is None:
+            self.send({"type": "died"})
+            return False
+        self.send_events(rewards)
+        return True
+
+    def equip(self, command):
+        name, target = command.get("item"), command.get("character")
+        if target not in characters:
+            self.invalid(f"Unknown character, choose from {', '.join(characters)}.")
+            return
+        for owner in characters:
+            data = self.get_party_save(owner)
+            if data is None:
+                continue
+            equipped = {item["name"] for item in data["player"].get("equipped", [])}
+            for item in data["player"].get("inventory", []):
+                if item["name"] == name and name not in equipped:
+                    self.equip_item(item, target)
+                    self.send({"type": "equipped", "item": name, "character": target})
+                    return
+        self.invalid(f"Nobody has an unequipped {name}.")
+
+    def unequip(self, command):
+        name, slot = command.get("character"), command.get("slot")
+        data = self.get_party_save(name) if name in characters else None
+        if data is None or not any(item["type"] == slot for item in data["player"].get("equipped", [])):
+            self.invalid(f"{name} has nothing equipped as {slot}.")
+            return
+        self.unequip_item(name, slot)
+        self.send({"type": "unequipped", "character": name, "slot": slot})
+
+    def open_treasure_room(self):
+        self.persistent_stats["rooms_since_treasure"] = 0
+        coins, item, skill, already_known = open_treasure(self.player_data, self.rng("loot"))
+        event = {"type": "treasure", "coins": coins}
+        if item:
+            event["item"] = item_view(item)
+        if skill:
+            event["skill"] = skill["name"]
+        elif already_known:
+            event["already_known"] = True
+        self.save_to_file()
+        self.send(event)
+
+    def open_shop(self):
+        self.persistent_stats["rooms_since_shop"] = 0
+        stock = shop_stock(self.player_data, self.rng("loot"))
+        if stock is None:
+            self.send({"type": "message", "text": "The merchant has nothing new to offer you."})
+            return
+        items, skill_offer = stock
+        # Prices are what buying charges (the terminal shows them with the floor multiplier)
+        self.offer = {"items": [item_view(item, item["value"]) for item in items]}
+        if skill_offer:
+            self.offer["skill"] = {key: skill_offer[key] for key in ("name", "damage", "attacks", "healing", "mana_cost")}
+            self.offer["skill"]["price"] = skill_base_price(skill_offer)
+        try:
+            while True:
+                command = self.command("shop")
+                action = command["action"]
+                if action == "leave":
+                    return
+                if action == "learn":
+                    if not skill_offer:
+                        self.invalid("No skill for sale.")
+                    elif self.player_data["coins"] < skill_base_price(skill_offer):
+                        self.invalid("Not enough coins.")
+                    elif not buy_skill(self.player_data, skill_offer):
+                        self.invalid("You already know that skill.")
+                    else:
+                        self.save_to_file()
+                        self.send({"type": "learned", "skill": skill_offer["name"]})
+                        return  # one purchase per shop
+                    continue
+                idx = command.get("item")
+                if not isinstance(idx, int) or not 0 <= idx < len(items):
+                    self.invalid("Invalid choice.")
+                elif not buy_item(self.player_data, items[idx]):
+                    self.invalid("Not enough coins.")
+                else:
+                    self.save_to_file()
+                    self.send({"type": "bought", "item": items[idx]["name"]})
+                    return  # one purchase per shop
+        finally:
+            self.offer = None
+
+    def open_upgrade_menu(self):
+        ensure_upgrade_costs(self.player_data)
+        while True:
+            command = self.command("upgrade")
+            action = command["action"]
+            if action == "leave":
+                return
+            if action == "upgrade":
+                stat = command.get("stat")
+                if stat not in upgrade_stats:
+                    self.invalid(f"Unknown stat, choose from {', '.join(upgrade_stats)}.")
+                elif not upgrade_stat(self.player_data, stat):
+                    self.invalid(f"Not enough points (cost: {self.player_data['upgrade_costs'][stat]})")
+                else:
+                    self.send({"type": "upgraded", "stat": stat})
+            elif action == "auto":
+                points = self.player_data["skill_points"]
+                self.auto().spend_points(self.player_data, self.rng("rooms", "auto"))
+                self.send({"type": "auto_upgraded", "points": points - self.player_data["skill_points"]})
+            elif action == "upgrade_skill":
+                idx = command.get("index")
+                if not isinstance(idx, int) or not 0 <= idx < len(self.player_data["skills"]):
+                    self.invalid("Invalid skill.")
+                    continue
+                problem = upgrade_skill(self.player_data, idx)
+                if problem:
+                    self.invalid(problem)
+                else:
+                    self.send({"type": "skill_upgraded", "skill": self.player_data["skills"][idx]})
+            else:
+                floor = self.persistent_stats.get("floor", 1)
+                if self.player_data["health"] >= self.player_data["max_health"]:
+                    self.invalid("You're already at full health.")
+                    continue
+                healed = xp_heal(self.player_data, floor)
+                if healed is None:
+                    self.invalid(f"Not enough XP. Heal costs {xp_heal_cost(self.player_data, floor)} XP.")
+                else:
+                    self.send({"type": "healed", "xp_cost": healed[0], "amount": healed[1]})
+
+
+def run(seed=None, commands=None, out=None, save_directory=save_directory):
+    """
+    Plays an EngineSession until its commands run out or it's told to quit.
+    """
+    session = EngineSession(save_directory, seed=seed, commands=commands, out=out)
+    terminal = sys.stdout
+    sys.stdout = Messages(session)
+    try:
+        session.play()
+    except EOFError:
+        pass
+    finally:
+        sys.stdout = terminal
+        if session.party_store is not None and session.party_store.database is not None:
+            session.party_store.database.close()
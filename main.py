@@ -1,77 +1,52 @@
 # === Imports ===
-import random
-import time
-from colorama import Fore, Style
-import os
 import sys
-import platform
-import json
+startup_timer = None
+if "--startup-profile" in sys.argv:
+    # Started before anything else is imported, so the imports get timed too
+    from startup_profile import StartupProfile
+    startup_timer = StartupProfile()
+    startup_timer.install()
 
-from game_data import drop_table, skill_table, monster_list
+import time
+import os
+import shutil
+import argparse
+
+from colors import Fore, Style, fix_windows_console
+from game_data import character_skills
+from catalog import catalog
+from party_store import PartyStore
+from save_binary import binary_extension
+from save_journal import SaveJournal, read_save, write_snapshot, find_save_path
+from combat_engine import make_state, resolve_turn, check_action, grant_rewards, apply_xp
+from damage_tables import skill_expected_damage, healing_pmf, mean
+from encounter_solver import Encounter
+from rng_streams import RngStreams, new_seed
+from pacing import Pacer, profiles, default_profile
+from policies import load_policy
+from replay import Recorder, ReplayInput, ReplayFinished, read_replay, snapshot, restore, compare, auto_stop
+from screen import Screen, supports_ansi
+from dungeon import (new_player, monster_group, boss_group, next_rotation, room_kind, open_treasure,
+                     shop_stock, floor_multiplier, skill_base_price, buy_item, buy_skill,
+                     upgrade_stats, ensure_upgrade_costs, upgrade_stat, upgrade_skill, xp_heal_cost, xp_heal)
+if startup_timer is not None:
+    startup_timer.mark("imports")
 
 # === Constants and Globals ===
 current_version = "0.1"
 save_directory = "eyum/saves"
-os.makedirs(save_directory, exist_ok=True)
-
-player_data = {
-    "character": "none",
-    "level": 1,
-    "max_health": 25,
-    "health": 25,
-    "mana": 7,
-    "max_mana": 7,
-    "damage": 1,
-    "coins": 0,
-    "xp": 0,
-    "xp_to_next": 10,
-    "skill_points": 0,
-    "skills": [],
-    "skill_data": {},
-    "learned_skills": {},
-    "inventory": [],
-    "equipped": [],
-}
-
-persistent_stats = {
-    "current_version": current_version,
-    "is_dead": False,
-    "floor": 1,
-    "room": 1,
-    "current_monsters": None,
-    "rooms_since_shop": 0,
-    "rooms_since_treasure": 0,
-    "monster_rotation_index": 0,
-}
-
-character_skills = {
-    "Lucian": {
-        "skills": ["Firebolt", "Fireblast"],
-        "damage": ["1d4","2d8"],
-        "attacks": [2, 1],
-        "healing": [0, 0],
-        "mana_costs": [4, 8],
-    },
-    "Ilana": {
-        "skills": ["Necro Blast", "Life Drain"],
-        "damage": ["1d4", "1d4"],
-        "attacks": [1, 2],
-        "healing": [2, 4],
-        "mana_costs": [3, 6],
-    },
-    "George": {
-        "skills": ["Sword Slash", "Sword Burst"],
-        "damage": ["1d6", "1d4"],
-        "attacks": [2, 4],
-        "healing": [0, 0],
-        "mana_costs": [3, 8],
-    },
-}
+save_format = "json"  # "json" or "binary" for new saves, existing saves load in either format
+save_backend = "files"  # "files" (one save per character) or "sqlite" (everything in eyum/saves/eyum.db)
+journal_saves = True  # append per-turn deltas instead of rewriting the whole save every turn
+pace_profile = None  # "cinematic", "normal", "fast" or "instant" (see pacing.py); None is normal, or instant when input isn't a terminal
+show_odds = False  # show the solved odds of the current fight (if you only basic attack) on the combat screen (or --odds); a big group takes up to a second to solve the first time
+odds_budget = 300  # HP combinations the odds solver may use for a monster group, lower is faster but rougher
+odds_buckets = 24  # HP buckets for the player and a lone monster in the odds solver, same trade-off
+odds_cache_size = 32  # solved fights a session remembers, so meeting the same group again shows the odds at once
+auto_policy = "efficient"  # who plays for you with the "auto" command in combat and the upgrade menu (see policies.py); "lookahead" plays better but takes a few ms a turn
 
 characters = list(character_skills.keys())
-current_save_name = ''
-global_save_path = ''
-current_monster_group = None  # global variable for active encounter
+profiler = None  # a profiler.Profiler with --profile, see start_profiler()
 
 # === Utility Functions ===
 def recalculate_all_stats(pdata):
@@ -95,21 +70,6 @@ def rainbow_text(text):
         output += colors[i % len(colors)] + char
     return output + Style.RESET_ALL
 
-def get_unique_items(owned, count):
-    available = [item for item in drop_table if item["name"] not in owned]
-    return random.sample(available, min(count, len(available)))
-
-def get_unique_skill(owned):
-    available = [skill for skill in skill_table if skill["name"] not in owned]
-    return random.choice(available) if available else None
-
-def has_all_items():
-    owned_names = [i["name"] for i in player_data["inventory"]]
-    return all(item["name"] in owned_names for item in drop_table)
-
-def has_all_skills():
-    return all(skill["name"] in player_data["skills"] for skill in skill_table)
-
 def render_health_bar(current, max_val, length=40, color=Fore.GREEN):
     filled_length = int(length * current / max_val)
     empty_length = length - filled_length
@@ -118,86 +78,16 @@ def render_health_bar(current, max_val, length=40, color=Fore.GREEN):
     empty_bar = f"{Fore.WHITE}{'░' * empty_length}"
     return f"{filled_bar}{empty_bar}{Style.RESET_ALL}"
 
-def roll_dice(dice_str):
-    try:
-        num, sides = map(int, dice_str.lower().split('d'))
-        return sum(random.randint(1, sides) for _ in range(num))
-    except Exception as e:
-        print(Fore.RED + f"Invalid dice format '{dice_str}': {e}")
-        return 0
-
-def press_enter():
-    print(Fore.BLUE + "Press ENTER to continue.")
-    input(Fore.GREEN + "> ")
-
-def clear_screen():
-    print(Style.RESET_ALL)
-    os.system("cls" if platform.system() == "Windows" else "clear")
-
-# === Save/Load Functions ===
-def list_saved_files():
-    dead_count = 0
-    print(Fore.CYAN + "Available Characters:")
-    for name in characters:
-        save_path = os.path.join(save_directory, f"{name}.json")
-        if os.path.exists(save_path):
-            try:
-                with open(save_path, "r") as f:
-                    data = json.load(f)
-                is_dead = data.get("persistent_stats", {}).get("is_dead", False)
-                if is_dead:
-                    print(Fore.RED + f"  - {name} (dead)")
-                    dead_count += 1
-                else:
-                    print(Fore.WHITE + f"  - {name}")
-            except Exception:
-                print(Fore.YELLOW + f"  - {name} (corrupt?)")
-        else:
-            print(Fore.LIGHTBLACK_EX + f"  - {name} (no save)")
-    if dead_count == len(characters):
-        print(Fore.MAGENTA + "\nAll characters are dead. Type 'reset' to delete all save files.")
-
-def save_to_file():
-    global player_data, persistent_stats, global_save_path
-    player_data["name"] = os.path.splitext(current_save_name)[0]
-    persistent_stats["current_version"] = current_version
-    save_data = {"player": player_data, "persistent_stats": persistent_stats}
-    if current_monster_group is not None:
-        persistent_stats["current_monsters"] = current_monster_group
-    else:
-        persistent_stats["current_monsters"] = None
-    try:
-        with open(global_save_path, "w") as f:
-            json.dump(save_data, f, indent=4)
-    except PermissionError:
-        print(Fore.RED + "[SAVE ERROR] Permission denied.")
-        press_enter()
-        clear_screen()
-        sys.exit(1)
-
-def load_from_file(filename):
-    global global_save_path, player_data, persistent_stats, current_monster_group
-    global_save_path = os.path.join(save_directory, filename)
-    try:
-        with open(global_save_path, "r") as f:
-            data = json.load(f)
-        player_data.update(data.get("player", {}))
-        persistent_stats.update(data.get("persistent_stats", {}))
-        print(Fore.GREEN + f"Loaded save: {filename}")
-        if persistent_stats.get("current_version") != current_version:
-            print(Fore.RED + "Version mismatch!")
-            press_enter()
-        current_monster_group = persistent_stats.get("current_monsters", None)
-        # Ensure all equipped items have parsed bonuses
-        for item in player_data.get("equipped", []):
-            if "bonus" not in item and "effect" in item:
-                convert_effect_string_to_bonus(item)
-        apply_equipment_bonuses_for(player_data)
-        return True
-    except Exception as e:
-        print(Fore.RED + f"Error loading save: {e}")
-        press_enter()
-        return False
+def skill_hint(skill_data, idx):
+    # Average damage and healing per use, from the exact damage tables
+    parts = []
+    damage = skill_expected_damage(skill_data, idx)
+    if damage:
+        parts.append(f"~{damage:.1f} dmg")
+    healing = mean(healing_pmf(skill_data["healing"][idx]))
+    if healing:
+        parts.append(f"~{healing:.1f} heal")
+    return ", ".join(parts)
 
 # === Core Functions ===
 def convert_effect_string_to_bonus(item):
@@ -253,109 +143,372 @@ def apply_equipment_bonuses_for(pdata):
     pdata["health"] = min(pdata["health"], pdata["max_health"])
     pdata["mana"] = min(pdata["mana"], pdata["max_mana"])
 
-def gain_xp(amount):
-    player_data["xp"] += amount
-    print(Fore.CYAN + f"You gained {amount} XP!")
-
-    while player_data["xp"] >= player_data["xp_to_next"]:
-        player_data["xp"] -= player_data["xp_to_next"]
-        player_data["level"] += 1
-
-        floor = persistent_stats.get("floor", 1)
-        earned_points = max(1, floor)  # guarantees at least 1
-        player_data["skill_points"] += earned_points
-
-        player_data["xp_to_next"] = int(player_data["xp_to_next"] * 1.5)
-
-        # Scale and restore mana and health
-        player_data["max_mana"] = int(player_data["max_mana"] * 1.2)
-        player_data["mana"] = player_data["max_mana"]
-
-        player_data["max_health"] = int(player_data["max_health"] * 1.1)
-        player_data["health"] = player_data["max_health"]
+reward_events = ("coins", "xp", "level_up")
+
+def describe_turn(turn, pdata, monsters):
+    # What the auto command chose, for the combat screen
+    if turn["type"] == "retreat":
+        return "Retreat"
+    target = monsters[turn["target"]]["name"] if turn.get("target") is not None else None
+    if turn["type"] == "attack":
+        return f"Attack {target}"
+    skill = pdata["skills"][turn["index"]]
+    return f"{skill} on {target}" if pdata["skill_data"]["attacks"][turn["index"]] == 1 else skill
+
+def show_combat_events(events):
+    for event in events:
+        kind = event["type"]
+        if kind == "attack":
+            print(Fore.GREEN + f"You dealt {event['amount']} damage to {event['name']}.")
+        elif kind == "skill_hit":
+            print(Fore.MAGENTA + f"{event['skill']} hits {event['name']} for {event['amount']} damage.")
+        elif kind == "self_heal":
+            print(Fore.CYAN + f"You heal for {event['amount']} HP.")
+        elif kind == "overflow":
+            print(Fore.CYAN + f"{event['amount']} HP overflowed to allies.")
+        elif kind == "overflow_heal":
+            print(Fore.CYAN + f"{event['target']} is healed for {event['amount']} HP.")
+        elif kind == "ally_strike":
+            print(Fore.YELLOW + f"{event['ally']} strikes {event['name']} for {event['amount']} damage.")
+        elif kind == "ally_sweep":
+            print(Fore.YELLOW + f"{event['ally']} hits all enemies for {event['amount']} damage.")
+        elif kind == "ally_heal":
+            print(Fore.CYAN + f"{event['ally']} heals {event['target']} for {event['amount']} HP.")
+        elif kind == "fled":
+            print(Fore.YELLOW + "You successfully fled the battle!")
+        elif kind == "retreat_failed":
+            print(Fore.RED + "Retreat failed! The monsters attack!")
+        elif kind == "monster_hit":
+            print(Fore.RED + f"{event['name']} hits you for {event['amount']}")
+        elif kind == "coins":
+            print(Fore.YELLOW + f"You found {event['amount']} coins!")
+        elif kind == "xp":
+            print(Fore.CYAN + f"You gained {event['amount']} XP!")
+        elif kind == "level_up":
+            points = event["points"]
+            print(Fore.YELLOW + f"Level up! Now level {event['level']}")
+            print(Fore.MAGENTA + f"+{points} Skill Point{'s' if points > 1 else ''}! Total: {event['total']}")
+            print(Fore.BLUE + f"Stats restored to full!")
+        elif kind == "invalid":
+            print(Fore.RED + event["reason"])
+
+
+# === Game Sessions ===
+class GameSession:
+    """
+    One game in progress: the active character and their run, the party's
+    saves, the random streams, where input comes from and how long pauses
+    last. Everything that plays the game is a method, so any number of
+    sessions can run side by side in one process (see sessions.py), each
+    with its own save folder.
+    """
 
-        player_data["base_stats"] = {
-            "damage": player_data["damage"],
-            "max_health": player_data["max_health"],
-            "max_mana": player_data["max_mana"],
+    def __init__(self, save_directory=save_directory, seed=None, input_source=None, pacer=None, screen=None, turbo=False):
+        self.save_directory = save_directory
+        self.save_format = save_format
+        self.save_backend = save_backend
+        self.journal_saves = journal_saves
+        self.show_odds = show_odds
+        self.auto_policy = auto_policy
+        self.encounters = {}  # solved fights for the odds, see combat_odds()
+        self.party_store = None  # opened by play() (see open_save_directory()), so making a session touches no files
+        self.player_data = {
+            "character": "none",
+            "level": 1,
+            "max_health": 25,
+            "health": 25,
+            "mana": 7,
+            "max_mana": 7,
+            "damage": 1,
+            "coins": 0,
+            "xp": 0,
+            "xp_to_next": 10,
+            "skill_points": 0,
+            "skills": [],
+            "skill_data": {},
+            "learned_skills": {},
+            "inventory": [],
+            "equipped": [],
         }
+        self.persistent_stats = {
+            "current_version": current_version,
+            "is_dead": False,
+            "floor": 1,
+            "room": 1,
+            "current_monsters": None,
+            "rooms_since_shop": 0,
+            "rooms_since_treasure": 0,
+            "monster_rotation_index": 0,
+            "seed": None,
+            "turns": 0,
+        }
+        self.current_save_name = ''
+        self.save_path = ''
+        self.current_monster_group = None  # the active encounter
+        self.save_journal = None  # journal for the active character's save
+        self.seed_override = seed  # --seed: the seed new characters (and saves from before seeds) start with
+        self.rng_streams = None  # the active character's random streams, see start_streams()
+        self.input_source = input_source  # a replay.Recorder or replay.ReplayInput while recording or replaying
+        self.turbo = turbo  # no screen clears or odds (--replay)
+        self.screen = screen  # the screen.Screen standing in for sys.stdout, when the terminal supports it
+        self.pacer = pacer or Pacer(pace_profile or default_profile())
+        self.counts = {"turns": 0, "rooms": 0}  # combat turns and rooms played in this session
+        self.policy = None  # the auto_policy, loaded the first time "auto" is used
+
+
+    def new_party_store(self):
+        # In-memory copies of the other characters' saves
+        database = None
+        if self.save_backend == "sqlite":
+            from save_sqlite import SqliteSaveStore, database_name  # only loads sqlite3 when it's used
+            database = SqliteSaveStore(os.path.join(self.save_directory, database_name))
+        return PartyStore(
+            self.save_directory,
+            characters,
+            binary_extension if self.save_format == "binary" else ".json",
+            database,
+        )
+
+    def character_save_path(self, name):
+        # The existing save in either format, or where a new one should go
+        return find_save_path(self.save_directory, name, self.party_store.extension) or os.path.join(self.save_directory, name + self.party_store.extension)
+
+    def get_party_save(self, name):
+        # The active character is always the live player_data, everyone else comes from the party store
+        if name == self.player_data.get("character"):
+            return {"player": self.player_data, "persistent_stats": self.persistent_stats}
+        return self.party_store.get(name)
+
+    def start_streams(self):
+        # Sets up the random streams for the character in persistent_stats, giving old saves a seed
+        if self.persistent_stats.get("seed") is None:
+            self.persistent_stats["seed"] = self.seed_override if self.seed_override is not None else new_seed()
+        self.rng_streams = RngStreams(self.persistent_stats["seed"])
+
+    def rng(self, name, *extra):
+        """
+        The random stream for name (see rng_streams.stream_names) at the current
+        point of the run: combat rolls go by turn, everything else by floor and room.
+        """
+        if name == "combat":
+            return self.rng_streams.stream(name, self.persistent_stats["turns"], *extra)
+        return self.rng_streams.stream(name, self.persistent_stats["floor"], self.persistent_stats["room"], *extra)
+
+    def ask(self, prompt=""):
+        # Every input in the game goes through here so sessions can be recorded and replayed
+        read = self.input_source.input if self.input_source is not None else input
+        if self.screen is None:
+            return read(prompt)
+        # input() writes its prompt straight to the terminal, so draw it with the frame instead
+        sys.stdout.write(prompt)
+        sys.stdout.flush()
+        value = read()
+        if sys.stdin.isatty():
+            self.screen.typed(value)  # the terminal already echoed it
+        else:
+            print(value)
+        return value
+
+    def auto(self):
+        # The policy that plays the "auto" command
+        if self.policy is None:
+            self.policy = load_policy(self.auto_policy)
+        return self.policy
+
+    def pause(self, event):
+        # Waits as long as the pacing profile says for this kind of event (see pacing.event_types), True if a key skipped it
+        sys.stdout.flush()  # show the frame so far before waiting
+        return self.pacer.wait(event)
+
+    def auto_interrupted(self):
+        """
+        The pause after each turn the auto player plays. Returns True if a
+        key was pressed during it, handing the fight back to the player.
+        Recordings keep where that happened so replays stop at the same turn.
+        """
+        if isinstance(self.input_source, ReplayInput):
+            return self.input_source.take(auto_stop)
+        interrupted = self.pause("auto")
+        if interrupted and isinstance(self.input_source, Recorder):
+            self.input_source.mark(auto_stop)
+        return interrupted
+
+    def press_enter(self):
+        print(Fore.BLUE + "Press ENTER to continue.")
+        self.ask(Fore.GREEN + "> ")
+
+    def clear_screen(self):
+        # Starts a new frame, which replaces the old one on screen once it's drawn (see screen.py)
+        if self.screen is not None and not self.turbo:
+            self.screen.new_frame()
+        print(Style.RESET_ALL)
+
+    # === Save/Load Functions ===
+    def list_saved_files(self):
+        dead_count = 0
+        print(Fore.CYAN + "Available Characters:")
+        for name in characters:
+            summary = self.party_store.summary(name)  # from the save index, not the full save
+            if summary is None:
+                # Saves are only made once a character is picked
+                new = new_player(name)
+                print(Fore.WHITE + f"  - {name}" + Fore.LIGHTBLACK_EX + f"  Lv 1 | Floor 1 | HP {new['health']} / {new['max_health']} (new)")
+            elif summary.get("corrupt"):
+                print(Fore.YELLOW + f"  - {name} (corrupt?)")
+            elif summary["is_dead"]:
+                print(Fore.RED + f"  - {name} (dead)")
+                dead_count += 1
+            else:
+                print(Fore.WHITE + f"  - {name}" + Fore.LIGHTBLACK_EX + f"  Lv {summary['level']} | Floor {summary['floor']} | HP {summary['health']} / {summary['max_health']}")
+        self.party_store.write_index()  # once for the whole list, whatever had to be rebuilt
+        if dead_count == len(characters):
+            print(Fore.MAGENTA + "\nAll characters are dead. Type 'reset' to delete all save files.")
+
+    def save_to_file(self, compact=False, backup_floor=None):
+        """
+        Saves the active character. With journal_saves on, this only appends what
+        changed since the last save; compact=True (exit, death, floor change) folds
+        the journal back into a full snapshot. backup_floor also writes the
+        _backup_floorN copy.
+        """
+        self.player_data["name"] = os.path.splitext(self.current_save_name)[0]
+        self.persistent_stats["current_version"] = current_version
+        save_data = {"player": self.player_data, "persistent_stats": self.persistent_stats}
+        if self.current_monster_group is not None:
+            self.persistent_stats["current_monsters"] = self.current_monster_group
+        else:
+            self.persistent_stats["current_monsters"] = None
+        backups = {self.player_data["name"]: (backup_floor, save_data)} if backup_floor is not None else None
+        try:
+            if self.party_store.database is not None:
+                # The active character, every ally changed this turn and the backup all go in one transaction
+                self.party_store.discard(self.player_data["name"])
+                self.party_store.flush(extra={self.player_data["name"]: save_data}, backups=backups)
+                return
+            if not self.journal_saves:
+                write_snapshot(self.save_path, save_data)
+            else:
+                if self.save_journal is None or self.save_journal.save_path != self.save_path:
+                    self.save_journal = SaveJournal(self.save_path)
+                if compact:
+                    self.save_journal.compact(save_data)
+                else:
+                    self.save_journal.record(save_data)
+            self.party_store.index.record(self.player_data["name"], save_data, self.save_path)
+            # Every save of the active character is also the checkpoint for allies changed this turn
+            self.party_store.discard(self.player_data["name"])
+            self.party_store.flush(backups=backups)
+            if compact or backup_floor is not None or not self.journal_saves or self.save_journal.entries == 0:
+                # The snapshot was rewritten, so the index on disk would be stale from here on
+                self.party_store.write_index()
+        except PermissionError:
+            print(Fore.RED + "[SAVE ERROR] Permission denied.")
+            self.press_enter()
+            self.clear_screen()
+            sys.exit(1)
+
+    def load_from_file(self, filename):
+        self.save_path = os.path.join(self.save_directory, filename)
+        # Write out any pending ally changes to this character before it becomes the active one
+        name = os.path.splitext(filename)[0]
+        self.party_store.forget(name)
+        try:
+            if self.party_store.database is not None:
+                self.save_journal = None
+                data = self.party_store.read(name)
+            else:
+                self.save_journal = SaveJournal(self.save_path)
+                data = read_save(self.save_path, self.save_journal)
+            self.player_data.update(data.get("player", {}))
+            catalog.track(self.player_data)
+            self.persistent_stats.update({"seed": None, "turns": 0})  # in case the save is older than either
+            self.persistent_stats.update(data.get("persistent_stats", {}))
+            self.start_streams()
+            print(Fore.GREEN + f"Loaded save: {filename}")
+            if self.persistent_stats.get("current_version") != current_version:
+                print(Fore.RED + "Version mismatch!")
+                self.press_enter()
+            self.current_monster_group = self.persistent_stats.get("current_monsters", None)
+            # Ensure all equipped items have parsed bonuses
+            for item in self.player_data.get("equipped", []):
+                if "bonus" not in item and "effect" in item:
+                    convert_effect_string_to_bonus(item)
+            apply_equipment_bonuses_for(self.player_data)
+            return True
+        except Exception as e:
+            print(Fore.RED + f"Error loading save: {e}")
+            self.press_enter()
+            return False
 
-        print(Fore.YELLOW + f"Level up! Now level {player_data['level']}")
-        print(Fore.MAGENTA + f"+{earned_points} Skill Point{'s' if earned_points > 1 else ''}! Total: {player_data['skill_points']}")
-        print(Fore.BLUE + f"Stats restored to full!")
-
-def reset_game_state():
-    """
-    Fully clears and resets all runtime globals and deletes all character save files.
-    """
-    global player_data, persistent_stats, current_monster_group
+    def gain_xp(self, amount):
+        show_combat_events(apply_xp(self.player_data, amount, self.persistent_stats.get("floor", 1)))
 
-    for name in characters:
-        path = os.path.join(save_directory, f"{name}.json")
-        if os.path.exists(path):
-            os.remove(path)
+    def reset_game_state(self):
+        """
+        Fully clears and resets the session and deletes all character save files.
+        """
 
-    player_data.clear()
-    player_data.update({
-        "character": "none",
-        "level": 1,
-        "max_health": 25,
-        "health": 25,
-        "mana": 7,
-        "max_mana": 7,
-        "damage": 1,
-        "coins": 0,
-        "xp": 0,
-        "xp_to_next": 10,
-        "skill_points": 0,
-        "skills": [],
-        "skill_data": {},
-        "learned_skills": {},
-        "inventory": [],
-        "equipped": [],
-        "upgrade_costs": {
-            "max_health": 1,
-            "max_mana": 1,
+        for name in characters:
+            self.party_store.delete(name)
+        self.party_store.clear()
+
+        self.player_data.clear()
+        self.player_data.update({
+            "character": "none",
+            "level": 1,
+            "max_health": 25,
+            "health": 25,
+            "mana": 7,
+            "max_mana": 7,
             "damage": 1,
-        },
-        "skill_upgrade_costs": [],
-    })
+            "coins": 0,
+            "xp": 0,
+            "xp_to_next": 10,
+            "skill_points": 0,
+            "skills": [],
+            "skill_data": {},
+            "learned_skills": {},
+            "inventory": [],
+            "equipped": [],
+            "upgrade_costs": {
+                "max_health": 1,
+                "max_mana": 1,
+                "damage": 1,
+            },
+            "skill_upgrade_costs": [],
+        })
+
+        self.persistent_stats.clear()
+        self.persistent_stats.update({
+            "current_version": current_version,
+            "is_dead": False,
+            "floor": 1,
+            "room": 1,
+            "current_monsters": None,
+            "rooms_since_shop": 0,
+            "rooms_since_treasure": 0,
+            "monster_rotation_index": 0,
+            "seed": None,
+            "turns": 0,
+        })
+
+        self.current_monster_group = None
+        self.save_journal = None
+
+    def open_treasure_room(self):
+        self.persistent_stats["rooms_since_treasure"] = 0
+        self.clear_screen()
+
+        print(Fore.YELLOW + Style.BRIGHT + "\n" + "=" * 50)
+        print(Fore.CYAN + Style.BRIGHT + "+++ TREASURE ROOM +++".center(50))
+        print("=" * 50 + "\n")
+        self.pause("treasure")
 
-    persistent_stats.clear()
-    persistent_stats.update({
-        "current_version": current_version,
-        "is_dead": False,
-        "floor": 1,
-        "room": 1,
-        "current_monsters": None,
-        "rooms_since_shop": 0,
-        "rooms_since_treasure": 0,
-        "monster_rotation_index": 0,
-    })
+        coin_reward, item, skill, already_known = open_treasure(self.player_data, self.rng("loot"))
+        print(Fore.YELLOW + f"You found a stash of {coin_reward} coins!".center(50))
+        self.pause("treasure")
 
-    current_monster_group = None
-
-def open_treasure_room():
-    persistent_stats["rooms_since_treasure"] = 0
-    clear_screen()
-
-    print(Fore.YELLOW + Style.BRIGHT + "\n" + "=" * 50)
-    print(Fore.CYAN + Style.BRIGHT + "+++ TREASURE ROOM +++".center(50))
-    print("=" * 50 + "\n")
-    time.sleep(1)
-
-    coin_reward = random.randint(40, 80)
-    player_data["coins"] += coin_reward
-    print(Fore.YELLOW + f"You found a stash of {coin_reward} coins!".center(50))
-    time.sleep(1)
-
-    # 25% chance of item
-    if random.random() < 0.25:
-        owned_items = [i["name"] for i in player_data["inventory"]]
-        unique_items = get_unique_items(owned_items, 1)
-        if unique_items:
-            item = unique_items[0]
-            player_data["inventory"].append(item)
+        if item:
             bonus = item.get("bonus", {})
             parts = []
             if bonus.get("damage"):
@@ -368,86 +521,78 @@ def open_treasure_room():
                 parts.append("Restores Full HP/MP")
             effect = ", ".join(parts) if parts else "No effect"
             print(Fore.GREEN + f"You also found an item: {item['name']} ({effect})".center(50))
-            time.sleep(1)
-
-    # 10% chance of skill
-    if random.random() < 0.10:
-        skill = get_unique_skill(player_data["skills"])
-        if skill:
-            player_data["skills"].append(skill["name"])
-            if "skill_upgrade_costs" not in player_data:
-                player_data["skill_upgrade_costs"] = []
-            player_data["skill_upgrade_costs"].append(1)
-            sd = player_data["skill_data"]
-            sd.setdefault("damage", []).append(skill["damage"])
-            sd.setdefault("attacks", []).append(skill["attacks"])
-            sd.setdefault("healing", []).append(skill["healing"])
-            sd.setdefault("mana_costs", []).append(skill["mana_cost"])
-            print(Fore.MAGENTA + f"You discovered a rare skill: {skill['name']}!".center(50))
-        else:
-            print(Fore.MAGENTA + "You almost found a skill... but you already knew it.".center(50))
-        time.sleep(1)
+            self.pause("treasure")
+
+        if skill or already_known:
+            if skill:
+                print(Fore.MAGENTA + f"You discovered a rare skill: {skill['name']}!".center(50))
+            else:
+                print(Fore.MAGENTA + "You almost found a skill... but you already knew it.".center(50))
+            self.pause("treasure")
 
-    print(Style.RESET_ALL)
-    save_to_file()
-    press_enter()
+        print(Style.RESET_ALL)
+        self.save_to_file()
+        self.press_enter()
 
-def open_inventory_menu():
-    def remove_item_from_all_characters(item_name):
+    def remove_item_everywhere(self, item_name):
         for name in characters:
-            path = os.path.join(save_directory, f"{name}.json")
-            if not os.path.exists(path):
+            data = self.get_party_save(name)
+            if data is None:
                 continue
-            with open(path, "r") as f:
-                data = json.load(f)
             pdata = data["player"]
-            pdata["inventory"] = [i for i in pdata.get("inventory", []) if i["name"] != item_name]
+            pdata.setdefault("inventory", [])[:] = [i for i in pdata["inventory"] if i["name"] != item_name]  # in place, so its bitset follows
             pdata["equipped"] = [i for i in pdata.get("equipped", []) if i["name"] != item_name]
-            data["player"] = pdata
-            with open(path, "w") as f:
-                json.dump(data, f, indent=4)
-
-    while True:
-        clear_screen()
-        print(Fore.BLUE + "--- Party Inventory & Equipment ---")
-
-        all_items = []
-        index_map = []
-        for char_name in characters:
-            path = os.path.join(save_directory, f"{char_name}.json")
-            if not os.path.exists(path):
-                continue
-            try:
-                with open(path, "r") as f:
-                    data = json.load(f)
-                pdata = data["player"]
-                equipped = {item["type"]: item for item in pdata.get("equipped", [])}
-                inventory = pdata.get("inventory", [])
-                types = ["weapon", "armor", "magic", "relic", "potion"]
-                print(Fore.CYAN + f"\n== {char_name}'s Inventory ==")
-                for t in types:
-                    print(Fore.LIGHTBLACK_EX + f"\n  {t.capitalize()}:")
-
-                    if t in equipped:
-                        eq = equipped[t]
-                        bonus = eq.get("bonus", {})
-                        parts = []
-                        if bonus.get("damage"):
-                            parts.append(f"+{bonus['damage']} dmg")
-                        if bonus.get("max_health"):
-                            parts.append(f"+{bonus['max_health']} HP")
-                        if bonus.get("max_mana"):
-                            parts.append(f"+{bonus['max_mana']} MP")
-                        if eq.get("restore_full"):
-                            parts.append("Restores Full HP/MP")
-                        bonus_text = ", ".join(parts) if parts else "No effect"
-                        print(Fore.YELLOW + f"    Equipped: {eq['name']}".ljust(40) + f"({bonus_text})")
-                        index_map.append((char_name, {"type": t, "unequip": True}))
-                        print(Fore.LIGHTBLACK_EX + f"    [{len(index_map)}] Unequip")
-
-                    for item in inventory:
-                        if item["type"] == t and item["name"] != equipped.get(t, {}).get("name"):
-                            bonus = item.get("bonus", {})
+            self.party_store.mark_dirty(name)
+
+    def equip_item(self, item, target_name):
+        # Moves item from whoever has it onto target_name, replacing what they had of its type
+        self.remove_item_everywhere(item["name"])
+
+        pdata = self.get_party_save(target_name)["player"]
+        pdata["equipped"] = [e for e in pdata["equipped"] if e["type"] != item["type"]]
+        pdata["equipped"].append(item)
+        if "bonus" not in item and "effect" in item:
+            convert_effect_string_to_bonus(item)
+        apply_equipment_bonuses_for(pdata)
+        pdata["health"] = min(pdata["health"], pdata["max_health"])
+        pdata["mana"] = min(pdata["mana"], pdata["max_mana"])
+        self.party_store.mark_dirty(target_name)
+        self.save_to_file()
+
+    def unequip_item(self, name, item_type):
+        pdata = self.get_party_save(name)["player"]
+        pdata["equipped"] = [e for e in pdata["equipped"] if e["type"] != item_type]
+        recalculate_all_stats(pdata)
+        if pdata["character"] == self.player_data["character"]:
+            apply_equipment_bonuses_for(self.player_data)
+        self.party_store.mark_dirty(name)
+        self.save_to_file()
+
+    def open_inventory_menu(self):
+        while True:
+            self.clear_screen()
+            print(Fore.BLUE + "--- Party Inventory & Equipment ---")
+
+            all_items = []
+            index_map = []
+            for char_name in characters:
+                try:
+                    data = self.get_party_save(char_name)
+                    if data is None:
+                        continue
+                    pdata = data["player"]
+                    equipped = {item["type"]: item for item in pdata.get("equipped", [])}
+                    by_type = {}
+                    for item in pdata.get("inventory", []):
+                        by_type.setdefault(item["type"], []).append(item)
+                    types = ["weapon", "armor", "magic", "relic", "potion"]
+                    print(Fore.CYAN + f"\n== {char_name}'s Inventory ==")
+                    for t in types:
+                        print(Fore.LIGHTBLACK_EX + f"\n  {t.capitalize()}:")
+
+                        if t in equipped:
+                            eq = equipped[t]
+                            bonus = eq.get("bonus", {})
                             parts = []
                             if bonus.get("damage"):
                                 parts.append(f"+{bonus['damage']} dmg")
@@ -455,998 +600,909 @@ def open_inventory_menu():
                                 parts.append(f"+{bonus['max_health']} HP")
                             if bonus.get("max_mana"):
                                 parts.append(f"+{bonus['max_mana']} MP")
-                            if item.get("restore_full"):
+                            if eq.get("restore_full"):
                                 parts.append("Restores Full HP/MP")
                             bonus_text = ", ".join(parts) if parts else "No effect"
-                            index_map.append((char_name, item))
-                            print(Fore.WHITE + f"    [{len(index_map)}] {item['name']}".ljust(40) + f"({bonus_text})")
-            except Exception as e:
-                print(Fore.RED + f"[ERROR] {char_name}: {e}")
-
-        print(Fore.GREEN + "\nType the item number to equip it, or 'exit' to go back.")
-        choice = input(Fore.GREEN + "> ").strip().lower()
-        if choice == "exit":
-            return
-        try:
-            idx = int(choice) - 1
-            if idx < 0 or idx >= len(index_map):
-                raise ValueError
-            source_name, item = index_map[idx]
-            unequip = item.get("unequip", False)
-            if unequip:
-                path = os.path.join(save_directory, f"{source_name}.json")
-                with open(path, "r") as f:
-                    data = json.load(f)
-                pdata = data["player"]
-                pdata["equipped"] = [e for e in pdata["equipped"] if e["type"] != item["type"]]
-                recalculate_all_stats(pdata)
-                if pdata["character"] == player_data["character"]:
-                    player_data.update(pdata)
-                    apply_equipment_bonuses_for(player_data)
-                data["player"] = pdata
-                with open(path, "w") as f:
-                    json.dump(data, f, indent=4)
-                print(Fore.YELLOW + f"Unequipped {item['type']} from {source_name}.")
-                press_enter()
-                continue
-
-            print(Fore.CYAN + f"Who should equip {item['name']}? (Lucian, Ilana, George)")
-            target_name = input(Fore.GREEN + "> ").strip().capitalize()
-            if target_name not in characters:
-                print(Fore.RED + "Invalid character.")
-                time.sleep(1)
-                continue
-
-            remove_item_from_all_characters(item["name"])
-            # Also remove from source character's inventory if needed
-            if source_name != target_name:
-                source_path = os.path.join(save_directory, f"{source_name}.json")
-                if os.path.exists(source_path):
-                    with open(source_path, "r") as f:
-                        source_data = json.load(f)
-                    source_pdata = source_data["player"]
-                    source_pdata["inventory"] = [i for i in source_pdata["inventory"] if i["name"] != item["name"]]
-                    source_data["player"] = source_pdata
-                    with open(source_path, "w") as f:
-                        json.dump(source_data, f, indent=4)
-
-            path = os.path.join(save_directory, f"{target_name}.json")
-            with open(path, "r") as f:
-                data = json.load(f)
-            pdata = data["player"]
-            pdata["equipped"] = [e for e in pdata["equipped"] if e["type"] != item["type"]]
-            pdata["equipped"].append(item)
-            if "bonus" not in item and "effect" in item:
-                convert_effect_string_to_bonus(item)
-            apply_equipment_bonuses_for(pdata)
-            pdata["health"] = min(pdata["health"], pdata["max_health"])
-            pdata["mana"] = min(pdata["mana"], pdata["max_mana"])
-            if pdata["character"] == player_data["character"]:
-                player_data.update(pdata)
-            data["player"] = pdata
-            with open(path, "w") as f:
-                json.dump(data, f, indent=4)
-            print(Fore.YELLOW + f"Equipped {item['name']} on {target_name}")
-            press_enter()
-        except:
-            print(Fore.RED + "Invalid input.")
-            time.sleep(0.5)
-
-def open_upgrade_menu():
-    # initialize upgrade cost trackers if not present
-    if "upgrade_costs" not in player_data:
-        player_data["upgrade_costs"] = {
-            "max_health": 1,
-            "max_mana": 1,
-            "damage": 1
-        }
-    if "skill_upgrade_costs" not in player_data:
-        player_data["skill_upgrade_costs"] = [1 for _ in player_data["skills"]]
-
-    def save_stats():
-        player_data["base_stats"] = {
-            "damage": player_data["damage"],
-            "max_health": player_data["max_health"],
-            "max_mana": player_data["max_mana"]
-        }
-
-    while True:
-        clear_screen()
-        print(f"{Fore.BLUE}Skill Points: {player_data['skill_points']}  |  XP: {player_data['xp']}  |  Hp: {player_data['health']}/{player_data['max_health']}")
-
-        # Grab current costs
-        costs = player_data["upgrade_costs"]
-        hp_cost = costs["max_health"]
-        mana_cost = costs["max_mana"]
-        dmg_cost = costs["damage"]
-
-        # Color options based on affordability
-        hp_color = Fore.GREEN if player_data["skill_points"] >= hp_cost else Fore.RED
-        mana_color = Fore.GREEN if player_data["skill_points"] >= mana_cost else Fore.RED
-        dmg_color = Fore.GREEN if player_data["skill_points"] >= dmg_cost else Fore.RED
-
-        print(f"{hp_color}  [1] +5 Max Health ({hp_cost} pts)")
-        print(f"{mana_color}  [2] +2 Mana ({mana_cost} pts)")
-        print(f"{dmg_color}  [3] +1 Base Damage ({dmg_cost} pts)")
-        print(Fore.CYAN + "  [4] Upgrade Skill")
-        floor = persistent_stats.get("floor", 1)
-        min_cost = (floor + 1) * 10
-        xp_cost = max(min_cost, int(player_data["xp"] * 0.25))
-        heal_color = Fore.GREEN if player_data["xp"] >= xp_cost else Fore.RED
-        print(f"{heal_color}  [5] Heal 10% HP (costs 25% XP)")
-        print(Fore.CYAN + "  [6] Exit")
-
-        if player_data["skill_points"] <= 0:
-            print(Fore.RED + "No skill points.")
-
-        choice = input(Fore.GREEN + "> ").strip()
-        if choice == "1":
-            cost = player_data["upgrade_costs"]["max_health"]
-            if player_data["skill_points"] < cost:
-                print(Fore.RED + f"Not enough points (cost: {cost})")
-                time.sleep(1)
-                continue
-            player_data["max_health"] += 5
-            player_data["health"] += 5
-            player_data["skill_points"] -= cost
-            save_stats()
-            player_data["upgrade_costs"]["max_health"] = max(int(cost * 1.2), cost + 1)
-
-        elif choice == "2":
-            cost = player_data["upgrade_costs"]["max_mana"]
-            if player_data["skill_points"] < cost:
-                print(Fore.RED + f"Not enough points (cost: {cost})")
-                time.sleep(1)
-                continue
-            player_data["max_mana"] += 3
-            player_data["mana"] += 2
-            player_data["skill_points"] -= cost
-            save_stats()
-            player_data["upgrade_costs"]["max_mana"] = max(int(cost * 1.2), cost + 1)
-
-        elif choice == "3":
-            cost = player_data["upgrade_costs"]["damage"]
-            if player_data["skill_points"] < cost:
-                print(Fore.RED + f"Not enough points (cost: {cost})")
-                time.sleep(1)
-                continue
-            player_data["damage"] += 1
-            player_data["skill_points"] -= cost
-            save_stats()
-            player_data["upgrade_costs"]["damage"] = max(int(cost * 1.2), cost + 1)
-
-        elif choice == "4":
-            skills = player_data.get("skills", [])
-            if not skills:
-                print("No skills.")
-                press_enter()
-                continue
-
-            print("choose skill:")
-            # Ensure skill_upgrade_costs list is the same length as skills
-            if len(player_data["skill_upgrade_costs"]) < len(player_data["skills"]):
-                missing = len(player_data["skills"]) - len(player_data["skill_upgrade_costs"])
-                player_data["skill_upgrade_costs"].extend([1] * missing)
-            for i, skill in enumerate(skills):
-                cost = player_data["skill_upgrade_costs"][i]
-                color = Fore.GREEN if player_data["skill_points"] >= cost else Fore.RED
-                print(f"{color}  [{i + 1}] {skill} (cost: {cost})")
-
+                            print(Fore.YELLOW + f"    Equipped: {eq['name']}".ljust(40) + f"({bonus_text})")
+                            index_map.append((char_name, {"type": t, "unequip": True}))
+                            print(Fore.LIGHTBLACK_EX + f"    [{len(index_map)}] Unequip")
+
+                        for item in by_type.get(t, ()):
+                            if item["name"] != equipped.get(t, {}).get("name"):
+                                bonus = item.get("bonus", {})
+                                parts = []
+                                if bonus.get("damage"):
+                                    parts.append(f"+{bonus['damage']} dmg")
+                                if bonus.get("max_health"):
+                                    parts.append(f"+{bonus['max_health']} HP")
+                                if bonus.get("max_mana"):
+                                    parts.append(f"+{bonus['max_mana']} MP")
+                                if item.get("restore_full"):
+                                    parts.append("Restores Full HP/MP")
+                                bonus_text = ", ".join(parts) if parts else "No effect"
+                                index_map.append((char_name, item))
+                                print(Fore.WHITE + f"    [{len(index_map)}] {item['name']}".ljust(40) + f"({bonus_text})")
+                except Exception as e:
+                    print(Fore.RED + f"[ERROR] {char_name}: {e}")
+
+            print(Fore.GREEN + "\nType the item number to equip it, or 'exit' to go back.")
+            choice = self.ask(Fore.GREEN + "> ").strip().lower()
+            if choice == "exit":
+                return
             try:
-                idx = int(input("> ")) - 1
-                if idx < 0 or idx >= len(skills):
+                idx = int(choice) - 1
+                if idx < 0 or idx >= len(index_map):
                     raise ValueError
+                source_name, item = index_map[idx]
+                unequip = item.get("unequip", False)
+                if unequip:
+                    self.unequip_item(source_name, item["type"])
+                    print(Fore.YELLOW + f"Unequipped {item['type']} from {source_name}.")
+                    self.press_enter()
+                    continue
 
-                cost = player_data["skill_upgrade_costs"][idx]
-                if player_data["skill_points"] < cost:
-                    print(Fore.RED + f"Not enough points (cost: {cost})")
-                    time.sleep(1)
+                print(Fore.CYAN + f"Who should equip {item['name']}? (Lucian, Ilana, George)")
+                target_name = self.ask(Fore.GREEN + "> ").strip().capitalize()
+                if target_name not in characters:
+                    print(Fore.RED + "Invalid character.")
+                    self.pause("invalid")
                     continue
 
-                dmg_str = player_data["skill_data"]["damage"][idx]
-                if not dmg_str.startswith("1d"):
-                    print("Unsupported Format.")
+                self.equip_item(item, target_name)  # taking it off the source character too
+                print(Fore.YELLOW + f"Equipped {item['name']} on {target_name}")
+                self.press_enter()
+            except:
+                print(Fore.RED + "Invalid input.")
+                self.pause("invalid")
+
+    def open_upgrade_menu(self):
+        ensure_upgrade_costs(self.player_data)
+
+        while True:
+            self.clear_screen()
+            print(f"{Fore.BLUE}Skill Points: {self.player_data['skill_points']}  |  XP: {self.player_data['xp']}  |  Hp: {self.player_data['health']}/{self.player_data['max_health']}")
+
+            # Grab current costs
+            costs = self.player_data["upgrade_costs"]
+            hp_cost = costs["max_health"]
+            mana_cost = costs["max_mana"]
+            dmg_cost = costs["damage"]
+
+            # Color options based on affordability
+            hp_color = Fore.GREEN if self.player_data["skill_points"] >= hp_cost else Fore.RED
+            mana_color = Fore.GREEN if self.player_data["skill_points"] >= mana_cost else Fore.RED
+            dmg_color = Fore.GREEN if self.player_data["skill_points"] >= dmg_cost else Fore.RED
+
+            print(f"{hp_color}  [1] +5 Max Health ({hp_cost} pts)")
+            print(f"{mana_color}  [2] +2 Mana ({mana_cost} pts)")
+            print(f"{dmg_color}  [3] +1 Base Damage ({dmg_cost} pts)")
+            print(Fore.CYAN + "  [4] Upgrade Skill")
+            xp_cost = xp_heal_cost(self.player_data, self.persistent_stats.get("floor", 1))
+            heal_color = Fore.GREEN if self.player_data["xp"] >= xp_cost else Fore.RED
+            print(f"{heal_color}  [5] Heal 10% HP (costs 25% XP)")
+            print(Fore.CYAN + "  [6] Exit")
+            print(Fore.CYAN + "  [7] Auto (spend points like the auto player)")
+
+            if self.player_data["skill_points"] <= 0:
+                print(Fore.RED + "No skill points.")
+
+            choice = self.ask(Fore.GREEN + "> ").strip()
+            if choice in ["1", "2", "3"]:
+                stat = upgrade_stats[int(choice) - 1]
+                if not upgrade_stat(self.player_data, stat):
+                    print(Fore.RED + f"Not enough points (cost: {self.player_data['upgrade_costs'][stat]})")
+                    self.pause("denied")
                     continue
 
-                new_die = int(dmg_str[2:]) + 2
-                player_data["skill_data"]["damage"][idx] = f"1d{new_die}"
-                player_data["skill_data"]["attacks"][idx] += 1
-                player_data["skill_points"] -= cost
-                save_stats()
-                player_data["skill_upgrade_costs"][idx] = max(cost * 2, cost + 1)
+            elif choice == "4":
+                skills = self.player_data.get("skills", [])
+                if not skills:
+                    print("No skills.")
+                    self.press_enter()
+                    continue
 
-                print(f"{skills[idx]} upgraded!")
-                time.sleep(0.5)
-            except:
-                print("Upgrade failed or was exited.")
-                time.sleep(1)
-                continue
+                print("choose skill:")
+                ensure_upgrade_costs(self.player_data)
+                for i, skill in enumerate(skills):
+                    cost = self.player_data["skill_upgrade_costs"][i]
+                    color = Fore.GREEN if self.player_data["skill_points"] >= cost else Fore.RED
+                    print(f"{color}  [{i + 1}] {skill} (cost: {cost})")
 
-        elif choice == "5":
-            if player_data["health"] >= player_data["max_health"]:
-                print(Fore.YELLOW + "You're already at full health.")
-                time.sleep(1)
-                continue
+                try:
+                    idx = int(self.ask("> ")) - 1
+                    if idx < 0 or idx >= len(skills):
+                        raise ValueError
+
+                    problem = upgrade_skill(self.player_data, idx)
+                    if problem:
+                        print(Fore.RED + problem)
+                        self.pause("denied")
+                        continue
 
-            floor = persistent_stats.get("floor", 1)
-            min_cost = (floor + 1) * 10
-            xp_cost = max(min_cost, int(player_data["xp"] * 0.25))
+                    print(f"{skills[idx]} upgraded!")
+                    self.pause("notice")
+                except:
+                    print("Upgrade failed or was exited.")
+                    self.pause("invalid")
+                    continue
 
-            if player_data["xp"] < xp_cost:
-                print(Fore.RED + f"Not enough XP. Heal costs {xp_cost} XP (minimum {min_cost}).")
-                time.sleep(1)
-                continue
+            elif choice == "5":
+                if self.player_data["health"] >= self.player_data["max_health"]:
+                    print(Fore.YELLOW + "You're already at full health.")
+                    self.pause("denied")
+                    continue
 
-            heal_amount = max(1, int(player_data["max_health"] * 0.1))
-            player_data["xp"] -= xp_cost
-            player_data["health"] = min(player_data["health"] + heal_amount, player_data["max_health"])
-            print(Fore.CYAN + f"You spent {xp_cost} XP and healed {heal_amount} HP!")
-            time.sleep(1)
+                floor = self.persistent_stats.get("floor", 1)
+                healed = xp_heal(self.player_data, floor)
+                if healed is None:
+                    min_cost = (floor + 1) * 10
+                    print(Fore.RED + f"Not enough XP. Heal costs {xp_heal_cost(self.player_data, floor)} XP (minimum {min_cost}).")
+                    self.pause("denied")
+                    continue
 
-        elif choice in ["6", "exit", "leave"]:
-            return
-        else:
-            print("Invalid.")
-            time.sleep(1)
-
-def open_shop():
-    persistent_stats["rooms_since_shop"] = 0
-    owned_items = [i["name"] for i in player_data["inventory"]]
-    owned_skills = player_data["skills"]
-
-    all_items_owned = has_all_items()
-    all_skills_owned = has_all_skills()
-
-    shop_items = []
-    if not all_items_owned:
-        shop_items = get_unique_items(owned_items, 3)
-
-    # Force a skill to show if any are left
-    skill_offer = get_unique_skill(owned_skills) if not all_skills_owned else None
-
-    # Abort shop if everything is already owned
-    if all_items_owned and all_skills_owned:
-        print(Fore.YELLOW + "The merchant has nothing new to offer you.")
-        time.sleep(1.5)
-        return
-
-    floor_multiplier = 1 + (persistent_stats["floor"] - 1) * 0.1  # 10% more per floor
-
-    while True:
-        clear_screen()
-        print(Fore.BLUE + "--- Merchant's Shop ---")
-        print(Fore.MAGENTA + f"You can buy {Fore.RED}1{Fore.MAGENTA} item, choose wisely")
-        print(f"You have {Fore.YELLOW}{player_data['coins']} coins{Style.RESET_ALL}\n")
-        print(Fore.GREEN + "Items for sale:")
-        for idx, item in enumerate(shop_items):
-            price = int(item["value"] * floor_multiplier)
-            affordable = player_data["coins"] >= price
-            color = Fore.GREEN if affordable else Fore.RED
-            bonus = item.get("bonus", {})
-            bonus_parts = []
-            if bonus.get("damage"):
-                bonus_parts.append(f"+{bonus['damage']} dmg")
-            if bonus.get("max_health"):
-                bonus_parts.append(f"+{bonus['max_health']} HP")
-            if bonus.get("max_mana"):
-                bonus_parts.append(f"+{bonus['max_mana']} MP")
-            if item.get("restore_full"):
-                bonus_parts.append("Restores Full HP/MP")
-            effect = ", ".join(bonus_parts) if bonus_parts else "No effect"
+                xp_cost, heal_amount = healed
+                print(Fore.CYAN + f"You spent {xp_cost} XP and healed {heal_amount} HP!")
+                self.pause("notice")
 
-            print(f"{color}  [{idx + 1}] {item['name']} ({price} coins) - {effect}")
+            elif choice in ["6", "exit", "leave"]:
+                return
 
-        if skill_offer:
-            base_price = 20 + (10 - skill_offer["weight"]) * 3
-            skill_price = int(base_price * floor_multiplier)
-            skill_color = Fore.GREEN if player_data["coins"] >= skill_price else Fore.RED
-            effect = skill_offer.get("effect",f"{skill_offer['damage']} dmg, {skill_offer['attacks']} hit(s), costs {skill_offer['mana_cost']} MP")
-            print(f"{skill_color}  [S] {skill_offer['name']} ({skill_price} coins) (Skill) - {effect}")
+            elif choice in ["7", "auto"]:
+                points = self.player_data["skill_points"]
+                self.auto().spend_points(self.player_data, self.rng("rooms", "auto"))
+                if self.player_data["skill_points"] == points:
+                    print(Fore.RED + "Nothing affordable.")
+                    self.pause("denied")
+                    continue
+                spent = points - self.player_data["skill_points"]
+                print(Fore.CYAN + f"Spent {spent} point{'s' if spent > 1 else ''}!")
+                self.pause("notice")
+            else:
+                print("Invalid.")
+                self.pause("invalid")
 
-        print(Fore.CYAN + "  [E] Exit shop")
-        choice = input(Fore.GREEN + "> ").strip().lower()
+    def open_shop(self):
+        self.persistent_stats["rooms_since_shop"] = 0
+        stock = shop_stock(self.player_data, self.rng("loot"))
 
-        if choice in ["e", "exit", "leave"]:
-            print(Fore.YELLOW + "You leave the shop.")
+        # Abort shop if everything is already owned
+        if stock is None:
+            print(Fore.YELLOW + "The merchant has nothing new to offer you.")
+            self.pause("notice")
             return
 
-        if choice in ["s"] and skill_offer:
-            price = 20 + (10 - skill_offer["weight"]) * 3
-            if player_data["coins"] >= price:
-                if skill_offer["name"] in player_data["skills"]:
-                    print(Fore.RED + "You already know that skill.")
-                    time.sleep(1)
-                else:
-                    player_data["coins"] -= price
-                    player_data["skills"].append(skill_offer["name"])
-                    if "skill_upgrade_costs" not in player_data:
-                        player_data["skill_upgrade_costs"] = []
-                    player_data["skill_upgrade_costs"].append(1)
-                    sd = player_data["skill_data"]
-                    sd.setdefault("damage", []).append(skill_offer["damage"])
-                    sd.setdefault("attacks", []).append(skill_offer["attacks"])
-                    sd.setdefault("healing", []).append(skill_offer["healing"])
-                    sd.setdefault("mana_costs", []).append(skill_offer["mana_cost"])
-                    print(Fore.MAGENTA + f"You learned {skill_offer['name']}!")
-                    save_to_file()
-                    time.sleep(1)
-                    return  # Exit after purchase
-            else:
-                print(Fore.RED + "Not enough coins.")
-                time.sleep(1)
-            continue
+        shop_items, skill_offer = stock
+        multiplier = floor_multiplier(self.persistent_stats["floor"])
 
-        try:
-            idx = int(choice) - 1
-            if idx < 0 or idx >= len(shop_items):
-                raise ValueError
-            item = shop_items[idx]
-            if player_data["coins"] >= item["value"]:
-                player_data["coins"] -= item["value"]
-                player_data["inventory"].append(item)
-                print(Fore.YELLOW + f"Purchased {item['name']}")
-                save_to_file()
-                time.sleep(1)
-                return  # Exit after purchase
-            else:
-                print(Fore.RED + "Not enough coins.")
-                time.sleep(1)
-        except:
-            print(Fore.RED + "Invalid choice.")
-            time.sleep(1)
-
-def generate_monster_group():
-    i = persistent_stats.get("monster_rotation_index", 0)
-    pool = monster_list[i:i + 3]
-
-    # Ensure exactly 3 entries unless list is too short
-    while len(pool) < 3 and i + len(pool) < len(monster_list):
-        pool.append(monster_list[i + len(pool)])
-
-    weights = [10, 7, 3][:len(pool)]  # Favors weakest in current pool
-
-    group = [random.choices(pool, weights=weights)[0].copy()]
-    if random.random() < 0.30:
-        group.append(random.choices(pool, weights=weights)[0].copy())
-        if random.random() < 0.15:
-            group.append(random.choices(pool, weights=weights)[0].copy())
-            if random.random() < 0.10:
-                group.append(random.choices(pool, weights=weights)[0].copy())
-                if random.random() < 0.05:
-                    group.append(random.choices(pool, weights=weights)[0].copy())
-
-    for m in group:
-        m["max_health"] = m["health"]
-
-    return group
-
-def get_boss(floor):
-    i = persistent_stats.get("monster_rotation_index", 0)
-    boss_index = min(i + 3, len(monster_list) - 1)
-    return monster_list[boss_index]
-
-def rotate_monsters():
-    i = persistent_stats.get("monster_rotation_index", 0)
-    if i + 3 < len(monster_list):
-        persistent_stats["monster_rotation_index"] = i + 1
-
-def heal_other_characters(overflow_heal, exclude_name):
-    for name in characters:
-        if name == exclude_name:
-            continue
-        path = os.path.join(save_directory, f"{name}.json")
-        if not os.path.exists(path):
-            continue
-        try:
-            with open(path, "r") as f:
-                data = json.load(f)
-            pdata = data.get("player", {})
-            pstats = data.get("persistent_stats", {})
-            if pstats.get("is_dead"):
-                continue
-            if pdata["health"] < pdata["max_health"]:
-                needed = pdata["max_health"] - pdata["health"]
-                healed = min(overflow_heal, needed)
-                pdata["health"] += healed
-                overflow_heal -= healed
-                print(Fore.CYAN + f"{name} is healed for {healed} HP.")
-                with open(path, "w") as f:
-                    json.dump(data, f, indent=4)
-                if overflow_heal <= 0:
-                    break
-        except Exception as e:
-            print(Fore.RED + f"[ERROR] Healing {name}: {e}")
-
-def apply_party_idle_effects(active_name, monsters):
-    for name in characters:
-        if name == active_name:
-            continue  # skip current character
-        path = os.path.join(save_directory, f"{name}.json")
-        if not os.path.exists(path):
-            continue
-        try:
-            with open(path, "r") as f:
-                data = json.load(f)
-            pdata = data.get("player", {})
-            pstats = data.get("persistent_stats", {})
-            if pstats.get("is_dead"):
+        while True:
+            self.clear_screen()
+            print(Fore.BLUE + "--- Merchant's Shop ---")
+            print(Fore.MAGENTA + f"You can buy {Fore.RED}1{Fore.MAGENTA} item, choose wisely")
+            print(f"You have {Fore.YELLOW}{self.player_data['coins']} coins{Style.RESET_ALL}\n")
+            print(Fore.GREEN + "Items for sale:")
+            for idx, item in enumerate(shop_items):
+                price = int(item["value"] * multiplier)
+                affordable = self.player_data["coins"] >= price
+                color = Fore.GREEN if affordable else Fore.RED
+                bonus = item.get("bonus", {})
+                bonus_parts = []
+                if bonus.get("damage"):
+                    bonus_parts.append(f"+{bonus['damage']} dmg")
+                if bonus.get("max_health"):
+                    bonus_parts.append(f"+{bonus['max_health']} HP")
+                if bonus.get("max_mana"):
+                    bonus_parts.append(f"+{bonus['max_mana']} MP")
+                if item.get("restore_full"):
+                    bonus_parts.append("Restores Full HP/MP")
+                effect = ", ".join(bonus_parts) if bonus_parts else "No effect"
+
+                print(f"{color}  [{idx + 1}] {item['name']} ({price} coins) - {effect}")
+
+            if skill_offer:
+                skill_price = int(skill_base_price(skill_offer) * multiplier)
+                skill_color = Fore.GREEN if self.player_data["coins"] >= skill_price else Fore.RED
+                effect = skill_offer.get("effect",f"{skill_offer['damage']} dmg, {skill_offer['attacks']} hit(s), costs {skill_offer['mana_cost']} MP")
+                print(f"{skill_color}  [S] {skill_offer['name']} ({skill_price} coins) (Skill) - {effect}")
+
+            print(Fore.CYAN + "  [E] Exit shop")
+            choice = self.ask(Fore.GREEN + "> ").strip().lower()
+
+            if choice in ["e", "exit", "leave"]:
+                print(Fore.YELLOW + "You leave the shop.")
+                return
+
+            if choice in ["s"] and skill_offer:
+                if self.player_data["coins"] >= skill_base_price(skill_offer):
+                    if not buy_skill(self.player_data, skill_offer):
+                        print(Fore.RED + "You already know that skill.")
+                        self.pause("denied")
+                    else:
+                        print(Fore.MAGENTA + f"You learned {skill_offer['name']}!")
+                        self.save_to_file()
+                        self.pause("notice")
+                        return  # Exit after purchase
+                else:
+                    print(Fore.RED + "Not enough coins.")
+                    self.pause("denied")
                 continue
 
-            level = pdata.get("level", 1)
-            if name == "George":
-                dice_str = f"{level}d4"
-                targetable = [m for m in monsters if m["health"] > 0]
-                if targetable:
-                    target = random.choice(targetable)
-                    dmg = roll_dice(dice_str)
-                    target["health"] -= dmg
-                    print(Fore.YELLOW + f"George strikes {target['name']} for {dmg} damage.")
-            elif name == "Lucian":
-                dice_str = f"{level}d2"
-                dmg = roll_dice(dice_str)
-                for m in monsters:
-                    if m["health"] > 0:
-                        m["health"] -= dmg
-                print(Fore.YELLOW + f"Lucian hits all enemies for {dmg} damage.")
-            elif name == "Ilana":
-                dice_str = f"{level}d2"
-                heal = roll_dice(dice_str)
-                for ally in characters:
-                    apath = os.path.join(save_directory, f"{ally}.json")
-                    if not os.path.exists(apath):
-                        continue
-                    with open(apath, "r") as af:
-                        adata = json.load(af)
-                    ap = adata["player"]
-                    apstats = adata["persistent_stats"]
-                    if apstats.get("is_dead"):
-                        continue
-                    old = ap["health"]
-                    ap["health"] = min(ap["max_health"], ap["health"] + heal)
-                    healed = ap["health"] - old
-                    if healed > 0:
-                        print(Fore.CYAN + f"Ilana heals {ally} for {healed} HP.")
-                    with open(apath, "w") as af:
-                        json.dump(adata, af, indent=4)
-        except Exception as e:
-            print(Fore.RED + f"[ERROR] Ally effect for {name}: {e}")
-
-def combat(player_data, monsters):
-    global current_monster_group
-    while player_data["health"] > 0 and any(m["health"] > 0 for m in monsters):
-        clear_screen()
-        # UI Display
-        xp_bar = f"{Fore.CYAN}{player_data['xp']}{Fore.GREEN}/{Fore.YELLOW}{player_data['xp_to_next']}{Fore.GREEN}"
-        player_bar = render_health_bar(player_data["health"], player_data["max_health"], color=Fore.GREEN)
-        mana_bar = render_health_bar(player_data["mana"], player_data["max_mana"], color=Fore.BLUE)
-
-        print(Fore.GREEN + f"{player_data['character']} (Lv{player_data['level']} {xp_bar})")
-        print(Fore.LIGHTBLACK_EX + f"Floor {persistent_stats['floor']} - Room {persistent_stats['room']}\n")
-
-        # Show other characters' status
-        print(Fore.LIGHTBLACK_EX + "--- Allies ---")
-        for name in characters:
-            if name == player_data["character"]:
-                continue
-            path = os.path.join(save_directory, f"{name}.json")
-            if not os.path.exists(path):
-                print(Fore.LIGHTBLACK_EX + f"{name}: (hasn't joined the battle)")
-                continue
             try:
-                with open(path, "r") as f:
-                    data = json.load(f)
-                stats = data.get("player", {})
-                dead = data.get("persistent_stats", {}).get("is_dead", False)
-                if dead:
-                    print(Fore.LIGHTBLACK_EX + f"{name}: (dead)")
+                idx = int(choice) - 1
+                if idx < 0 or idx >= len(shop_items):
+                    raise ValueError
+                item = shop_items[idx]
+                if buy_item(self.player_data, item):
+                    print(Fore.YELLOW + f"Purchased {item['name']}")
+                    self.save_to_file()
+                    self.pause("notice")
+                    return  # Exit after purchase
                 else:
-                    hp = stats.get("health", 0)
-                    max_hp = stats.get("max_health", 0)
-                    print(Fore.LIGHTBLACK_EX + f"{name}: {hp} / {max_hp} HP")
+                    print(Fore.RED + "Not enough coins.")
+                    self.pause("denied")
             except:
-                print(Fore.LIGHTBLACK_EX + f"{name}: (unreadable save)")
-        print("\n")
-        hp_text = f"{Fore.GREEN}HP: {player_data['health']} / {player_data['max_health']}"
-        mp_text = f"{Fore.BLUE}MP: {player_data['mana']} / {player_data['max_mana']}"
-        hp_bar = player_bar
-        mp_bar = mana_bar
-
-        # Align both bar labels
-        print(hp_text)
-        print(hp_bar)
-        print(mp_text)
-        print(mp_bar)
-
-        print(Fore.RED + "\n--- Monsters ---")
-        for idx, m in enumerate(monsters):
-            if m["health"] <= 0:
-                bar = render_health_bar(0, m["max_health"], color=Fore.BLACK)
-                print(Fore.RED + f"[{idx+1}] {m['name']} (defeated)")
-                print(bar)
-            else:
-                bar = render_health_bar(m["health"], m["max_health"], color=Fore.RED)
-                print(Fore.RED + f"[{idx+1}] {m['name']} HP: {m['health']} / {m['max_health']}")
-                print(bar)
+                print(Fore.RED + "Invalid choice.")
+                self.pause("invalid")
 
-        print(Fore.GREEN + "\n[1] Attack  [2] Use Skill  [3] Retreat  [4] Upgrade Menu  [5] Equipment  [6] Character Selection")
-        action = input(Fore.GREEN + "> ").strip().lower()
+    def generate_monster_group(self):
+        return monster_group(self.persistent_stats.get("monster_rotation_index", 0), self.rng("encounters"))
 
-        if action in ["1", "atk", "attack"]:
-            targets = [i for i, m in enumerate(monsters) if m["health"] > 0]
+    def rotate_monsters(self):
+        self.persistent_stats["monster_rotation_index"] = next_rotation(self.persistent_stats.get("monster_rotation_index", 0))
 
-            if len(targets) == 1:
-                choice = targets[0]
-            else:
-                print("Choose target:")
-                for i in targets:
-                    print(Fore.RED + f"  [{i + 1}] {monsters[i]['name']} ({monsters[i]['health']} HP)")
+    def combat_state(self, pdata, monsters):
+        # Everything combat_engine needs for one turn: the active character, the allies and the monsters
+        allies = []
+        for name in characters:
+            if name == pdata["character"]:
+                continue
+            data = self.party_store.get(name)
+            if data is None:
+                continue
+            stats = data["player"]
+            allies.append({
+                "name": name,
+                "level": stats.get("level", 1),
+                "health": stats["health"],
+                "max_health": stats["max_health"],
+                "is_dead": data["persistent_stats"].get("is_dead", False),
+            })
+        return make_state(pdata, monsters, allies, characters, self.persistent_stats["floor"])
+
+    def apply_combat_state(self, state, pdata, monsters):
+        # Copies a resolved turn back onto the live player, monsters and party saves
+        pdata.update(state["player"])
+        for m, new in zip(monsters, state["monsters"]):
+            m.update(new)
+        for ally in state["allies"]:
+            data = self.party_store.get(ally["name"])
+            if data["player"]["health"] != ally["health"]:
+                data["player"]["health"] = ally["health"]
+                self.party_store.mark_dirty(ally["name"])
+
+    def combat_odds(self, pdata, monsters):
+        """
+        Solves the rest of the fight from here and returns the odds text.
+        Solved fights are kept per monster group, player stats, allies and
+        floor, so every later turn (and the next fight against the same
+        group) reuses the states already worked out.
+        """
+        state = self.combat_state(pdata, monsters)
+        key = (tuple((m["name"], m["max_health"], m["damage"]) for m in monsters),
+               tuple((a["name"], a["level"]) for a in state["allies"] if not a["is_dead"]),
+               pdata["max_health"], pdata["damage"], state["floor"])
+        encounter = self.encounters.get(key)
+        if encounter is None:
+            if len(self.encounters) >= odds_cache_size:
+                self.encounters.clear()
+            encounter = self.encounters[key] = Encounter(pdata, monsters, state["allies"], state["floor"],
+                                                         buckets=odds_buckets, budget=odds_budget)
+        odds = encounter.solve(encounter.state_of(pdata, monsters), pdata["health"])
+        return (f"Odds (basic attacks): {100 * odds['win']:.0f}% win, ~{odds['turns']:.0f} turns, "
+                f"~{max(0, odds['hp_lost']):.0f} HP lost")
+
+    def combat(self, monsters):
+        outcome = None
+        rewards = []
+        auto = False  # the auto policy plays the rest of the fight, until a key is pressed
+        while self.player_data["health"] > 0 and any(m["health"] > 0 for m in monsters):
+            self.clear_screen()
+            # UI Display
+            xp_bar = f"{Fore.CYAN}{self.player_data['xp']}{Fore.GREEN}/{Fore.YELLOW}{self.player_data['xp_to_next']}{Fore.GREEN}"
+            player_bar = render_health_bar(self.player_data["health"], self.player_data["max_health"], color=Fore.GREEN)
+            mana_bar = render_health_bar(self.player_data["mana"], self.player_data["max_mana"], color=Fore.BLUE)
+
+            print(Fore.GREEN + f"{self.player_data['character']} (Lv{self.player_data['level']} {xp_bar})")
+            print(Fore.LIGHTBLACK_EX + f"Floor {self.persistent_stats['floor']} - Room {self.persistent_stats['room']}\n")
+
+            # Show other characters' status
+            print(Fore.LIGHTBLACK_EX + "--- Allies ---")
+            for name in characters:
+                if name == self.player_data["character"]:
+                    continue
                 try:
-                    choice = int(input("> ")) - 1
-                    if choice not in targets:
-                        print(Fore.RED + "Invalid target.")
-                        time.sleep(0.5)
+                    data = self.party_store.get(name)
+                    if data is None:
+                        print(Fore.LIGHTBLACK_EX + f"{name}: (hasn't joined the battle)")
                         continue
+                    stats = data["player"]
+                    dead = data["persistent_stats"].get("is_dead", False)
+                    if dead:
+                        print(Fore.LIGHTBLACK_EX + f"{name}: (dead)")
+                    else:
+                        hp = stats.get("health", 0)
+                        max_hp = stats.get("max_health", 0)
+                        print(Fore.LIGHTBLACK_EX + f"{name}: {hp} / {max_hp} HP")
                 except:
-                    print(Fore.RED + "Invalid input.")
-                    time.sleep(0.5)
-                    continue
-
-            dmg = sum(random.randint(1, 2) for _ in range(player_data.get("damage", 1)))  # Roll a bunch of d2's
-            dmg = int(dmg * random.uniform(0.9, 1.2))  # then randomize it even more!
-            monsters[choice]["health"] -= dmg
-            print(Fore.GREEN + f"You dealt {dmg} damage to {monsters[choice]['name']}.")
-            restore_amount = max(1, player_data["max_mana"] // 10)
-            player_data["mana"] = min(player_data["mana"] + restore_amount, player_data["max_mana"])
-            apply_party_idle_effects(player_data["character"], monsters)
-
-        elif action in ["2", "skill", "useskill", "skl"]:
-            skills = player_data.get("skills", [])
-            if not skills:
-                print(Fore.RED + "No skills available.")
-                time.sleep(0.5)
-                continue
-            for i, skill in enumerate(skills):
-                cost = player_data["skill_data"]["mana_costs"][i]
-                color = Fore.GREEN if player_data["mana"] >= cost else Fore.RED
-                print(f"{color}  [{i + 1}] {skill} - Mana Cost: {cost}")
-            print(Fore.CYAN + "Type a number to use a skill or type 'cancel' to go back.")
-            skill_choice = input(Fore.GREEN + "> ").strip().lower()
-
-            if skill_choice in ["cancel", "exit", "back"]:
-                continue
-
-            try:
-                idx = int(skill_choice) - 1
-                if idx < 0 or idx >= len(skills):
-                    raise ValueError
-                skill_name = skills[idx]
-                sd = player_data["skill_data"]
-                cost = sd["mana_costs"][idx]
+                    print(Fore.LIGHTBLACK_EX + f"{name}: (unreadable save)")
+            print("\n")
+            hp_text = f"{Fore.GREEN}HP: {self.player_data['health']} / {self.player_data['max_health']}"
+            mp_text = f"{Fore.BLUE}MP: {self.player_data['mana']} / {self.player_data['max_mana']}"
+            hp_bar = player_bar
+            mp_bar = mana_bar
+
+            # Align both bar labels
+            print(hp_text)
+            print(hp_bar)
+            print(mp_text)
+            print(mp_bar)
+
+            print(Fore.RED + "\n--- Monsters ---")
+            for idx, m in enumerate(monsters):
+                if m["health"] <= 0:
+                    bar = render_health_bar(0, m["max_health"], color=Fore.BLACK)
+                    print(Fore.RED + f"[{idx+1}] {m['name']} (defeated)")
+                    print(bar)
+                else:
+                    bar = render_health_bar(m["health"], m["max_health"], color=Fore.RED)
+                    print(Fore.RED + f"[{idx+1}] {m['name']} HP: {m['health']} / {m['max_health']}")
+                    print(bar)
+            if self.show_odds and not self.turbo:  # only for show, and the slowest part of a turn
+                print(Fore.LIGHTBLACK_EX + self.combat_odds(self.player_data, monsters))
 
-                if player_data["mana"] < cost:
-                    print(Fore.RED + "Not enough mana.")
-                    time.sleep(0.5)
-                    continue
+            print(Fore.GREEN + "\n[1] Attack  [2] Use Skill  [3] Retreat  [4] Upgrade Menu  [5] Equipment  [6] Character Selection  [7] Auto")
+            action = "auto" if auto else self.ask(Fore.GREEN + "> ").strip().lower()
 
-                # Now consume mana only after this point
+            if action in ["1", "atk", "attack"]:
                 targets = [i for i, m in enumerate(monsters) if m["health"] > 0]
-                if not targets:
-                    print(Fore.YELLOW + "No valid targets.")
-                    continue
-
-                player_data["mana"] -= cost
-                attacks = sd["attacks"][idx]
-                dmg_str = sd["damage"][idx]
 
-                if attacks == 1:
+                if len(targets) == 1:
+                    choice = targets[0]
+                else:
                     print("Choose target:")
                     for i in targets:
-                        print(f"  [{i + 1}] {monsters[i]['name']} ({monsters[i]['health']} HP)")
+                        print(Fore.RED + f"  [{i + 1}] {monsters[i]['name']} ({monsters[i]['health']} HP)")
                     try:
-                        target_idx = int(input("> ")) - 1
-                        if target_idx not in targets:
+                        choice = int(self.ask("> ")) - 1
+                        if choice not in targets:
                             print(Fore.RED + "Invalid target.")
-                            player_data["mana"] += cost  # Refund mana
+                            self.pause("invalid")
                             continue
-                        dmg = roll_dice(dmg_str)
-                        monsters[target_idx]["health"] -= dmg
-                        print(Fore.MAGENTA + f"{skill_name} hits {monsters[target_idx]['name']} for {dmg} damage.")
                     except:
-                        print(Fore.RED + "Skill cancelled.")
-                        player_data["mana"] += cost
+                        print(Fore.RED + "Invalid input.")
+                        self.pause("invalid")
                         continue
-                else:
-                    for _ in range(attacks):
-                        valid_targets = [m for m in monsters if m["health"] > 0]
-                        if not valid_targets:
-                            break
-                        target = random.choice(valid_targets)
-                        dmg = roll_dice(dmg_str)
-                        target["health"] -= dmg
-                        print(Fore.MAGENTA + f"{skill_name} hits {target['name']} for {dmg} damage.")
-
-                healing = sd["healing"][idx]
-                if healing:
-                    heal = roll_dice(f"{healing}d4")
-                    pre_heal = player_data["health"]
-                    player_data["health"] = min(player_data["health"] + heal, player_data["max_health"])
-                    used = player_data["health"] - pre_heal
-                    overflow = heal - used
-                    print(Fore.CYAN + f"You heal for {used} HP.")
-                    if overflow > 0:
-                        print(Fore.CYAN + f"{overflow} HP overflowed to allies.")
-                        heal_other_characters(overflow, player_data["character"])
-                        time.sleep(1)
-            except:
-                print(Fore.RED + "Skill failed or canceled.")
-                time.sleep(0.5)
-                continue
 
-        elif action in ["3", "retreat", "ret", "esc", "escape"]:
-            if random.random() < 0.75:
-                print(Fore.YELLOW + "You successfully fled the battle!")
-                current_monster_group = None
-                persistent_stats["current_monsters"] = None
-                save_to_file()
-                time.sleep(0.5)
-                clear_screen()
-                return True  # Acts like a victory, but no rewards
-            else:
-                print(Fore.RED + "Retreat failed! The monsters attack!")
-                for m in monsters:
-                    if m["health"] > 0:
-                        player_data["health"] -= m["damage"]
-                        print(Fore.RED + f"{m['name']} hits you for {m['damage']}")
-                save_to_file()
-                time.sleep(1)
-                continue
+                turn = {"type": "attack", "target": choice}
 
-        elif action in ["4", "level", "upgrade", "xp"]:
-            open_upgrade_menu()
-            continue
+            elif action in ["2", "skill", "useskill", "skl"]:
+                skills = self.player_data.get("skills", [])
+                if not skills:
+                    print(Fore.RED + "No skills available.")
+                    self.pause("denied")
+                    continue
+                for i, skill in enumerate(skills):
+                    cost = self.player_data["skill_data"]["mana_costs"][i]
+                    color = Fore.GREEN if self.player_data["mana"] >= cost else Fore.RED
+                    print(f"{color}  [{i + 1}] {skill} - Mana Cost: {cost}" + Fore.LIGHTBLACK_EX + f"  {skill_hint(self.player_data['skill_data'], i)}")
+                print(Fore.CYAN + "Type a number to use a skill or type 'cancel' to go back.")
+                skill_choice = self.ask(Fore.GREEN + "> ").strip().lower()
+
+                if skill_choice in ["cancel", "exit", "back"]:
+                    continue
 
-        elif action in ["5", "inventory", "inv"]:
-            open_inventory_menu()
-            continue
+                try:
+                    idx = int(skill_choice) - 1
+                    if idx < 0 or idx >= len(skills):
+                        raise ValueError
+                    sd = self.player_data["skill_data"]
+
+                    if self.player_data["mana"] < sd["mana_costs"][idx]:
+                        print(Fore.RED + "Not enough mana.")
+                        self.pause("denied")
+                        continue
 
-        elif action in ["6", "exit", "leave"]:
-            print(Fore.YELLOW + "Exiting to main menu...")
-            save_to_file()
-            time.sleep(0.5)
-            clear_screen()
-            return "exit"
+                    targets = [i for i, m in enumerate(monsters) if m["health"] > 0]
+                    if not targets:
+                        print(Fore.YELLOW + "No valid targets.")
+                        continue
 
-        else:
-            print(Fore.RED + "Invalid action.")
-            time.sleep(0.5)
-            continue
-
-        # Enemy Turn
-        for m in monsters:
-            if m["health"] > 0:
-                player_data["health"] -= m["damage"]
-                print(Fore.RED + f"{m['name']} hits you for {m['damage']}")
-        save_to_file()
-        time.sleep(1)
-
-    if player_data["health"] <= 0:
-        print(Fore.RED + "You have died.")
-        persistent_stats["is_dead"] = True
-        save_to_file()
-        time.sleep(0.5)
-        clear_screen()
-        return False
-    else:
-        current_monster_group = None
-        persistent_stats["current_monsters"] = None
-        save_to_file()
-        # Calculate coin reward
-        min_reward = 5 + persistent_stats["floor"]  # e.g. floor 3 = min 8 coins
-        coin_total = sum((m["damage"] + m["health"] // 2) for m in monsters)
-        coin_reward = max(min_reward, int(random.uniform(0.75, 1.25) * coin_total))
-        player_data["coins"] += coin_reward
-        print(Fore.YELLOW + f"You found {coin_reward} coins!")
-        # Grant Xp
-        xp_total = sum((m["damage"] * 2 + 2) for m in monsters)
-        gain_xp(int(xp_total * 1.5))
-        press_enter()
-        return True
+                    turn = {"type": "skill", "index": idx}
+                    if sd["attacks"][idx] == 1:
+                        print("Choose target:")
+                        for i in targets:
+                            print(f"  [{i + 1}] {monsters[i]['name']} ({monsters[i]['health']} HP)")
+                        try:
+                            target_idx = int(self.ask("> ")) - 1
+                        except:
+                            print(Fore.RED + "Skill cancelled.")
+                            continue
+                        if target_idx not in targets:
+                            print(Fore.RED + "Invalid target.")
+                            continue
+                        turn["target"] = target_idx
+                except:
+                    print(Fore.RED + "Skill failed or canceled.")
+                    self.pause("invalid")
+                    continue
 
-def explore_floor():
-    global current_monster_group
-    floor = persistent_stats["floor"]
-    room = persistent_stats["room"]
-
-    # === Forced boss fight if room exceeds 10 ===
-    # === Boss chance after room 10 ===
-    if room > 10 and random.random() < 0.40:
-        print(Fore.RED + "A powerful enemy blocks your path!")
-        boss = get_boss(floor).copy()
-        boss["max_health"] = boss["health"]
-        current_monster_group = [boss]
-        clear_screen()
-        print(Fore.RED + Style.BRIGHT + "\n" + "=" * 50)
-        print(Fore.MAGENTA + Style.BRIGHT + "!!! RANDOM BOSS ENCOUNTER !!!".center(50))
-        print("=" * 50)
-        print("\n" + rainbow_text(boss["name"].center(50)))
-        print("=" * 50 + "\n")
-        time.sleep(3)
-        result = combat(player_data, current_monster_group)
+            elif action in ["3", "retreat", "ret", "esc", "escape"]:
+                turn = {"type": "retreat"}
 
-        if result == "exit":
-            return "exit"
-        elif result is False:
-            print("You died to the boss...")
-            return False
+            elif action in ["4", "level", "upgrade", "xp"]:
+                self.open_upgrade_menu()
+                continue
 
-        print(Fore.GREEN + Style.BRIGHT + "\n=== BOSS DEFEATED! FLOOR ADVANCED! ===")
-        time.sleep(1)
-        persistent_stats["room"] = 1
-        persistent_stats["floor"] += 1
-        rotate_monsters()
+            elif action in ["5", "inventory", "inv"]:
+                self.open_inventory_menu()
+                continue
 
-        current_monster_group = None
-        persistent_stats["current_monsters"] = None
+            elif action in ["6", "exit", "leave"]:
+                print(Fore.YELLOW + "Exiting to main menu...")
+                self.save_to_file(compact=True)
+                self.pause("transition")
+                self.clear_screen()
+                return "exit"
+
+            elif action in ["7", "auto"]:
+                state = self.combat_state(self.player_data, monsters)
+                turn = self.auto().combat_action(state, self.rng("combat", "auto"))
+                problem = check_action(state, turn)
+                if problem:
+                    print(Fore.RED + f"The auto player chose an invalid action: {problem}")
+                    auto = False
+                    self.pause("invalid")
+                    continue
+                auto = True
+                print(Fore.LIGHTBLACK_EX + f"Auto: {describe_turn(turn, self.player_data, monsters)} (press any key to take over)")
 
-        save_to_file()
-        backup_path = global_save_path.replace(".json", f"_backup_floor{floor}.json")
-        with open(backup_path, "w") as f:
-            json.dump({"player": player_data, "persistent_stats": persistent_stats}, f, indent=4)
+            else:
+                print(Fore.RED + "Invalid action.")
+                self.pause("invalid")
+                continue
 
-        return True
+            outcome, events = self.take_turn(monsters, turn)
+            rewards = [e for e in events if e["type"] in reward_events]
+            show_combat_events([e for e in events if e["type"] not in reward_events])
 
-    # Handle active combat if it exists (from a saved battle)
-    if current_monster_group is not None:
-        result = combat(player_data, current_monster_group)
-        if result == "exit":
-            return "exit"
-        elif result is False:
-            print("You died...")
+            if outcome == "fled":
+                self.pause("transition")
+                self.clear_screen()
+                return True  # Acts like a victory, but no rewards
+            if auto:
+                auto = not self.auto_interrupted()
+            else:
+                self.pause("turn")
+
+        rewards = self.end_combat(monsters, outcome, rewards)
+        if rewards is None:
+            print(Fore.RED + "You have died.")
+            self.pause("transition")
+            self.clear_screen()
             return False
-        elif result is None:
-            print("You retreated.")
+        else:
+            show_combat_events(rewards)
+            self.press_enter()
             return True
 
-    # Regular rooms (10 per floor)
-    for _ in range(10):
-        persistent_stats["room"] += 1
-
-        # Guaranteed room logic
-        guaranteed_shop = persistent_stats.get("rooms_since_shop", 0) >= 10
-        guaranteed_treasure = persistent_stats.get("rooms_since_treasure", 0) >= 20
-
-        rand = random.random()
-        shop_trigger = rand < 0.10 or guaranteed_shop
-        treasure_trigger = rand < 0.15 or guaranteed_treasure
+    def take_turn(self, monsters, turn):
+        """
+        Plays turn (a combat_engine action) against monsters and saves it.
+        Returns the outcome (None while the fight goes on) and the events.
+        """
+        # Everything after the player's choice (allies, enemy turn, rewards) is combat_engine's job
+        state, events = resolve_turn(self.combat_state(self.player_data, monsters), turn, self.rng("combat"))
+        self.apply_combat_state(state, self.player_data, monsters)
+        self.persistent_stats["turns"] += 1
+        self.counts["turns"] += 1
+        if profiler is not None:
+            profiler.end_turn()
+        if state["outcome"] == "fled":
+            self.current_monster_group = None
+            self.persistent_stats["current_monsters"] = None
+        self.save_to_file()
+        return state["outcome"], events
+
+    def end_combat(self, monsters, outcome, rewards):
+        """
+        Settles a fight that's over: the character's death, or the rewards
+        (paid out here if the group was already beaten when the fight was
+        resumed). Returns the reward events, or None if the character died.
+        """
+        if self.player_data["health"] <= 0:
+            self.persistent_stats["is_dead"] = True
+            self.save_to_file(compact=True)
+            return None
+        if outcome != "won":
+            state = self.combat_state(self.player_data, monsters)
+            rewards = grant_rewards(state, self.rng("combat", "rewards"))
+            self.apply_combat_state(state, self.player_data, monsters)
+        self.current_monster_group = None
+        self.persistent_stats["current_monsters"] = None
+        self.save_to_file()
+        return rewards
+
+    def explore_floor(self):
+        floor = self.persistent_stats["floor"]
+        room = self.persistent_stats["room"]
+
+        # === Forced boss fight if room exceeds 10 ===
+        # === Boss chance after room 10 ===
+        if room > 10 and self.rng("rooms", "boss").random() < 0.40:
+            print(Fore.RED + "A powerful enemy blocks your path!")
+            self.current_monster_group = boss_group(self.persistent_stats.get("monster_rotation_index", 0))
+            boss = self.current_monster_group[0]
+            self.clear_screen()
+            print(Fore.RED + Style.BRIGHT + "\n" + "=" * 50)
+            print(Fore.MAGENTA + Style.BRIGHT + "!!! RANDOM BOSS ENCOUNTER !!!".center(50))
+            print("=" * 50)
+            print("\n" + rainbow_text(boss["name"].center(50)))
+            print("=" * 50 + "\n")
+            self.pause("boss_intro")
+            result = self.combat(self.current_monster_group)
+
+            if result == "exit":
+                return "exit"
+            elif result is False:
+                print("You died to the boss...")
+                return False
+
+            print(Fore.GREEN + Style.BRIGHT + "\n=== BOSS DEFEATED! FLOOR ADVANCED! ===")
+            self.pause("victory")
+            self.persistent_stats["room"] = 1
+            self.persistent_stats["floor"] += 1
+            self.rotate_monsters()
+
+            self.current_monster_group = None
+            self.persistent_stats["current_monsters"] = None
+
+            self.save_to_file(compact=True, backup_floor=floor)
 
-        if shop_trigger and player_data.get("coins", 0) > 0:
-            open_shop()
-            persistent_stats["rooms_since_shop"] = 0
-            save_to_file()
-            continue
-        elif treasure_trigger:
-            open_treasure_room()
-            persistent_stats["rooms_since_treasure"] = 0
-            save_to_file()
-            continue
+            return True
 
-        persistent_stats["rooms_since_shop"] += 1
-        persistent_stats["rooms_since_treasure"] += 1
+        # Handle active combat if it exists (from a saved battle)
+        if self.current_monster_group is not None:
+            result = self.combat(self.current_monster_group)
+            if result == "exit":
+                return "exit"
+            elif result is False:
+                print("You died...")
+                return False
+            elif result is None:
+                print("You retreated.")
+                return True
+
+        # Regular rooms (10 per floor)
+        for _ in range(10):
+            self.persistent_stats["room"] += 1
+            self.counts["rooms"] += 1
+
+            kind = room_kind(self.persistent_stats, self.player_data.get("coins", 0), self.rng("rooms"))
+            if kind == "shop":
+                self.open_shop()
+                self.persistent_stats["rooms_since_shop"] = 0
+                self.save_to_file()
+                continue
+            elif kind == "treasure":
+                self.open_treasure_room()
+                self.persistent_stats["rooms_since_treasure"] = 0
+                self.save_to_file()
+                continue
 
-        # Generate new monster group and fight
-        current_monster_group = generate_monster_group()
-        result = combat(player_data, current_monster_group)
+            self.persistent_stats["rooms_since_shop"] += 1
+            self.persistent_stats["rooms_since_treasure"] += 1
+
+            # Generate new monster group and fight
+            self.current_monster_group = self.generate_monster_group()
+            result = self.combat(self.current_monster_group)
+
+            if result == "exit":
+                return "exit"
+            elif result is False:
+                print("You died...")
+                return False
+            elif result is None:
+                print("You retreated.")
+                return True
+
+            # Clear monster state after successful combat
+            self.current_monster_group = None
+            self.persistent_stats["current_monsters"] = None
+            self.save_to_file()
+
+        # Boss encounter
+        self.current_monster_group = boss_group(self.persistent_stats.get("monster_rotation_index", 0))
+        boss = self.current_monster_group[0]
+        self.clear_screen()
+        print(Fore.RED + Style.BRIGHT + "\n" + "=" * 50)
+        print(Fore.MAGENTA + Style.BRIGHT + "!!! BOSS ENCOUNTER !!!".center(50))
+        print("=" * 50)
+        print("\n" + rainbow_text(boss["name"].center(50)))
+        print("=" * 50 + "\n")
+        self.pause("boss_intro")
+        result = self.combat(self.current_monster_group)
 
         if result == "exit":
             return "exit"
         elif result is False:
-            print("You died...")
+            print("You died to the boss...")
             return False
-        elif result is None:
-            print("You retreated.")
-            return True
 
-        # Clear monster state after successful combat
-        current_monster_group = None
-        persistent_stats["current_monsters"] = None
-        save_to_file()
-
-    # Boss encounter
-    boss = get_boss(floor).copy()
-    boss["max_health"] = boss["health"]
-    current_monster_group = [boss]
-    clear_screen()
-    print(Fore.RED + Style.BRIGHT + "\n" + "=" * 50)
-    print(Fore.MAGENTA + Style.BRIGHT + "!!! BOSS ENCOUNTER !!!".center(50))
-    print("=" * 50)
-    print("\n" + rainbow_text(boss["name"].center(50)))
-    print("=" * 50 + "\n")
-    time.sleep(2)
-    result = combat(player_data, current_monster_group)
-
-    if result == "exit":
-        return "exit"
-    elif result is False:
-        print("You died to the boss...")
-        return False
+        # Boss defeated — reset room, advance floor, rotate monsters
+        print(Fore.GREEN + Style.BRIGHT + "\n=== BOSS DEFEATED! FLOOR COMPLETE! ===")
+        self.pause("victory")
+        self.persistent_stats["room"] = 1
+        self.persistent_stats["floor"] += 1
+        self.rotate_monsters()
 
-    # Boss defeated — reset room, advance floor, rotate monsters
-    print(Fore.GREEN + Style.BRIGHT + "\n=== BOSS DEFEATED! FLOOR COMPLETE! ===")
-    time.sleep(1)
-    persistent_stats["room"] = 1
-    persistent_stats["floor"] += 1
-    rotate_monsters()
+        # Clear any remaining monster state
+        self.current_monster_group = None
+        self.persistent_stats["current_monsters"] = None
 
-    # Clear any remaining monster state
-    current_monster_group = None
-    persistent_stats["current_monsters"] = None
+        # Save and backup
+        self.save_to_file(compact=True, backup_floor=floor)
 
-    # Save and backup
-    save_to_file()
-    backup_path = global_save_path.replace(".json", f"_backup_floor{floor}.json")
-    with open(backup_path, "w") as f:
-        json.dump({"player": player_data, "persistent_stats": persistent_stats}, f, indent=4)
+        return True
 
-    return True
+    def main(self):
+        return self.explore_floor()
 
-def main():
-    return explore_floor()
-
-def startup():
-    global current_save_name, global_save_path
-    while True:
-        clear_screen()
-        print(Fore.YELLOW + f"Eyum Terminal Adventure v{current_version}")
-        print(Fore.BLUE + "Choose your character or type 'exit' to quit:")
-        print(Fore.CYAN + "\nYou will control one character, but the others will act with you in battle.")
-        print(Fore.CYAN + "Lucian deals AoE damage, George hits a random enemy, Ilana heals everyone.\n")
-        # Create missing saves on boot
+    def create_missing_saves(self):
+        # New level 1 saves for the characters that don't have one yet
         for name in characters:
-            save_path = os.path.join(save_directory, f"{name}.json")
-            if not os.path.exists(save_path):
-                current_save_name = f"{name}.json"
-                global_save_path = save_path
-                base_stats = {
-                    "max_health": 25,
-                    "health": 25,
-                    "mana": 7,
-                    "max_mana": 7,
-                    "damage": 1,
-                }
-                if name == "Lucian":
-                    base_stats["mana"] += 3
-                    base_stats["max_mana"] += 3
-                elif name == "Ilana":
-                    base_stats["health"] += 5
-                    base_stats["max_health"] += 5
-                elif name == "George":
-                    base_stats["damage"] += 1
-
-                base = character_skills[name]
-                player_data.update({
-                    "character": name,
-                    "level": 1,
-                    "xp": 0,
-                    "xp_to_next": 10,
-                    "skill_points": 0,
-                    "skills": base["skills"],
-                    "skill_data": {
-                        "damage": base["damage"],
-                        "attacks": base["attacks"],
-                        "healing": base["healing"],
-                        "mana_costs": base["mana_costs"]
-                    },
-                    "learned_skills": {},
-                    "inventory": [],
-                    "equipped": [],
-                })
-                player_data["base_stats"] = base_stats.copy()
-                player_data.update(base_stats)
-                persistent_stats.update({
-                    "is_dead": False,
-                    "floor": 1,
-                    "room": 1,
-                })
-                apply_equipment_bonuses_for(player_data)
-                save_to_file()
-        list_saved_files()
-        choice = input(Fore.GREEN + "> ").strip().capitalize()
-        if choice.lower() == "exit":
-            print(Fore.RED + "Exiting...")
-            time.sleep(0.5)
-            clear_screen()
-            return "exit"
-        if choice.lower() == "reset":
-            confirm = input(
-                Fore.RED + "Are you sure? This will delete all character saves. Type 'yes' to confirm: ").strip().lower()
-            if confirm == "yes":
-                reset_game_state()
-                print(Fore.GREEN + "All save data deleted. Reinitializing...")
-                time.sleep(1)
-                return startup()
-            else:
-                print("Reset cancelled.")
-                time.sleep(1)
-                clear_screen()
+            if self.party_store.exists(name):
                 continue
-        if choice in characters:
-            current_save_name = f"{choice}.json"
-            global_save_path = os.path.join(save_directory, current_save_name)
-            if os.path.exists(global_save_path):
-                if not load_from_file(current_save_name):
+            self.save_path = self.character_save_path(name)
+            self.current_save_name = os.path.basename(self.save_path)
+            self.player_data.update(new_player(name))
+            self.persistent_stats.update({
+                "is_dead": False,
+                "floor": 1,
+                "room": 1,
+                "seed": None,
+                "turns": 0,
+            })
+            self.start_streams()
+            apply_equipment_bonuses_for(self.player_data)
+            self.save_to_file()
+
+    def startup(self):
+        while True:
+            self.clear_screen()
+            print(Fore.YELLOW + f"Eyum Terminal Adventure v{current_version}")
+            print(Fore.BLUE + "Choose your character or type 'exit' to quit:")
+            print(Fore.CYAN + "\nYou will control one character, but the others will act with you in battle.")
+            print(Fore.CYAN + "Lucian deals AoE damage, George hits a random enemy, Ilana heals everyone.\n")
+            self.list_saved_files()
+            if startup_timer is not None:
+                sys.stdout.flush()
+                startup_timer.mark("first menu")
+                startup_timer.report()
+                return "exit"
+            choice = self.ask(Fore.GREEN + "> ").strip().capitalize()
+            if choice.lower() == "exit":
+                print(Fore.RED + "Exiting...")
+                self.pause("transition")
+                self.clear_screen()
+                return "exit"
+            if choice.lower() == "reset":
+                confirm = self.ask(
+                    Fore.RED + "Are you sure? This will delete all character saves. Type 'yes' to confirm: ").strip().lower()
+                if confirm == "yes":
+                    self.reset_game_state()
+                    print(Fore.GREEN + "All save data deleted. Reinitializing...")
+                    self.pause("notice")
+                    return self.startup()
+                else:
+                    print("Reset cancelled.")
+                    self.pause("notice")
+                    self.clear_screen()
+                    continue
+            if choice in characters:
+                # The others fight alongside whoever is picked, so everyone needs a save by now
+                self.create_missing_saves()
+                self.save_path = self.character_save_path(choice)
+                self.current_save_name = os.path.basename(self.save_path)
+                if not self.load_from_file(self.current_save_name):
+                    # Back to the character list rather than quitting, the other characters may still load
                     print(f"{Fore.RED}Failed to load.")
-                    time.sleep(0.5)
-                    clear_screen()
-                    sys.exit()
-                if persistent_stats.get("is_dead", False):
+                    self.pause("notice")
+                    continue
+                if self.persistent_stats.get("is_dead", False):
                     print(f"{Fore.YELLOW}Character is dead. Delete save to retry by typing reset {Fore.RED}(THIS WILL RESET ALL CHARACTERS).")
-                    press_enter()
+                    self.press_enter()
                     continue
+                break
             else:
-                print(f"Creating new save for {choice}")
-                base_stats = {
-                    "max_health": 25,
-                    "health": 25,
-                    "mana": 7,
-                    "max_mana": 7,
-                    "damage": 1,
-                }
-
-                # Apply character-specific bonuses
-                if choice == "Lucian":
-                    base_stats["mana"] += 3
-                    base_stats["max_mana"] += 3
-                elif choice == "Ilana":
-                    base_stats["health"] += 5
-                    base_stats["max_health"] += 5
-                elif choice == "George":
-                    base_stats["damage"] += 1
-
-                base = character_skills[choice]
-                player_data.update({
-                    "character": choice,
-                    "level": 1,
-                    "xp": 0,
-                    "xp_to_next": 10,
-                    "skill_points": 0,
-                    "skills": base["skills"],
-                    "skill_data": {
-                        "damage": base["damage"],
-                        "attacks": base["attacks"],
-                        "healing": base["healing"],
-                        "mana_costs": base["mana_costs"]
-                    },
-                    "learned_skills": {},
-                    "inventory": [],
-                    "equipped": [],
-                })
-                player_data["base_stats"] = base_stats.copy()
-                player_data.update(base_stats)
-                persistent_stats.update({
-                    "is_dead": False,
-                    "floor": 1,
-                    "room": 1,
-                })
-                apply_equipment_bonuses_for(player_data)
-                save_to_file()
-            break
-        else:
-            print("Invalid character.")
-            time.sleep(0.5)
+                print("Invalid character.")
+                self.pause("invalid")
+
+    def play(self):
+        if self.party_store is None:
+            self.open_save_directory(self.save_directory)
+        try:
+            while True:
+                result = self.startup()
+                if result == "exit":
+                    break
+                while True:
+                    alive = self.main()
+                    if alive == "exit":
+                        print(Fore.YELLOW + "Returning to character select...")
+                        self.pause("transition")
+                        break  # Break inner loop, go to character select
+                    elif not alive:
+                        print(Fore.YELLOW + "Returning to character select...")
+                        self.pause("transition")
+                        break  # Break inner loop, go to character select
+                    # Otherwise continue exploring with the same character
+        finally:
+            self.party_store.write_index()
+
+    def open_save_directory(self, path):
+        # Points the game at another save folder (a replay's scratch copy)
+        self.save_directory = path
+        os.makedirs(self.save_directory, exist_ok=True)
+        self.party_store = self.new_party_store()
+
+    def save_settings(self):
+        return {"version": current_version, "save_format": self.save_format,
+                "save_backend": self.save_backend, "journal_saves": self.journal_saves,
+                "auto_policy": self.auto_policy}
+
+
+def record(session, path):
+    """
+    Plays session normally, recording every input and the saves before and
+    after into a replay file at path.
+    """
+    if session.seed_override is None:
+        session.seed_override = new_seed()  # new characters need a seed the replay can give them too
+    session.input_source = Recorder(session.seed_override, session.save_settings(), session.save_directory)
+    try:
+        session.play()
+    except (KeyboardInterrupt, EOFError):
+        pass
+    finally:
+        session.input_source.save(path, session.save_directory)
+        print(Style.RESET_ALL + f"Recorded {len(session.input_source.inputs)} inputs to {path}")
+
+def run_replay(path, show=False):
+    """
+    Plays a replay file back with no pauses or screen clears, starting from
+    a scratch copy of the saves it was recorded with, and reports how fast
+    it went. Returns True if it ended with exactly the recorded saves.
+    """
+    replay = read_replay(path)
+    settings = replay["settings"]
+    if settings["version"] != current_version:
+        print(Fore.YELLOW + f"Recorded with v{settings['version']}, replaying with v{current_version}")
+    session = GameSession(seed=replay["seed"], pacer=Pacer("instant"), turbo=True)
+    session.save_format, session.save_backend, session.journal_saves = (
+        settings["save_format"], settings["save_backend"], settings["journal_saves"])
+    session.auto_policy = settings.get("auto_policy", "lookahead")  # the default before it was recorded
+
+    import tempfile
+    scratch = tempfile.mkdtemp(prefix="eyum-replay-")
+    try:
+        restore(scratch, replay["start"])
+        session.open_save_directory(scratch)
+        session.input_source = ReplayInput(replay["inputs"])
+        terminal = sys.stdout
+        if not show:
+            sys.stdout = open(os.devnull, "w")
+        if profiler is not None:
+            sys.stdout = profiler.timed_stream(sys.stdout)
+        start = time.perf_counter()
+        try:
+            session.play()
+        except ReplayFinished:
+            pass
+        finally:
+            elapsed = max(time.perf_counter() - start, 1e-9)
+            if not show:
+                sys.stdout.close()
+            sys.stdout = terminal
+        if session.party_store.database is not None:
+            session.party_store.database.close()
+        mismatched = compare(replay["end"], snapshot(scratch))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    turns, rooms = session.counts["turns"], session.counts["rooms"]
+    print(Style.RESET_ALL + f"Replayed {session.input_source.position} inputs in {elapsed:.2f}s: "
+          f"{turns} turns ({turns / elapsed:.0f}/s), {rooms} rooms ({rooms / elapsed:.0f}/s)")
+    if mismatched:
+        print(Fore.RED + "Saves differ from the recording: " + ", ".join(mismatched) + Style.RESET_ALL)
+        return False
+    print(Fore.GREEN + f"Saves match the recording byte for byte ({len(replay['end'])} files)" + Style.RESET_ALL)
+    return True
+
+def start_profiler():
+    """
+    Times the game's phases until the end of the session (--profile):
+    waiting for input, drawing, saving and loading, reading and writing the
+    allies' saves, dice and random streams, and pauses. The rest is "other".
+    """
+    global profiler
+    from profiler import Profiler
+    from dice import Dice
+    profiler = Profiler()
+    for name, phase in (("ask", "input"), ("clear_screen", "render"), ("save_to_file", "save"),
+                        ("load_from_file", "load"), ("combat_odds", "odds")):
+        profiler.instrument(GameSession, name, phase)
+    # PartyStore's reads and writes are the other characters' saves (with SQLite the active one shares the transaction)
+    profiler.instrument(PartyStore, "read", "ally saves")
+    profiler.instrument(PartyStore, "flush_saves", "ally saves")
+    profiler.instrument(Dice, "roll", "rng/dice")
+    profiler.instrument(RngStreams, "stream", "rng/dice")
+    profiler.instrument(Pacer, "wait", "sleep")
 
 if __name__ == "__main__":
-    while True:
-        result = startup()
-        if result == "exit":
-            break
-        while True:
-            alive = main()
-            if alive == "exit":
-                print(Fore.YELLOW + "Returning to character select...")
-                time.sleep(1.5)
-                break  # Break inner loop, go to character select
-            elif not alive:
-                print(Fore.YELLOW + "Returning to character select...")
-                time.sleep(1.5)
-                break  # Break inner loop, go to character select
-            # Otherwise continue exploring with the same character
+    parser = argparse.ArgumentParser(description="Eyum Terminal Adventure")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed for new characters, so the same choices replay the same run")
+    parser.add_argument("--pace", choices=list(profiles),
+                        help="how long the game pauses after things happen (default: normal, or instant when input is piped)")
+    parser.add_argument("--record", metavar="FILE", help="record this session's inputs and saves to a replay file")
+    parser.add_argument("--replay", metavar="FILE", help="play a replay file back at full speed and check the saves match")
+    parser.add_argument("--show", action="store_true", help="with --replay, print the game output too")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="show where the time goes before the first menu (imports and startup steps), then exit")
+    parser.add_argument("--profile", action="store_true",
+                        help="time input, drawing, saves, dice and pauses, and show the totals and per-turn percentiles on exit")
+    parser.add_argument("--serve", type=int, metavar="PORT",
+                        help="host games for many players over TCP (telnet) instead of playing here, see server.py")
+    parser.add_argument("--host", default="127.0.0.1", help="with --serve, the address to listen on (0.0.0.0 for everyone)")
+    parser.add_argument("--odds", action="store_true",
+                        help="show the solved odds of each fight on the combat screen (slow for big groups, and with --serve for many players)")
+    parser.add_argument("--engine", action="store_true",
+                        help="read JSON commands from stdin and write the state and events as JSON lines, see engine.py")
+    args = parser.parse_args()
+    if startup_timer is not None:
+        startup_timer.mark("module loaded")
+
+    if args.profile:
+        start_profiler()
+
+    terminal = sys.stdout
+    screen = None
+    try:
+        if args.replay:
+            sys.exit(0 if run_replay(args.replay, args.show) else 1)
+        sys.modules.setdefault("main", sys.modules["__main__"])  # so server.py and engine.py import this module, not a second copy
+        if args.serve is not None:
+            import server
+            server.serve(args.serve, args.host, args.pace or "normal", show_odds=args.odds)
+            sys.exit(0)
+        if args.engine:
+            import engine
+            engine.run(args.seed)
+            sys.exit(0)
+        fix_windows_console()
+        if supports_ansi(sys.stdout):
+            screen = Screen(sys.stdout)
+            sys.stdout = screen
+        if profiler is not None:
+            sys.stdout = profiler.timed_stream(sys.stdout)
+        session = GameSession(seed=args.seed, pacer=Pacer(args.pace) if args.pace else None, screen=screen)
+        session.show_odds = show_odds or args.odds
+        if args.record:
+            record(session, args.record)
+        else:
+            session.play()
+    finally:
+        if screen is not None:
+            screen.flush()
+        sys.stdout = terminal
+        if profiler is not None:
+            profiler.report()
@@ -8,7 +8,7 @@ import platform
 import json
 
 from game_data import drop_table, skill_table, monster_list
-from main import explore_floor
+from dice import parse, dice
 
 # === Constants and Globals ===
 current_version = "0.1"
@@ -109,11 +109,9 @@ def roll_dice(dice_str):
             raise ValueError("roll_dice received integer; expected 'XdY' string")
         if not isinstance(dice_str, str):
             raise ValueError("Dice input must be string or int")
-        dice_str = dice_str.lower()
-        if dice_str == "none":
+        if dice_str.lower() == "none":
             return 0
-        num, sides = map(int, dice_str.split('d'))
-        return sum(random.randint(1, sides) for _ in range(num))
+        return parse(dice_str).roll()
     except Exception as e:
         print(Fore.RED + f"Invalid dice format '{dice_str}': {e}")
         return 0
@@ -695,7 +693,7 @@ def player_attack():
         press_enter()
         return False
 
-    dmg = sum(random.randint(1, 2) for _ in range(dmg_rolls))
+    dmg = dice(dmg_rolls, 2).roll()
     current_monster_group[choice]["health"] = max(0, current_monster_group[choice]["health"] - dmg)
     print(Fore.YELLOW + f"You deal {dmg} damage to {current_monster_group[choice]['name']}!")
     return True
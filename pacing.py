@@ -0,0 +1,118 @@
+# pacing.py
+# How long the game waits after things happen. Every pause names what
+# kind of event it's for, and the pacing profile decides how long that is:
+#   cinematic  longer pauses, to take it all in
+#   normal     the usual pace
+#   fast       just long enough to read
+#   instant    no waiting at all (used automatically when input isn't a terminal)
+# Pressing any key during a pause skips the rest of it.
+import os
+import sys
+import time
+
+try:
+    import msvcrt  # Windows
+except ImportError:
+    msvcrt = None
+try:
+    import tty
+    import select
+    import termios
+except ImportError:  # not on Windows
+    termios = None
+
+event_types = ("invalid", "denied", "notice", "turn", "auto", "treasure", "boss_intro", "victory", "transition")
+
+# Seconds to wait for each event type:
+#   invalid     bad input          denied      not enough coins/mana/points
+#   notice      something worked   turn        after each combat turn
+#   auto        after each turn the auto player plays, a key press takes over
+#   treasure    between treasure room lines
+#   boss_intro  the boss banner    victory     boss defeated
+#   transition  leaving a fight or menu
+profiles = {
+    "cinematic": {"invalid": 0.75, "denied": 1.5, "notice": 1.5, "turn": 1.5, "auto": 2.0, "treasure": 1.5,
+                  "boss_intro": 4.0, "victory": 2.0, "transition": 1.5},
+    "normal": {"invalid": 0.5, "denied": 1.0, "notice": 1.0, "turn": 1.0, "auto": 1.25, "treasure": 1.0,
+               "boss_intro": 2.5, "victory": 1.0, "transition": 1.0},
+    "fast": {"invalid": 0.2, "denied": 0.3, "notice": 0.3, "turn": 0.25, "auto": 0.5, "treasure": 0.25,
+             "boss_intro": 0.75, "victory": 0.3, "transition": 0.2},
+    "instant": dict.fromkeys(event_types, 0.0),
+}
+
+
+def default_profile(stream=None):
+    # Nobody is watching when input is piped in, so don't wait for them
+    stream = stream or sys.stdin
+    try:
+        return "normal" if stream.isatty() else "instant"
+    except (AttributeError, ValueError):
+        return "instant"
+
+
+class Pacer:
+    """
+    Waits for the delay the profile gives each event type. Change single
+    delays with pacer.delays[event] = seconds. waited adds up how long was
+    actually spent waiting.
+    """
+
+    def __init__(self, profile="normal", skip_on_key=True, stream=None):
+        if profile not in profiles:
+            raise ValueError(f"Unknown pacing profile '{profile}' (choose from {', '.join(profiles)})")
+        self.profile = profile
+        self.delays = dict(profiles[profile])
+        self.skip_on_key = skip_on_key
+        self.stream = stream or sys.stdin
+        self.waited = 0.0
+
+    def wait(self, event):
+        # Returns True if a key press cut the wait short
+        seconds = self.delays[event]
+        if seconds <= 0:
+            return False
+        start = time.perf_counter()
+        skipped = False
+        if self.skip_on_key and self.interactive():
+            skipped = wait_for_key(seconds, self.stream)
+        else:
+            time.sleep(seconds)
+        self.waited += time.perf_counter() - start
+        return skipped
+
+    def interactive(self):
+        try:
+            return self.stream.isatty()
+        except (AttributeError, ValueError):
+            return False
+
+
+def wait_for_key(seconds, stream):
+    """
+    Sleeps for up to seconds, stopping early if a key is pressed. The key
+    is swallowed so it doesn't end up in the next prompt. Returns True if
+    it was skipped.
+    """
+    if msvcrt is not None:
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            if msvcrt.kbhit():
+                msvcrt.getwch()
+                return True
+            time.sleep(0.02)
+        return False
+    if termios is None:
+        time.sleep(seconds)
+        return False
+
+    fd = stream.fileno()
+    old = termios.tcgetattr(fd)
+    try:
+        tty.setcbreak(fd)  # keys arrive one at a time instead of after Enter
+        ready, _, _ = select.select([fd], [], [], seconds)
+        if ready:
+            os.read(fd, 1024)
+            return True
+        return False
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, old)
@@ -0,0 +1,151 @@
+# party_store.py
+import os
+
+from catalog import catalog
+from save_index import SaveIndex
+from save_journal import read_save, write_snapshot, dump_snapshot, find_save_path, journal_path_for, save_extensions
+
+
+class PartyStore:
+    """
+    Keeps every character's save in memory so allies don't have to be re-read
+    from disk on every combat turn.
+
+    Saves are loaded lazily the first time they're asked for and served from
+    memory after that. Anything that changes an ally calls mark_dirty(), and
+    flush() writes the dirty ones back at the checkpoints (end of turn, floor
+    change, exit).
+
+    The active character lives in its GameSession's player_data, so it's
+    dropped from the cache with forget() whenever it's loaded or saved and
+    re-read on demand.
+
+    Saves come from the save folder, or from a SqliteSaveStore if one is
+    passed as database, in which case each flush() is a single transaction.
+    """
+
+    def __init__(self, save_directory, names, extension=".json", database=None):
+        self.save_directory = save_directory
+        self.extension = extension  # format used for characters that don't have a save yet
+        self.database = database
+        self.index = SaveIndex(save_directory) if database is None else None
+        self.names = list(names)
+        self.saves = {}
+        self.dirty = set()
+
+    def path_for(self, name):
+        return find_save_path(self.save_directory, name, self.extension) or os.path.join(self.save_directory, name + self.extension)
+
+    def exists(self, name):
+        if name in self.saves:
+            return True
+        return self.summary(name) is not None
+
+    def summary(self, name):
+        """
+        Level, floor, HP and alive/dead for a character without loading their
+        whole save (from the save index, or the characters table in SQLite).
+        Rebuilt entries are only kept in memory; call write_index() once the
+        caller is done asking.
+        """
+        if self.database is not None:
+            return self.database.summary(name)
+        return self.index.summary(name, read_save)
+
+    def read(self, name):
+        """
+        Reads a character's save straight from the backend, skipping the cache.
+        """
+        if self.database is not None:
+            return self.database.load(name)
+        path = find_save_path(self.save_directory, name, self.extension)
+        return read_save(path) if path else None
+
+    def get(self, name):
+        """
+        Returns the {"player": ..., "persistent_stats": ...} dict for a character,
+        or None if they don't have a save yet.
+        """
+        if name in self.saves:
+            return self.saves[name]
+        data = self.read(name)
+        if data is not None:
+            catalog.track(data["player"])
+            self.saves[name] = data
+        return data
+
+    def is_dead(self, name):
+        data = self.get(name)
+        return data is not None and data["persistent_stats"].get("is_dead", False)
+
+    def mark_dirty(self, name):
+        if name in self.saves:
+            self.dirty.add(name)
+
+    def forget(self, name):
+        """
+        Drops a cached save (writing it first if it has pending changes) so the
+        next get() reads it from disk again.
+        """
+        if name in self.dirty:
+            self.write(name)
+        self.saves.pop(name, None)
+
+    def discard(self, name):
+        """
+        Drops a cached save without writing it, used when the caller has just
+        written a newer copy itself.
+        """
+        self.saves.pop(name, None)
+        self.dirty.discard(name)
+
+    def write(self, name):
+        self.flush_saves({name: self.saves[name]})
+        self.dirty.discard(name)
+
+    def flush(self, extra=None, backups=None):
+        """
+        Writes every dirty save, plus any extra {name: save} the caller passes
+        (the active character) and {name: (floor, save)} floor backups.
+        """
+        saves = {name: self.saves[name] for name in self.dirty}
+        saves.update(extra or {})
+        self.flush_saves(saves, backups)
+        self.dirty.clear()
+
+    def flush_saves(self, saves, backups=None):
+        if self.database is not None:
+            self.database.save_many(saves, backups)
+            return
+        for name, data in saves.items():
+            path = self.path_for(name)
+            write_snapshot(path, data)
+            self.index.record(name, data, path)
+        for name, (floor, data) in (backups or {}).items():
+            base, ext = os.path.splitext(self.path_for(name))
+            dump_snapshot(f"{base}_backup_floor{floor}{ext}", data)
+
+    def write_index(self):
+        """
+        Writes the save index if it changed. Called at the checkpoints
+        (compaction, floor change, exit) and when the character list closes,
+        rather than on every save or summary.
+        """
+        if self.index is not None:
+            self.index.write()
+
+    def delete(self, name):
+        self.discard(name)
+        if self.database is not None:
+            self.database.delete(name)
+            return
+        base = os.path.join(self.save_directory, name)
+        for path in [base + ext for ext in save_extensions] + [journal_path_for(base)]:
+            if os.path.exists(path):
+                os.remove(path)
+        self.index.remove(name)
+        self.index.write()
+
+    def clear(self):
+        self.saves.clear()
+        self.dirty.clear()
@@ -0,0 +1,416 @@
+# policies.py
+# The choices a player makes, as classes: the action each combat turn
+# (attack who, which skill, when to retreat), what to buy in shops and
+# where skill points go. simulate.py plays headless runs with them, and
+# main.auto_policy is the one behind the "auto" command in combat and the
+# upgrade menu (and engine.py's "auto" action). Usage:
+#   python policies.py [policy ...] [--runs 20] [--seed 1] [--max-floor 20]
+# plays runs with each policy, timing every combat decision, and reports
+# how long they take and how far each policy gets.
+#
+# From cheapest to most thorough:
+#   random     any action it can afford, and points spent at random
+#   attack     basic attacks on the weakest monster
+#   greedy     the same, but retreats when the next enemy turn would kill it
+#   basic      heals when low, otherwise whatever has the most expected damage
+#   efficient  spends mana where it buys the most damage over a basic attack
+#              (allies included), and retreats from fights it expects to lose
+#   lookahead  tries every sequence of its next few actions on expected
+#              values, mana costs and refills included
+# Everything but lookahead has to decide in under 100 us (--budget).
+import abc
+import time
+import argparse
+import importlib
+from bisect import bisect_right
+from functools import lru_cache
+
+import dungeon
+from combat_engine import alive_targets
+from dice import parse
+
+decision_budget_us = 100  # for every policy but lookahead
+
+
+# === Expected values ===
+def attack_damage(player):
+    # A basic attack is damage d2's (1.5 each on average) times a uniform 0.9-1.2
+    return player["damage"] * 1.575
+
+@lru_cache(maxsize=256)
+def skill_values(damage, attacks, mana_costs, healing):
+    """
+    (index, mana cost, expected damage, single target?, expected healing)
+    for every skill, from skill_data's lists as tuples. The damage is for
+    the whole group, spread over random targets if the skill hits more than
+    once, and healing is healing d4's. Cached, since a character's skills
+    only change when they learn or upgrade one.
+    """
+    return tuple((i, mana_costs[i], parse(damage[i]).mean * attacks[i], attacks[i] == 1, healing[i] * 2.5)
+                 for i in range(len(damage)))
+
+def skills_of(player):
+    sd = player["skill_data"]
+    return skill_values(tuple(sd["damage"]), tuple(sd["attacks"]), tuple(sd["mana_costs"]), tuple(sd["healing"]))
+
+def ally_support(state):
+    """
+    What the allies are expected to add after a basic attack: (damage to one
+    random monster, damage to every monster, healing for everyone).
+    """
+    strike = sweep = heal = 0.0
+    for ally in state["allies"]:
+        if ally["is_dead"]:
+            continue
+        level = ally.get("level", 1)
+        if ally["name"] == "George":
+            strike += level * 2.5
+        elif ally["name"] == "Lucian":
+            sweep += level * 1.5
+        elif ally["name"] == "Ilana":
+            heal += level * 1.5
+    return strike, sweep, heal
+
+def hp_left(health, monsters, focus, sweep, heal):
+    """
+    Roughly the HP left after basic-attacking monsters ((health, damage)
+    pairs) to death, weakest first, doing focus to the target and sweep to
+    all of them and healing heal each turn. Below 0 means the fight is
+    expected to be lost.
+    """
+    elapsed = 0.0
+    taken = 0.0
+    for monster_health, damage in sorted(monsters):
+        elapsed += monster_health / (focus + sweep)
+        taken += damage * elapsed
+    return health - max(0.0, taken - heal * elapsed)
+
+def best_target(by_health, healths, damage):
+    """
+    The healthiest monster damage is expected to kill, or else the weakest.
+    by_health is the living monsters as sorted (health, index) pairs and
+    healths just their healths. Returns (health, index).
+    """
+    killable = bisect_right(healths, damage)
+    return by_health[killable - 1] if killable else by_health[0]
+
+
+# === Policies ===
+class Policy(abc.ABC):
+    """
+    Base class for policies, which must fill in combat_action(). By default
+    they buy the skill offer or the best affordable item in shops, put skill
+    points alternately into damage and max health, and trade XP for HP
+    between rooms when below half health.
+    """
+
+    @abc.abstractmethod
+    def combat_action(self, state, rng):
+        """
+        This turn's action, as combat_engine.resolve_turn() takes it. rng is
+        a random.Random for anything left to chance.
+        """
+
+    def shop(self, player, items, skill_offer, floor, rng):
+        """
+        Returns ("skill", None), ("item", index) or None to leave.
+        """
+        if skill_offer and player["coins"] >= dungeon.skill_base_price(skill_offer):
+            return ("skill", None)
+        affordable = [i for i, item in enumerate(items) if item["value"] <= player["coins"]]
+        if affordable:
+            return ("item", max(affordable, key=lambda i: items[i]["value"]))
+        return None
+
+    def spend_points(self, player, rng):
+        # What the upgrade menu would be used for
+        stat = "damage"
+        while dungeon.upgrade_stat(player, stat):
+            stat = "max_health" if stat == "damage" else "damage"
+
+    def upkeep(self, player, floor, rng):
+        """
+        Called between rooms, like visiting the upgrade menu.
+        """
+        self.spend_points(player, rng)
+        if player["health"] * 2 < player["max_health"]:
+            dungeon.xp_heal(player, floor)
+
+class RandomPolicy(Policy):
+    """
+    Picks any action it can afford at random, retreating included, and
+    spends skill points on random stats.
+    """
+
+    def combat_action(self, state, rng):
+        player = state["player"]
+        targets = alive_targets(state)
+        actions = [{"type": "attack", "target": i} for i in targets]
+        for i, cost in enumerate(player["skill_data"]["mana_costs"]):
+            if cost <= player["mana"]:
+                actions.append({"type": "skill", "index": i, "target": rng.choice(targets)})
+        actions.append({"type": "retreat"})
+        return rng.choice(actions)
+
+    def spend_points(self, player, rng):
+        dungeon.ensure_upgrade_costs(player)
+        while True:
+            affordable = [s for s in dungeon.upgrade_stats if player["upgrade_costs"][s] <= player["skill_points"]]
+            if not affordable:
+                return
+            dungeon.upgrade_stat(player, rng.choice(affordable))
+
+class AttackOnly(Policy):
+    """
+    Only ever uses the basic attack, on the weakest monster.
+    """
+
+    def combat_action(self, state, rng):
+        targets = alive_targets(state)
+        return {"type": "attack", "target": min(targets, key=lambda i: state["monsters"][i]["health"])}
+
+class Greedy(Policy):
+    """
+    Basic attacks on the monster with the least HP, retreating when the
+    next enemy turn would kill it and the attack isn't expected to end the
+    fight first.
+    """
+
+    def combat_action(self, state, rng):
+        player = state["player"]
+        monsters = state["monsters"]
+        targets = alive_targets(state)
+        weakest = min(targets, key=lambda i: monsters[i]["health"])
+        threat = sum(monsters[i]["damage"] for i in targets)
+        last_blow = len(targets) == 1 and attack_damage(player) >= monsters[weakest]["health"]
+        if threat >= player["health"] and not last_blow:
+            return {"type": "retreat"}
+        return {"type": "attack", "target": weakest}
+
+class AutoPlayer(Policy):
+    """
+    The default policy. In combat it heals with a skill when below a third
+    of its HP, otherwise it uses the affordable skill with the most expected
+    damage, falling back to a basic attack on the weakest monster.
+    """
+
+    def combat_action(self, state, rng):
+        player = state["player"]
+        sd = player["skill_data"]
+        targets = alive_targets(state)
+        weakest = min(targets, key=lambda i: state["monsters"][i]["health"])
+        affordable = [i for i, cost in enumerate(sd["mana_costs"]) if cost <= player["mana"]]
+
+        if player["health"] * 3 < player["max_health"]:
+            healers = [i for i in affordable if sd["healing"][i]]
+            if healers:
+                idx = max(healers, key=lambda i: sd["healing"][i])
+                return {"type": "skill", "index": idx, "target": weakest}
+
+        best, best_damage = None, player["damage"] * 1.5 * 1.05  # expected basic attack
+        for i in affordable:
+            expected = parse(sd["damage"][i]).mean * sd["attacks"][i]
+            if expected > best_damage:
+                best, best_damage = i, expected
+        if best is None:
+            return {"type": "attack", "target": weakest}
+        return {"type": "skill", "index": best, "target": weakest}
+
+class Efficient(Policy):
+    """
+    Treats mana as a budget: a skill is only worth it for the damage it
+    does over a basic attack (which also sets the allies off and refills
+    some mana), per point of mana that costs. When the fight looks lost it
+    heals if a skill can keep it alive, and otherwise retreats.
+    """
+
+    def combat_action(self, state, rng):
+        player = state["player"]
+        monsters = state["monsters"]
+        by_health = sorted((monsters[i]["health"], i) for i in alive_targets(state))
+        healths = [h for h, _ in by_health]
+        strike, sweep, heal = ally_support(state)
+        attack = attack_damage(player)
+        attack_health, attack_target = best_target(by_health, healths, attack)
+        attack_total = (attack if attack < attack_health else attack_health) + strike + sweep * len(healths)
+        refill = max(1, player["max_mana"] // 10)
+        remaining = sum(healths)
+        mana = player["mana"]
+        skills = skills_of(player)
+
+        threat = sum(monsters[i]["damage"] for _, i in by_health)
+        if threat >= player["health"] and remaining > attack_total:
+            outlook = hp_left(player["health"], [(h, monsters[i]["damage"]) for h, i in by_health], attack + strike, sweep, heal)
+            if outlook <= 0:
+                healers = [(healing, i) for i, cost, _, _, healing in skills
+                           if cost <= mana and player["health"] + healing > threat]
+                if healers:
+                    return {"type": "skill", "index": max(healers)[1], "target": attack_target}
+                return {"type": "retreat"}
+
+        best, best_rate, best_target_idx = None, 0.0, attack_target
+        for i, cost, damage, single, _ in skills:
+            if cost > mana:
+                continue
+            if single:
+                health, target = best_target(by_health, healths, damage)
+            else:
+                health, target = remaining, attack_target
+            rate = ((damage if damage < health else health) - attack_total) / (cost + refill)
+            if rate > best_rate:
+                best, best_rate, best_target_idx = i, rate, target
+        if best is None:
+            return {"type": "attack", "target": attack_target}
+        return {"type": "skill", "index": best, "target": best_target_idx}
+
+class Lookahead(Policy):
+    """
+    Searches every sequence of its next depth actions (each attack target,
+    each skill it can pay for) on expected values: damage, the allies'
+    effects, mana spent and refilled, healing and the enemy turns. It plays
+    the first action of the sequence expected to leave it with the most HP
+    at the end of the fight (hp_left() past the horizon), and retreats when
+    even that is expected to lose. With many skills and monsters it looks
+    fewer actions ahead, so a decision never tries more than max_moves
+    sequences.
+    """
+
+    def __init__(self, depth=3, max_moves=4000):
+        self.depth = depth
+        self.max_moves = max_moves
+
+    def combat_action(self, state, rng):
+        player = state["player"]
+        strike, sweep, heal = ally_support(state)
+        self.player = player
+        self.attack = attack_damage(player)
+        self.strike, self.sweep, self.heal = strike, sweep, heal
+        self.refill = max(1, player["max_mana"] // 10)
+        self.skills = [(cost, damage, single, healing) for _, cost, damage, single, healing in skills_of(player)]
+        self.damages = tuple(m["damage"] for m in state["monsters"])
+        healths = tuple(max(0, m["health"]) for m in state["monsters"])
+
+        alive = sum(1 for h in healths if h > 0)
+        branching = alive + sum(alive if single else 1 for _, _, single, _ in self.skills)
+        depth = self.depth
+        while depth > 1 and branching ** depth > self.max_moves:
+            depth -= 1
+
+        value, action = self.search(player["health"], player["mana"], healths, depth)
+        if value <= 0:
+            return {"type": "retreat"}
+        return action
+
+    def search(self, health, mana, healths, depth):
+        # The best (expected HP at the end of the fight, first action) from here
+        alive = [i for i, h in enumerate(healths) if h > 0]
+        best_value, best_action = None, None
+        for action, after, new_mana, healed in self.moves(mana, healths, alive):
+            new_health = min(self.player["max_health"], health + healed)
+            new_health -= sum(self.damages[i] for i, h in enumerate(after) if h > 0)
+            left = [i for i, h in enumerate(after) if h > 0]
+            if new_health <= 0:
+                value = new_health - sum(after)
+            elif not left:
+                value = new_health
+            elif depth == 1:
+                value = hp_left(new_health, [(after[i], self.damages[i]) for i in left], self.attack + self.strike, self.sweep, self.heal)
+            else:
+                value = self.search(new_health, new_mana, after, depth - 1)[0]
+            if best_value is None or value > best_value:
+                best_value, best_action = value, action
+        return best_value, best_action
+
+    def moves(self, mana, healths, alive):
+        # Every action from here: (action, monster HP after, mana after, healing)
+        for target in alive:
+            after = list(healths)
+            after[target] -= self.attack
+            spread = self.strike / len(alive)
+            for i in alive:
+                after[i] = max(0, after[i] - spread - self.sweep)
+            yield {"type": "attack", "target": target}, after, min(mana + self.refill, self.player["max_mana"]), self.heal
+        for idx, (cost, damage, single, healing) in enumerate(self.skills):
+            if cost > mana:
+                continue
+            if single:
+                for target in alive:
+                    after = list(healths)
+                    after[target] = max(0, after[target] - damage)
+                    yield {"type": "skill", "index": idx, "target": target}, after, mana - cost, healing
+            else:
+                after = list(healths)
+                for i in alive:
+                    after[i] = max(0, after[i] - damage / len(alive))
+                yield {"type": "skill", "index": idx, "target": alive[0]}, after, mana - cost, healing
+
+policies = {
+    "random": RandomPolicy,
+    "attack": AttackOnly,
+    "greedy": Greedy,
+    "basic": AutoPlayer,
+    "efficient": Efficient,
+    "lookahead": Lookahead,
+}
+
+def load_policy(spec):
+    """
+    A policy from policies by name, or any class given as "module:Class".
+    """
+    if spec in policies:
+        return policies[spec]()
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+# === Timing ===
+class TimedPolicy:
+    """
+    Wraps a policy, timing each combat_action() call (in ns).
+    """
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.times = []
+
+    def combat_action(self, state, rng):
+        start = time.perf_counter_ns()
+        action = self.policy.combat_action(state, rng)
+        self.times.append(time.perf_counter_ns() - start)
+        return action
+
+    def __getattr__(self, name):
+        return getattr(self.policy, name)
+
+
+if __name__ == "__main__":
+    import simulate  # only here, simulate imports this module for its policies
+    from rng_streams import RngStreams
+
+    parser = argparse.ArgumentParser(description="Time each policy's combat decisions and see how far it gets.")
+    parser.add_argument("names", nargs="*", metavar="policy", help=f"policies to run (default: all of {', '.join(policies)})")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--character", choices=simulate.characters, default="Lucian")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-floor", type=int, default=20)
+    parser.add_argument("--budget", type=float, default=decision_budget_us,
+                        help="microseconds a decision may take, for every policy but lookahead")
+    args = parser.parse_args()
+
+    over = []
+    print(f"  {'policy':<12}{'decisions':>10}{'mean us':>10}{'p50 us':>9}{'p99 us':>9}{'floor p50':>11}{'floor max':>11}")
+    for name in args.names or list(policies):
+        policy = TimedPolicy(load_policy(name))
+        root = RngStreams(args.seed)
+        results = [simulate.play_run(root.fork(i), policy, args.character, args.max_floor) for i in range(args.runs)]
+        times = sorted(t / 1000 for t in policy.times)
+        floors = sorted(r["floor"] for r in results)
+        line = (f"  {name:<12}{len(times):>10}{sum(times) / len(times):>10.1f}{simulate.percentile(times, 50):>9.1f}"
+                f"{simulate.percentile(times, 99):>9.1f}{simulate.percentile(floors, 50):>11}{floors[-1]:>11}")
+        if name != "lookahead" and simulate.percentile(times, 99) > args.budget:
+            over.append(name)
+            line += "  OVER BUDGET"
+        print(line)
+    if over:
+        print(f"\n{', '.join(over)} took over {args.budget:.0f} us per decision (p99)")
+        raise SystemExit(1)
@@ -0,0 +1,173 @@
+# profiler.py
+# Where the time goes while playing (python main.py --profile).
+#
+# A Profiler wraps the functions that do each phase of the game (waiting
+# for input, drawing, saving, rolling dice, pausing...) and adds up the
+# time spent in them with time.perf_counter_ns(). Each phase only counts
+# its own time: a save that reads an ally's file counts that read under
+# "ally saves", not "save". Time in none of them is "other" (the game's
+# own logic). Every combat turn, the time each phase took that turn goes
+# into a histogram, and report() shows the totals, call counts and the
+# 50th/95th/99th percentile per turn.
+#
+# Nothing is wrapped unless the profiler is installed, so normal play
+# doesn't pay for any of this.
+import sys
+import time
+import functools
+
+perf_counter_ns = time.perf_counter_ns
+
+
+class Histogram:
+    """
+    Counts nanosecond durations in logarithmic buckets: exact below 16 ns,
+    then 8 buckets per doubling (within 12.5% of the real value), so
+    adding one is a few integer operations whatever the range.
+    """
+    __slots__ = ("buckets", "count")
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+
+    def add(self, ns):
+        if ns < 16:
+            key = max(ns, 0)
+        else:
+            shift = ns.bit_length() - 4
+            key = (shift << 3) + (ns >> shift)  # the top 4 bits (8-15) pick the bucket within the doubling
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+        self.count += 1
+
+    def percentile(self, p):
+        # Upper edge of the bucket the pth percentile falls in, in nanoseconds
+        if not self.count:
+            return 0
+        rank = p / 100 * self.count
+        seen = 0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen >= rank:
+                return bucket_top(key)
+        return bucket_top(max(self.buckets))
+
+
+def bucket_top(key):
+    if key < 16:
+        return key
+    shift, top = divmod(key, 8)
+    shift -= 1
+    return ((top + 8 + 1) << shift) - 1
+
+
+class Phase:
+    __slots__ = ("name", "calls", "total", "turn", "per_turn")
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.total = 0  # ns, this phase's own time
+        self.turn = 0  # ns so far in the current turn
+        self.per_turn = Histogram()
+
+
+class Profiler:
+    """
+    instrument(owner, name, phase) wraps owner.name (a function in a module,
+    or a method on a class) so its calls count towards phase.
+    timed_stream(stream) does the same for an output stream's writes.
+    Call end_turn() after every combat turn and report() at the end.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.nested = []  # time spent in wrapped calls made by each call in progress
+        self.wrapped = []  # (owner, name, original) to put back
+        self.turns = 0
+        self.turn_started = perf_counter_ns()
+        self.turn_totals = Histogram()
+        self.started = self.turn_started
+
+    def phase(self, name):
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = Phase(name)
+        return phase
+
+    def wrap(self, phase_name, func):
+        phase = self.phase(phase_name)
+        nested = self.nested
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            nested.append(0)
+            start = perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = perf_counter_ns() - start
+                own = elapsed - nested.pop()
+                if nested:
+                    nested[-1] += elapsed
+                phase.calls += 1
+                phase.total += own
+                phase.turn += own
+        return timed
+
+    def instrument(self, owner, name, phase_name):
+        original = getattr(owner, name)
+        self.wrapped.append((owner, name, original))
+        setattr(owner, name, self.wrap(phase_name, original))
+
+    def timed_stream(self, stream, phase_name="render"):
+        return TimedStream(stream, self.wrap(phase_name, stream.write), self.wrap(phase_name, stream.flush))
+
+    def uninstall(self):
+        for owner, name, original in reversed(self.wrapped):
+            setattr(owner, name, original)
+        self.wrapped = []
+
+    def end_turn(self):
+        now = perf_counter_ns()
+        self.turns += 1
+        self.turn_totals.add(now - self.turn_started)
+        self.turn_started = now
+        for phase in self.phases.values():
+            phase.per_turn.add(phase.turn)
+            phase.turn = 0
+
+    def report(self, out=None):
+        out = out or sys.stderr
+        wall = perf_counter_ns() - self.started
+        measured = sum(phase.total for phase in self.phases.values())
+        rows = sorted(self.phases.values(), key=lambda phase: -phase.total)
+        out.write(f"\nProfile: {wall / 1e9:.2f}s, {self.turns} combat turns\n\n")
+        out.write(f"  {'phase':<12}{'calls':>9}{'total ms':>11}{'share':>8}{'us/call':>10}"
+                  f"{'turn p50':>10}{'p95':>9}{'p99':>9}   (per turn, ms)\n")
+        for phase in rows:
+            share = phase.total / wall * 100 if wall else 0
+            per_call = phase.total / phase.calls / 1e3 if phase.calls else 0
+            p50, p95, p99 = (phase.per_turn.percentile(p) / 1e6 for p in (50, 95, 99))
+            out.write(f"  {phase.name:<12}{phase.calls:>9}{phase.total / 1e6:>11.1f}{share:>7.1f}%{per_call:>10.1f}"
+                      f"{p50:>10.3f}{p95:>9.3f}{p99:>9.3f}\n")
+        other = wall - measured
+        out.write(f"  {'other':<12}{'':>9}{other / 1e6:>11.1f}{other / wall * 100 if wall else 0:>7.1f}%\n")
+        p50, p95, p99 = (self.turn_totals.percentile(p) / 1e6 for p in (50, 95, 99))
+        out.write(f"  {'whole turn':<12}{self.turns:>9}{'':>11}{'':>8}{'':>10}{p50:>10.3f}{p95:>9.3f}{p99:>9.3f}\n")
+        out.flush()
+
+
+class TimedStream:
+    """
+    Stands in for an output stream, timing write() and flush(). Anything
+    else goes straight to the stream.
+    """
+
+    def __init__(self, stream, write, flush):
+        self.stream = stream
+        self.write = write
+        self.flush = flush
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
@@ -0,0 +1,153 @@
+# replay.py
+# Records a play session into a compact replay file and plays it back.
+#   python main.py --record session.eyr   play normally, recording every input
+#   python main.py --replay session.eyr   play it back at full speed and check the saves
+#
+# A replay file holds the inputs, the seed new characters got, the save
+# settings, and every save file as it was when recording started and
+# ended. Playback starts from a scratch copy of the starting saves, so
+# it never touches the real ones, and passes if the saves it ends with
+# are byte for byte the recorded ones.
+import os
+import json
+import zlib
+import base64
+import struct
+
+from save_index import index_name
+
+MAGIC = b"EYRP"
+FORMAT_VERSION = 1
+header_struct = struct.Struct("<4sB")
+
+# saves.index is keyed by file mtimes, so it can't match between runs (and gets rebuilt anyway)
+skipped_files = {index_name}
+
+# Goes in the inputs where a key press took a fight back from the auto player
+# (input() never returns a NUL, so it can't be mistaken for something typed)
+auto_stop = "\x00auto stop"
+
+
+class ReplayFinished(Exception):
+    """
+    Raised by ReplayInput when the game asks for more input than was recorded.
+    """
+
+
+class Recorder:
+    """
+    Input source for GameSession.ask() that reads from the keyboard as
+    usual and remembers every answer. save() writes the replay file.
+    """
+
+    def __init__(self, seed, settings, save_directory):
+        self.seed = seed
+        self.settings = settings
+        self.start = snapshot(save_directory)
+        self.inputs = []
+
+    def input(self, prompt=""):
+        value = input(prompt)
+        self.inputs.append(value)
+        return value
+
+    def mark(self, value):
+        # Records something that happened without a prompt, like auto_stop
+        self.inputs.append(value)
+
+    def save(self, path, save_directory):
+        write_replay(path, {
+            "seed": self.seed,
+            "settings": self.settings,
+            "inputs": self.inputs,
+            "start": self.start,
+            "end": snapshot(save_directory),
+        })
+
+
+class ReplayInput:
+    """
+    Input source for GameSession.ask() that answers with the recorded
+    inputs, in order, and raises ReplayFinished once they run out.
+    """
+
+    def __init__(self, inputs):
+        self.inputs = inputs
+        self.position = 0
+
+    def input(self, prompt=""):
+        if self.position >= len(self.inputs):
+            raise ReplayFinished()
+        value = self.inputs[self.position]
+        self.position += 1
+        print(prompt + value)
+        return value
+
+    def take(self, value):
+        # True (and skips past it) if the next recorded input is the mark value
+        if self.position < len(self.inputs) and self.inputs[self.position] == value:
+            self.position += 1
+            return True
+        return False
+
+
+# === Files ===
+def snapshot(directory):
+    """
+    {file name: contents} for every save file (journals, backups and the
+    SQLite database included) directly inside directory.
+    """
+    files = {}
+    if not os.path.isdir(directory):
+        return files
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name in skipped_files or not os.path.isfile(path):
+            continue
+        with open(path, "rb") as f:
+            files[name] = f.read()
+    return files
+
+def restore(directory, files):
+    os.makedirs(directory, exist_ok=True)
+    for name, data in files.items():
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(data)
+
+def compare(expected, actual):
+    """
+    Names of the files that are missing, extra or different, sorted.
+    """
+    return sorted(name for name in set(expected) | set(actual) if expected.get(name) != actual.get(name))
+
+
+# === Replay files ===
+def write_replay(path, replay):
+    body = dict(replay)
+    for key in ("start", "end"):
+        body[key] = {name: base64.b64encode(data).decode("ascii") for name, data in replay[key].items()}
+    packed = zlib.compress(json.dumps(body, separators=(",", ":")).encode("utf-8"), 9)
+    with open(path, "wb") as f:
+        f.write(header_struct.pack(MAGIC, FORMAT_VERSION))
+        f.write(packed)
+
+def read_replay(path):
+    """
+    Loads a replay file. Raises ValueError if it isn't one.
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    if len(raw) < header_struct.size:
+        raise ValueError(f"{path} is not a replay file")
+    magic, version = header_struct.unpack_from(raw)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a replay file")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"{path} is replay format {version}, expected {FORMAT_VERSION}")
+    try:
+        replay = json.loads(zlib.decompress(raw[header_struct.size:]).decode("utf-8"))
+    except (zlib.error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"{path} is damaged: {e}")
+    for key in ("start", "end"):
+        replay[key] = {name: base64.b64decode(data) for name, data in replay[key].items()}
+    return replay
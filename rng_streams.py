@@ -0,0 +1,54 @@
+# rng_streams.py
+# Seeded random streams, one per subsystem, so a run can be replayed exactly.
+#
+# Every stream is a random.Random seeded from the run's seed, the stream's
+# name and where in the run it's being used (floor and room, or the turn
+# number for combat). Nothing but the seed needs saving since the position
+# is already in the save, and loading a save picks up the same rolls it
+# would have had. Streams don't share state, so an extra roll in combat
+# never changes which monsters or loot come next.
+import random
+
+stream_names = ("encounters", "loot", "combat", "rooms")
+
+
+def new_seed():
+    # A fresh seed for a new run
+    return random.SystemRandom().randrange(2 ** 32)
+
+
+class RngStreams:
+    """
+    stream(name, *position) is the Random for one subsystem at one point in
+    the run. Asking again with the same position carries on the same
+    stream; a new position starts a new one.
+
+    fork(key) gives an independent set of streams (one per simulated run,
+    say). It only derives a new seed, so it costs next to nothing until a
+    stream is actually used.
+    """
+    __slots__ = ("seed", "current")
+
+    def __init__(self, seed):
+        self.seed = seed
+        self.current = {}  # name: (position, Random)
+
+    def stream(self, name, *position):
+        entry = self.current.get(name)
+        if entry is not None and entry[0] == position:
+            return entry[1]
+        if name not in stream_names:
+            raise ValueError(f"Unknown random stream '{name}'")
+        # String seeds are hashed the same way on every platform and process
+        rng = random.Random(self.key(name, *position))
+        self.current[name] = (position, rng)
+        return rng
+
+    def fork(self, key):
+        return RngStreams(self.key("fork", key))
+
+    def key(self, *parts):
+        return ":".join(str(part) for part in (self.seed,) + parts)
+
+    def __repr__(self):
+        return f"RngStreams({self.seed!r})"
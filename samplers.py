@@ -0,0 +1,144 @@
+# samplers.py
+# Weighted picks in constant time, using Vose's alias method.
+#
+# An AliasTable is built once for a list of weights, after which every
+# pick costs one rng.random() call, however many entries there are. A
+# WeightedPool wraps a table of entries (drop_table, skill_table) and
+# picks distinct entries while skipping the ones already owned (a bitset
+# of catalog IDs, see catalog.py): picks of owned entries are simply
+# drawn again, which gives exactly the weights of what's left. Only once
+# the owned entries make up most of the weight is a smaller table built
+# for the rest, and it's cached for as long as that ownership doesn't
+# change.
+#
+#   python samplers.py   check the pick rates against the weights and time them
+import time
+import random
+import argparse
+from functools import lru_cache
+
+from catalog import bit_indices
+
+
+class AliasTable:
+    """
+    Picks index i with probability weights[i] / sum(weights). Weights of 0
+    are never picked.
+    """
+    __slots__ = ("size", "probability", "alias")
+
+    def __init__(self, weights):
+        size = len(weights)
+        total = sum(weights)
+        if size == 0 or total <= 0:
+            raise ValueError("An alias table needs at least one positive weight")
+        scaled = [w * size / total for w in weights]
+        probability = [1.0] * size
+        alias = list(range(size))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            probability[less] = scaled[less]
+            alias[less] = more
+            # The large entry gives up what fills the small one's column
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Whatever is left over is 1 give or take rounding
+        self.size = size
+        self.probability = probability
+        self.alias = alias
+
+    def sample(self, rng):
+        u = rng.random() * self.size
+        i = int(u)
+        return i if u - i < self.probability[i] else self.alias[i]
+
+
+class WeightedPool:
+    """
+    Weighted picks from entries (dicts with a "weight"), without repeats
+    and skipping owned ones. owned is a bitset of positions in entries.
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.weights = [entry["weight"] for entry in entries]
+        self.total = sum(self.weights)
+        self.table = AliasTable(self.weights)
+
+    def sample(self, owned, count, rng):
+        """
+        Up to count different entries that aren't in owned, each pick
+        weighted by what's left. Fewer if not enough are left.
+        """
+        count = min(count, len(self.entries) - bin(owned).count("1"))
+        if count <= 0:
+            return []
+        if self.owned_weight(owned) * 2 <= self.total:
+            table, positions = self.table, None
+        else:
+            # Most of the weight is owned, so redrawing would take a while
+            table, positions = self.rest_table(owned)
+        picked = []
+        taken = owned
+        while len(picked) < count:
+            i = table.sample(rng)
+            if positions is not None:
+                i = positions[i]
+            if taken >> i & 1:
+                continue
+            taken |= 1 << i
+            picked.append(self.entries[i])
+        return picked
+
+    def choice(self, owned, rng):
+        picked = self.sample(owned, 1, rng)
+        return picked[0] if picked else None
+
+    @lru_cache(maxsize=256)
+    def owned_weight(self, owned):
+        return sum(self.weights[i] for i in bit_indices(owned))
+
+    @lru_cache(maxsize=64)
+    def rest_table(self, owned):
+        # (table, entry position for each table position) over the entries not in owned
+        positions = [i for i in range(len(self.entries)) if not owned >> i & 1]
+        return AliasTable([self.weights[i] for i in positions]), positions
+
+
+# === Check ===
+def check(draws):
+    from game_data import drop_table
+    pool = WeightedPool(drop_table)
+    rng = random.Random(1)
+    counts = [0] * len(drop_table)
+    for _ in range(draws):
+        counts[pool.table.sample(rng)] += 1
+    worst = max(abs(c / draws - w / pool.total) for c, w in zip(counts, pool.weights))
+    print(f"{draws} alias picks: largest gap from the weights {worst * 100:.3f}%")
+
+    runs = 100000
+    start = time.perf_counter()
+    for _ in range(runs):
+        rng.choices(drop_table, weights=pool.weights)
+    choices_time = (time.perf_counter() - start) / runs
+    start = time.perf_counter()
+    for _ in range(runs):
+        pool.table.sample(rng)
+    alias_time = (time.perf_counter() - start) / runs
+    print(f"one pick: random.choices {choices_time * 1e6:.2f} us, alias table {alias_time * 1e6:.2f} us")
+
+    half = (1 << len(drop_table) // 2) - 1
+    for label, owned in (("nothing owned", 0), ("half owned", half)):
+        start = time.perf_counter()
+        for _ in range(runs // 10):
+            pool.sample(owned, 3, rng)
+        print(f"three shop items, {label}: {(time.perf_counter() - start) / (runs // 10) * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and time the weighted samplers.")
+    parser.add_argument("--draws", type=int, default=1000000)
+    args = parser.parse_args()
+    check(args.draws)
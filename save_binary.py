@@ -0,0 +1,589 @@
+# save_binary.py
+# Compact binary save format. Usage:
+#   python save_binary.py convert [--to binary|json] [--keep]
+#   python save_binary.py bench [--rounds N]
+import os
+import json
+import copy
+import time
+import zlib
+import struct
+import argparse
+from array import array
+
+from game_data import drop_table, skill_table, monster_list
+from catalog import catalog
+
+# === Format ===
+MAGIC = b"EYSV"
+FORMAT_VERSION = 2
+binary_extension = ".sav"
+
+# Header: magic, format version, catalog fingerprint, how many items, skills
+# and monsters the fingerprint covers, field presence mask, bool bits
+header_struct = struct.Struct("<4sBIHHHQB")
+# Version 1 fingerprinted the whole catalog and had no counts
+header_struct_v1 = struct.Struct("<4sBIQB")
+magic_struct = struct.Struct("<4sB")
+
+# The rest of the layout, compiled once rather than looked up per field
+u8 = struct.Struct("<B")
+u16 = struct.Struct("<H")
+u32 = struct.Struct("<I")
+item_counts = struct.Struct("<HH")
+monster_count = struct.Struct("<BH")
+monster_ref = struct.Struct("<Hqq")
+
+# Scalar fields that live in the header; anything else goes in the JSON extras blob
+header_fields = [
+    ("player", "level", int),
+    ("player", "max_health", int),
+    ("player", "health", int),
+    ("player", "mana", int),
+    ("player", "max_mana", int),
+    ("player", "damage", int),
+    ("player", "coins", int),
+    ("player", "xp", int),
+    ("player", "xp_to_next", int),
+    ("player", "skill_points", int),
+    ("persistent_stats", "floor", int),
+    ("persistent_stats", "room", int),
+    ("persistent_stats", "rooms_since_shop", int),
+    ("persistent_stats", "rooms_since_treasure", int),
+    ("persistent_stats", "monster_rotation_index", int),
+    ("persistent_stats", "is_dead", bool),
+    ("player", "character", str),
+    ("player", "name", str),
+    ("persistent_stats", "current_version", str),
+]
+
+# Which bit of the bool byte each bool field uses
+bool_bits = {key: n for n, (_, key, _) in enumerate(f for f in header_fields if f[2] is bool)}
+
+# Item / skill reference codes: below SAME_AS_INVENTORY is a catalog index
+SAME_AS_INVENTORY = 0x8000  # equipped item identical to inventory[code & 0x7FFF]
+INLINE = 0xFFFF             # not in the catalog, stored in full after the code table
+
+# Dice kinds
+DICE_XDY = 0
+DICE_FLAT = 1
+DICE_RAW = 2
+
+# Monster section modes
+MONSTERS_ELSEWHERE = 0  # missing, or stored in the extras blob
+MONSTERS_NONE = 1
+MONSTERS_LIST = 2
+
+skill_data_keys = ("damage", "attacks", "healing", "mana_costs")
+
+monster_index = {(m["name"], m["damage"]): i for i, m in enumerate(monster_list)}
+
+
+# === Catalog Fingerprint ===
+# Saves refer to items, skills and monsters by their position in the tables,
+# so each save fingerprints the names of the first few entries of each table,
+# up to the last one it refers to. Mods only add entries after the built-in
+# ones, so installing one doesn't change the fingerprint of existing saves.
+prefix_crcs = None
+fingerprints = {}  # counts -> fingerprint, for the prefix_crcs above
+
+def running_crcs(names):
+    # crcs[n] is the CRC of the first n names
+    crcs = [0]
+    for name in names:
+        crcs.append(zlib.crc32(name.encode("utf-8") + b"\n", crcs[-1]))
+    return crcs
+
+def catalog_fingerprint(counts):
+    """
+    Fingerprint of the first counts = (items, skills, monsters) catalog
+    names, or None if a table is shorter than that.
+    """
+    global prefix_crcs
+    if prefix_crcs is None:
+        prefix_crcs = [running_crcs([e["name"] for e in table]) for table in (drop_table, skill_table, monster_list)]
+        fingerprints.clear()
+    fingerprint = fingerprints.get(counts)
+    if fingerprint is None:
+        if any(n >= len(crcs) for n, crcs in zip(counts, prefix_crcs)):
+            return None
+        fingerprint = fingerprints[counts] = zlib.crc32(struct.pack("<3I", *(crcs[n] for n, crcs in zip(counts, prefix_crcs))))
+    return fingerprint
+
+def legacy_fingerprints():
+    """
+    What a version 1 save's fingerprint can be: the whole catalog as it is
+    now, or the built-in content alone (saves written before any mods).
+    """
+    from content import load_content, content_directory
+
+    builtin = load_content(content_directory, mods=None, cache=None)
+    crcs = set()
+    for items, skills, monsters in ((drop_table, skill_table, monster_list),
+                                    (builtin["items"], builtin["skills"], builtin["monsters"])):
+        names = [i["name"] for i in items] + [s["name"] for s in skills] + [m["name"] for m in monsters]
+        crcs.add(zlib.crc32("\n".join(names).encode("utf-8")))
+    return crcs
+
+
+class CatalogChanged(ValueError):
+    """
+    Raised when a save refers to catalog entries that have since been
+    renamed, reordered or removed.
+    """
+
+def copy_item(item):
+    # Items only nest one level deep (the bonus dict), which is far cheaper to copy than deepcopy()
+    item = dict(item)
+    for key, value in item.items():
+        if isinstance(value, dict):
+            if any(isinstance(v, (dict, list)) for v in value.values()):
+                return copy.deepcopy(item)
+            item[key] = dict(value)
+        elif isinstance(value, list):
+            return copy.deepcopy(item)
+    return item
+
+def copy_catalog_item(code):
+    # drop_table entries are flat apart from the bonus dict
+    item = dict(drop_table[code])
+    if "bonus" in item:
+        item["bonus"] = dict(item["bonus"])
+    return item
+
+field_plans = {}
+
+def field_plan(mask):
+    """
+    Splits the header fields present in a mask into ints, bools (with their
+    bit in the bool byte) and strings, cached per mask since nearly every
+    save has the same one.
+    """
+    plan = field_plans.get(mask)
+    if plan is None:
+        present = [f for bit, f in enumerate(header_fields) if mask >> bit & 1]
+        ints, bools, strs = ([f[:2] for f in present if f[2] is kind] for kind in (int, bool, str))
+        plan = field_plans[mask] = (ints, [(section, key, 1 << bool_bits[key]) for section, key in bools], strs)
+    return plan
+
+def is_binary(raw):
+    return raw[:len(MAGIC)] == MAGIC
+
+
+# === Encoding ===
+class Writer:
+    def __init__(self):
+        self.parts = []
+
+    def pack(self, s, *values):
+        self.parts.append(s.pack(*values))
+
+    def text(self, value):
+        raw = value.encode("utf-8")
+        self.parts.append(u32.pack(len(raw)))
+        self.parts.append(raw)
+
+    def blob(self, value):
+        self.text(json.dumps(value, separators=(",", ":"), ensure_ascii=False))
+
+    def getvalue(self):
+        return b"".join(self.parts)
+
+def encode(data):
+    """
+    Encodes a {"player": ..., "persistent_stats": ...} save into bytes.
+    Anything the compact sections can't represent exactly is kept in a JSON
+    extras blob, so decode(encode(data)) == data for any save.
+    """
+    player = dict(data.get("player", {}))
+    stats = dict(data.get("persistent_stats", {}))
+    sections = {"player": player, "persistent_stats": stats}
+
+    mask = 0
+    bools = 0
+    ints = array("q")
+    strings = []
+    for bit, (section, key, kind) in enumerate(header_fields):
+        value = sections[section].get(key)
+        if type(value) is not kind or (kind is int and not -2**63 <= value < 2**63):
+            continue
+        mask |= 1 << bit
+        del sections[section][key]
+        if kind is int:
+            ints.append(value)
+        elif kind is bool:
+            bools |= int(value) << bool_bits[key]
+        else:
+            strings.append(value)
+
+    out = Writer()
+    out.parts.append(None)  # the header, once the catalog counts are known
+    out.parts.append(ints.tobytes())
+    for value in strings:
+        out.text(value)
+
+    counts = (encode_items(out, player), encode_skills(out, player), encode_monsters(out, stats))
+    out.parts[0] = header_struct.pack(MAGIC, FORMAT_VERSION, catalog_fingerprint(counts), *counts, mask, bools)
+
+    extras = {"player": player, "persistent_stats": stats}
+    extras.update({k: v for k, v in data.items() if k not in ("player", "persistent_stats")})
+    out.blob(extras)
+    return out.getvalue()
+
+def encode_items(out, player):
+    inventory = player.get("inventory")
+    equipped = player.get("equipped")
+    if not (isinstance(inventory, list) and isinstance(equipped, list)) or len(inventory) >= SAME_AS_INVENTORY:
+        out.pack(u8, 0)
+        return 0
+    out.pack(u8, 1)
+    del player["inventory"], player["equipped"]
+
+    codes = array("H")
+    inline = []
+    for item in inventory:
+        codes.append(item_code(item, None, inline))
+    for item in equipped:
+        codes.append(item_code(item, inventory, inline))
+    out.pack(item_counts, len(inventory), len(equipped))
+    out.parts.append(codes.tobytes())
+    for item in inline:
+        out.blob(item)
+    return max([code + 1 for code in codes if code < SAME_AS_INVENTORY], default=0)
+
+def item_code(item, inventory, inline):
+    idx = catalog.item_ids.get(item.get("name")) if isinstance(item, dict) else None
+    if idx is not None and drop_table[idx] == item:
+        return idx
+    if inventory is not None and item in inventory:
+        return SAME_AS_INVENTORY | inventory.index(item)
+    inline.append(item)
+    return INLINE
+
+def encode_skills(out, player):
+    skills = player.get("skills")
+    sd = player.get("skill_data")
+    if not compact_skills_ok(skills, sd):
+        out.pack(u8, 0)
+        return 0
+    out.pack(u8, 1)
+    del player["skills"], player["skill_data"]
+
+    # One array per column, so decoding is a handful of frombytes() calls
+    names = array("H")
+    dice_kinds = array("B")
+    dice_nums = array("I")
+    dice_sides = array("I")
+    texts = []
+    for name, dice_str in zip(skills, sd["damage"]):
+        idx = catalog.skill_ids.get(name)
+        if idx is None:
+            names.append(INLINE)
+            texts.append(name)
+        else:
+            names.append(idx)
+        kind, num, sides = split_dice(dice_str)
+        dice_kinds.append(kind)
+        dice_nums.append(num)
+        dice_sides.append(sides)
+        if kind == DICE_RAW:
+            texts.append(dice_str)
+
+    out.pack(u16, len(skills))
+    for column in (names, dice_kinds, dice_nums, dice_sides,
+                   array("i", sd["attacks"]), array("i", sd["healing"]), array("i", sd["mana_costs"])):
+        out.parts.append(column.tobytes())
+    for text in texts:
+        out.text(text)
+    return max([code + 1 for code in names if code != INLINE], default=0)
+
+def compact_skills_ok(skills, sd):
+    if not isinstance(skills, list) or not isinstance(sd, dict) or set(sd) != set(skill_data_keys):
+        return False
+    if not all(isinstance(sd[k], list) and len(sd[k]) == len(skills) for k in skill_data_keys):
+        return False
+    if len(skills) >= 2**16 or not all(type(name) is str for name in skills) or not all(type(d) is str for d in sd["damage"]):
+        return False
+    for key in ("attacks", "healing", "mana_costs"):
+        if not all(type(v) is int and -2**31 <= v < 2**31 for v in sd[key]):
+            return False
+    return True
+
+def split_dice(dice_str):
+    num, _, sides = dice_str.partition("d")
+    if num.isdigit() and sides.isdigit() and f"{int(num)}d{int(sides)}" == dice_str and int(num) < 2**32 and int(sides) < 2**32:
+        return DICE_XDY, int(num), int(sides)
+    if dice_str.isdigit() and str(int(dice_str)) == dice_str and int(dice_str) < 2**32:
+        return DICE_FLAT, int(dice_str), 0
+    return DICE_RAW, 0, 0
+
+def encode_monsters(out, stats):
+    if "current_monsters" not in stats:
+        out.pack(u8, MONSTERS_ELSEWHERE)
+        return 0
+    monsters = stats["current_monsters"]
+    if monsters is None:
+        out.pack(u8, MONSTERS_NONE)
+        del stats["current_monsters"]
+        return 0
+    refs = []
+    for m in monsters if isinstance(monsters, list) else [None]:
+        idx = None
+        if isinstance(m, dict) and set(m) == {"name", "health", "damage", "max_health"}:
+            idx = monster_index.get((m["name"], m["damage"]))
+            if type(m["health"]) is not int or type(m["max_health"]) is not int:
+                idx = None
+        if idx is None:
+            out.pack(u8, MONSTERS_ELSEWHERE)
+            return 0
+        refs.append((idx, m["health"], m["max_health"]))
+    out.pack(monster_count, MONSTERS_LIST, len(refs))
+    for ref in refs:
+        out.pack(monster_ref, *ref)
+    del stats["current_monsters"]
+    return max([ref[0] + 1 for ref in refs], default=0)
+
+
+# === Decoding ===
+parse_json = json.JSONDecoder().decode  # json.loads() minus its argument checks
+
+class Reader:
+    def __init__(self, raw):
+        self.raw = raw
+        self.pos = 0
+
+    def unpack(self, s):
+        values = s.unpack_from(self.raw, self.pos)
+        self.pos += s.size
+        return values
+
+    def text(self):
+        start = self.pos + 4
+        self.pos = start + u32.unpack_from(self.raw, self.pos)[0]
+        return str(self.raw[start:self.pos], "utf-8")
+
+    def blob(self):
+        return parse_json(self.text())
+
+def decode(raw):
+    """
+    Decodes bytes written by encode() back into a save dict.
+    """
+    magic, version, fingerprint, mask, bools, size = read_header(raw)
+    if version == 1:
+        matches = fingerprint in legacy_fingerprints()
+    else:
+        counts = header_struct.unpack_from(raw, 0)[3:6]
+        matches = fingerprint == catalog_fingerprint(counts)
+    if not matches:
+        raise CatalogChanged("the items, skills or monsters this save uses have changed since it was written")
+
+    data = {"player": {}, "persistent_stats": {}}
+    int_fields, bool_fields, str_fields = field_plan(mask)
+
+    r = Reader(raw)
+    r.pos = size
+    for (section, key), value in zip(int_fields, read_array(r, "q", len(int_fields))):
+        data[section][key] = value
+    for section, key, bit in bool_fields:
+        data[section][key] = bool(bools & bit)
+    for section, key in str_fields:
+        data[section][key] = r.text()
+
+    decode_items(r, data["player"])
+    decode_skills(r, data["player"])
+    decode_monsters(r, data["persistent_stats"])
+
+    extras = r.blob()
+    data["player"].update(extras.pop("player", {}))
+    data["persistent_stats"].update(extras.pop("persistent_stats", {}))
+    data.update(extras)
+    return data
+
+def read_header(raw):
+    # (magic, version, fingerprint, mask, bools, header size) for either header version
+    magic, version = magic_struct.unpack_from(raw, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a binary Eyum save")
+    if version == 1:
+        magic, version, fingerprint, mask, bools = header_struct_v1.unpack_from(raw, 0)
+        return magic, version, fingerprint, mask, bools, header_struct_v1.size
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported binary save version {version}")
+    magic, version, fingerprint, _, _, _, mask, bools = header_struct.unpack_from(raw, 0)
+    return magic, version, fingerprint, mask, bools, header_struct.size
+
+item_sizes = {typecode: array(typecode).itemsize for typecode in "BHiIq"}
+
+def read_array(r, typecode, count):
+    start = r.pos
+    r.pos += item_sizes[typecode] * count
+    return array(typecode, r.raw[start:r.pos])  # frombytes() on the slice
+
+def decode_items(r, player):
+    (present,) = r.unpack(u8)
+    if not present:
+        return
+    inv_count, eq_count = r.unpack(item_counts)
+    codes = read_array(r, "H", inv_count + eq_count)
+    inventory = []
+    for code in codes[:inv_count]:
+        inventory.append(r.blob() if code == INLINE else copy_catalog_item(code))
+    equipped = []
+    for code in codes[inv_count:]:
+        if code == INLINE:
+            equipped.append(r.blob())
+        elif code & SAME_AS_INVENTORY:
+            equipped.append(copy_item(inventory[code & ~SAME_AS_INVENTORY]))
+        else:
+            equipped.append(copy_catalog_item(code))
+    player["inventory"] = inventory
+    player["equipped"] = equipped
+
+def decode_skills(r, player):
+    (present,) = r.unpack(u8)
+    if not present:
+        return
+    (count,) = r.unpack(u16)
+    names = read_array(r, "H", count)
+    dice_kinds = read_array(r, "B", count)
+    dice_nums = read_array(r, "I", count)
+    dice_sides = read_array(r, "I", count)
+    attacks = read_array(r, "i", count)
+    healing = read_array(r, "i", count)
+    mana_costs = read_array(r, "i", count)
+
+    skills = []
+    damage = []
+    for code, kind, num, sides in zip(names, dice_kinds, dice_nums, dice_sides):
+        skills.append(r.text() if code == INLINE else skill_table[code]["name"])
+        if kind == DICE_XDY:
+            damage.append(f"{num}d{sides}")
+        elif kind == DICE_FLAT:
+            damage.append(str(num))
+        else:
+            damage.append(r.text())
+    player["skills"] = skills
+    player["skill_data"] = {
+        "damage": damage,
+        "attacks": attacks.tolist(),
+        "healing": healing.tolist(),
+        "mana_costs": mana_costs.tolist(),
+    }
+
+def decode_monsters(r, stats):
+    (mode,) = r.unpack(u8)
+    if mode == MONSTERS_NONE:
+        stats["current_monsters"] = None
+    elif mode == MONSTERS_LIST:
+        (count,) = r.unpack(u16)
+        monsters = []
+        for _ in range(count):
+            idx, health, max_health = r.unpack(monster_ref)
+            m = dict(monster_list[idx])
+            m["health"] = health
+            m["max_health"] = max_health
+            monsters.append(m)
+        stats["current_monsters"] = monsters
+
+def peek_is_dead(raw):
+    """
+    Reads is_dead straight from the header without decoding the rest.
+    """
+    magic, version, fingerprint, mask, bools, size = read_header(raw)
+    bit = [f[1] for f in header_fields].index("is_dead")
+    return bool(mask >> bit & 1 and bools >> bool_bits["is_dead"] & 1)
+
+
+# === Converter ===
+def convert_saves(directory, to="binary", keep=False):
+    """
+    Converts every save in the directory (backups included) to the given
+    format, replaying journals first. Each file is checked to round-trip
+    exactly before the original is removed.
+    """
+    from save_journal import read_save, write_snapshot
+
+    source_ext, target_ext = (".json", binary_extension) if to == "binary" else (binary_extension, ".json")
+    converted = 0
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(source_ext):
+            continue
+        source = os.path.join(directory, filename)
+        target = os.path.splitext(source)[0] + target_ext
+        try:
+            data = read_save(source)
+            if decode(encode(data)) != data:
+                print(f"  ! {filename}: doesn't round-trip, left as is")
+                continue
+            write_snapshot(target, data)
+            if not keep:
+                os.remove(source)
+            print(f"  {filename} -> {os.path.basename(target)}")
+            converted += 1
+        except Exception as e:
+            print(f"  ! {filename}: {e}")
+    return converted
+
+
+# === Benchmark ===
+def late_game_save(data):
+    """
+    Blows a save up to what it looks like deep into a run: every item owned,
+    most of them equipped, and every skill learned.
+    """
+    data = copy.deepcopy(data)
+    player = data["player"]
+    player["inventory"] = [copy.deepcopy(i) for i in drop_table]
+    player["equipped"] = [copy.deepcopy(i) for i in drop_table[::3]]
+    sd = player.setdefault("skill_data", {k: [] for k in skill_data_keys})
+    player.setdefault("skills", [])
+    for skill in skill_table:
+        player["skills"].append(skill["name"])
+        sd["damage"].append(skill["damage"])
+        sd["attacks"].append(skill["attacks"])
+        sd["healing"].append(skill["healing"])
+        sd["mana_costs"].append(skill["mana_cost"])
+    player["skill_upgrade_costs"] = [1] * len(player["skills"])
+    return data
+
+def time_parse(parse, raw, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        parse(raw)
+    return (time.perf_counter() - start) / rounds * 1e6
+
+def benchmark(directory, rounds=2000):
+    from save_journal import read_save
+
+    samples = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith((".json", binary_extension)):
+            data = read_save(os.path.join(directory, filename))
+            samples.append((filename, data))
+    if samples:
+        samples.append(("late game (synthetic)", late_game_save(samples[0][1])))
+
+    print(f"{'save':<32}{'json B':>9}{'bin B':>9}{'json us':>10}{'bin us':>10}")
+    for label, data in samples:
+        as_json = json.dumps(data, indent=4).encode("utf-8")
+        as_bin = encode(data)
+        json_us = time_parse(json.loads, as_json, rounds)
+        bin_us = time_parse(decode, as_bin, rounds)
+        print(f"{label:<32}{len(as_json):>9}{len(as_bin):>9}{json_us:>10.1f}{bin_us:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert or benchmark Eyum saves.")
+    parser.add_argument("command", choices=["convert", "bench"])
+    parser.add_argument("--dir", default="eyum/saves")
+    parser.add_argument("--to", choices=["binary", "json"], default="binary")
+    parser.add_argument("--keep", action="store_true", help="keep the original files after converting")
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        count = convert_saves(args.dir, args.to, args.keep)
+        print(f"Converted {count} save(s).")
+    else:
+        benchmark(args.dir, args.rounds)
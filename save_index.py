@@ -0,0 +1,124 @@
+# save_index.py
+import os
+import json
+
+import save_binary
+from save_journal import find_save_path, journal_path_for
+
+index_name = "saves.index"  # not a save extension, so converters and imports skip it
+INDEX_VERSION = 1
+
+
+def file_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class SaveIndex:
+    """
+    Small manifest of per-character summaries (alive/dead, level, floor, HP)
+    so the title screen doesn't have to parse every save.
+
+    Entries are updated in memory on every save and only written out at the
+    checkpoints (compaction, floor change, exit), so journaled turns don't
+    rewrite the index.
+
+    Each entry remembers the mtime of the save snapshot it was built from; if
+    that has changed (or the file is gone), the entry is rebuilt from the save
+    and rewritten. A journal written after the entry just means the entry is
+    behind: the save is replayed to get the summary, and the index on disk is
+    left alone until the next checkpoint.
+    """
+
+    def __init__(self, save_directory):
+        self.save_directory = save_directory
+        self.path = os.path.join(save_directory, index_name)
+        self.entries = None
+        self.dirty = False
+
+    def load(self):
+        if self.entries is not None:
+            return
+        self.entries = {}
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                self.entries = data.get("characters", {})
+        except (OSError, ValueError):
+            pass  # missing or corrupt, entries get rebuilt as they're asked for
+
+    def write(self):
+        if not self.dirty:
+            return
+        with open(self.path, "w") as f:
+            json.dump({"version": INDEX_VERSION, "characters": self.entries}, f, separators=(",", ":"))
+        self.dirty = False
+
+    def summary(self, name, read_save):
+        """
+        Returns the summary for a character, or None if they have no save.
+        read_save(path) is only called when the entry is missing or stale.
+        """
+        self.load()
+        entry = self.entries.get(name)
+        if entry is not None and self.is_fresh(entry):
+            if not self.behind_journal(entry):
+                return entry
+            path = os.path.join(self.save_directory, entry["file"])
+            try:
+                data = read_save(path)
+            except Exception:
+                return {"file": entry["file"], "corrupt": True}
+            return self.record(name, data, path, dirty=False)
+        path = find_save_path(self.save_directory, name)
+        if path is None:
+            if name in self.entries:
+                del self.entries[name]
+                self.dirty = True
+            return None
+        try:
+            data = read_save(path)
+        except Exception:
+            return {"file": os.path.basename(path), "corrupt": True}
+        return self.record(name, data, path)
+
+    def is_fresh(self, entry):
+        path = os.path.join(self.save_directory, entry["file"])
+        return file_mtime(path) == entry["mtime"]
+
+    def behind_journal(self, entry):
+        journal_mtime = file_mtime(journal_path_for(os.path.join(self.save_directory, entry["file"])))
+        return journal_mtime is not None and journal_mtime > (entry.get("journal_mtime") or 0)
+
+    def record(self, name, data, path, dirty=True):
+        """
+        Updates a character's entry right after their save was written. Only
+        changes memory; write() puts it on disk.
+        """
+        self.load()
+        player = data.get("player", {})
+        stats = data.get("persistent_stats", {})
+        entry = {
+            "file": os.path.basename(path),
+            "format": "binary" if path.endswith(save_binary.binary_extension) else "json",
+            "format_version": save_binary.FORMAT_VERSION if path.endswith(save_binary.binary_extension) else None,
+            "version": stats.get("current_version"),
+            "is_dead": stats.get("is_dead", False),
+            "level": player.get("level", 1),
+            "floor": stats.get("floor", 1),
+            "health": player.get("health", 0),
+            "max_health": player.get("max_health", 0),
+            "mtime": file_mtime(path),
+            "journal_mtime": file_mtime(journal_path_for(path)),
+        }
+        self.entries[name] = entry
+        self.dirty = self.dirty or dirty
+        return entry
+
+    def remove(self, name):
+        self.load()
+        if self.entries.pop(name, None) is not None:
+            self.dirty = True
@@ -0,0 +1,219 @@
+# save_journal.py
+import os
+import json
+import copy
+import zlib
+
+import save_binary
+
+# === Settings ===
+compact_every = 50  # journal entries before they get folded back into the snapshot
+
+save_extensions = (".json", save_binary.binary_extension)
+
+# Short keys keep each journal line down to a few dozen bytes
+section_keys = {"player": "p", "persistent_stats": "s"}
+
+# A journal starts with {"base": id} naming the snapshot it continues (see
+# snapshot_id()). Compaction replaces the snapshot before it removes the
+# journal, so after a crash between the two the journal names the old
+# snapshot and is dropped instead of replayed over the new one.
+
+
+# === Snapshot + Journal Files ===
+def journal_path_for(save_path):
+    return os.path.splitext(save_path)[0] + ".journal"
+
+def find_save_path(directory, name, preferred=".json"):
+    """
+    Returns the path of a character's save in whichever format exists
+    (the preferred one if both do), or None if there isn't one.
+    """
+    found = None
+    for ext in save_extensions:
+        path = os.path.join(directory, name + ext)
+        if os.path.exists(path):
+            if ext == preferred:
+                return path
+            found = path
+    return found
+
+def snapshot_id(raw):
+    # Tells snapshots apart: the play counters in a save change with every turn
+    return f"{zlib.crc32(raw):08x}-{len(raw)}"
+
+def read_snapshot(path):
+    """
+    (save dict, snapshot_id) for a snapshot file, JSON or binary.
+    """
+    # Binary saves are recognised by their magic bytes, not the extension
+    with open(path, "rb") as f:
+        raw = f.read()
+    if save_binary.is_binary(raw):
+        return save_binary.decode(raw), snapshot_id(raw)
+    return json.loads(raw.decode("utf-8")), snapshot_id(raw)
+
+def load_snapshot(path):
+    return read_snapshot(path)[0]
+
+def dump_snapshot(path, data):
+    """
+    Writes a snapshot and returns its snapshot_id.
+    """
+    # Written to a temporary file first so a crash mid-compaction never loses the save
+    if path.endswith(save_binary.binary_extension):
+        raw = save_binary.encode(data)
+    else:
+        raw = json.dumps(data, indent=4).encode("utf-8")
+    temp = path + ".tmp"
+    with open(temp, "wb") as f:
+        f.write(raw)
+    os.replace(temp, path)
+    return snapshot_id(raw)
+
+def read_save(path, journal=None):
+    """
+    Reads a save snapshot (JSON or binary) and replays any journal entries
+    written after it. If a SaveJournal is passed, it's started from what was
+    read so the next entries continue the same journal.
+    """
+    data, base = read_snapshot(path)
+    data.setdefault("player", {})
+    data.setdefault("persistent_stats", {})
+    entries = replay_journal(data, journal_path_for(path), base)
+    if journal is not None:
+        journal.start(data, entries, base)
+    return data
+
+def write_snapshot(path, data):
+    """
+    Writes a full snapshot and drops the journal, since the snapshot now
+    covers it. Returns the new snapshot's snapshot_id.
+    """
+    base = dump_snapshot(path, data)
+    journal_path = journal_path_for(path)
+    if os.path.exists(journal_path):
+        os.remove(journal_path)
+    return base
+
+def replay_journal(data, journal_path, base=None):
+    """
+    Applies the journal's entries to data and returns how many there were.
+    A journal that continues a different snapshot than base is deleted
+    unread, and a torn last line is cut off.
+    """
+    if not os.path.exists(journal_path):
+        return 0
+    count = 0
+    good = 0  # bytes of whole entries read so far
+    with open(journal_path, "rb") as f:
+        raw = f.read()
+    for line in raw.splitlines(keepends=True):
+        if not line.endswith(b"\n"):
+            break  # torn line from a crash mid-write, everything before it is good
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            break
+        good += len(line)
+        if "base" in entry:
+            if base is not None and entry["base"] != base:
+                os.remove(journal_path)  # left over from a compaction that crashed before removing it
+                return 0
+            continue
+        apply_entry(data, entry)
+        count += 1
+    if good < len(raw):
+        # Cut the torn tail off, or the next entries would be appended after it and never replayed
+        with open(journal_path, "r+b") as f:
+            f.truncate(good)
+    return count
+
+def apply_entry(data, entry):
+    for section, short in section_keys.items():
+        if short in entry:
+            data.setdefault(section, {}).update(entry[short])
+    if "mhp" in entry:
+        monsters = data["persistent_stats"].get("current_monsters") or []
+        for m, hp in zip(monsters, entry["mhp"]):
+            m["health"] = hp
+
+
+# === Journal Writer ===
+class SaveJournal:
+    """
+    Appends compact per-save deltas to <save>.journal instead of rewriting the
+    whole save file, and compacts them into a full snapshot every
+    compact_every entries (or whenever compact() is called, e.g. on exit).
+    """
+
+    def __init__(self, save_path, every=None):
+        self.save_path = save_path
+        self.journal_path = journal_path_for(save_path)
+        self.every = every or compact_every
+        self.entries = 0
+        self.last = None  # what the snapshot + journal on disk currently add up to
+        self.base = None  # snapshot_id of the snapshot the journal continues
+
+    def start(self, data, entries=0, base=None):
+        """
+        Sets the baseline to a save that was just read from disk (or written).
+        """
+        self.last = copy.deepcopy(data)
+        self.entries = entries
+        self.base = base
+
+    def record(self, data):
+        if self.last is None or self.entries >= self.every:
+            self.compact(data)
+            return
+        entry = self.diff(data)
+        if entry is None:
+            self.compact(data)
+            return
+        if not entry:
+            return
+        lines = json.dumps(entry, separators=(",", ":")) + "\n"
+        if self.entries == 0 and self.base is not None and not os.path.exists(self.journal_path):
+            lines = json.dumps({"base": self.base}) + "\n" + lines
+        with open(self.journal_path, "a") as f:
+            f.write(lines)
+        self.entries += 1
+
+    def compact(self, data):
+        self.start(data, 0, write_snapshot(self.save_path, data))
+
+    def diff(self, data):
+        """
+        Returns the entry that turns self.last into data (updating self.last to
+        match), or None if the change can't be expressed as a delta.
+        """
+        entry = {}
+        for section, short in section_keys.items():
+            current = data.get(section, {})
+            last = self.last.setdefault(section, {})
+            if any(key not in current for key in last):
+                return None
+            changed = {}
+            for key, value in current.items():
+                if key in last and last[key] == value:
+                    continue
+                if key == "current_monsters" and self.only_health_changed(last.get(key), value):
+                    entry["mhp"] = [m["health"] for m in value]
+                else:
+                    changed[key] = value
+                last[key] = copy.deepcopy(value)
+            if changed:
+                entry[short] = changed
+        return entry
+
+    @staticmethod
+    def only_health_changed(old, new):
+        if not old or not new or len(old) != len(new):
+            return False
+        for a, b in zip(old, new):
+            if a.keys() != b.keys():
+                return False
+            if any(a[k] != b[k] for k in a if k != "health"):
+                return False
+        return True
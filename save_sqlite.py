@@ -0,0 +1,238 @@
+# save_sqlite.py
+# Optional SQLite save backend. Usage:
+#   python save_sqlite.py import [--dir eyum/saves] [--db eyum/saves/eyum.db]
+#   python save_sqlite.py export [--dir eyum/saves] [--db eyum/saves/eyum.db] [--format json|binary]
+import os
+import re
+import json
+import sqlite3
+import argparse
+
+database_name = "eyum.db"
+
+schema = """
+CREATE TABLE IF NOT EXISTS characters (
+    name TEXT PRIMARY KEY,
+    level INTEGER,
+    health INTEGER,
+    max_health INTEGER,
+    floor INTEGER,
+    is_dead INTEGER NOT NULL DEFAULT 0,
+    player TEXT NOT NULL  -- every player field except inventory/equipped, as JSON
+);
+CREATE TABLE IF NOT EXISTS items (
+    character TEXT NOT NULL REFERENCES characters(name) ON DELETE CASCADE,
+    slot TEXT NOT NULL,  -- 'inventory' or 'equipped'
+    position INTEGER NOT NULL,
+    name TEXT,
+    type TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (character, slot, position)
+);
+CREATE INDEX IF NOT EXISTS items_by_name ON items(name);
+CREATE TABLE IF NOT EXISTS run_state (
+    character TEXT NOT NULL REFERENCES characters(name) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,  -- one persistent_stats entry, as JSON
+    PRIMARY KEY (character, key)
+);
+CREATE TABLE IF NOT EXISTS backups (
+    character TEXT NOT NULL,
+    floor INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (character, floor)
+);
+"""
+
+item_slots = ("inventory", "equipped")
+backup_file_pattern = re.compile(r"^(?P<name>.+)_backup_floor(?P<floor>\d+)$")
+
+
+def dumps(value):
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+class SqliteSaveStore:
+    """
+    Keeps every character in one SQLite database instead of a file each.
+    save_many() writes any number of characters (and floor backups) in a
+    single transaction, so equips, transfers and party heals either land
+    completely or not at all.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(schema)
+
+    def close(self):
+        self.conn.close()
+
+    # === Reads ===
+    def exists(self, name):
+        row = self.conn.execute("SELECT 1 FROM characters WHERE name = ?", (name,)).fetchone()
+        return row is not None
+
+    def names(self):
+        return [row[0] for row in self.conn.execute("SELECT name FROM characters ORDER BY name")]
+
+    def load(self, name):
+        """
+        Returns the {"player": ..., "persistent_stats": ...} dict for a character,
+        or None if they aren't in the database.
+        """
+        row = self.conn.execute("SELECT player FROM characters WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        player = json.loads(row[0])
+        for slot in item_slots:
+            player[slot] = []
+        items = self.conn.execute(
+            "SELECT slot, data FROM items WHERE character = ? ORDER BY slot, position", (name,))
+        for slot, data in items:
+            player[slot].append(json.loads(data))
+        stats = {}
+        for key, value in self.conn.execute("SELECT key, value FROM run_state WHERE character = ?", (name,)):
+            stats[key] = json.loads(value)
+        return {"player": player, "persistent_stats": stats}
+
+    def summary(self, name):
+        """
+        The handful of fields the title screen needs, without loading the rest.
+        """
+        row = self.conn.execute(
+            "SELECT level, health, max_health, floor, is_dead FROM characters WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        level, health, max_health, floor, is_dead = row
+        return {"level": level, "health": health, "max_health": max_health, "floor": floor, "is_dead": bool(is_dead)}
+
+    def load_backup(self, name, floor):
+        row = self.conn.execute(
+            "SELECT data FROM backups WHERE character = ? AND floor = ?", (name, floor)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # === Writes ===
+    def save_many(self, saves, backups=None):
+        """
+        Writes every {name: save} in saves, plus any {name: (floor, save)}
+        backups, as one transaction.
+        """
+        with self.conn:
+            for name, data in saves.items():
+                self.write_character(name, data)
+            for name, (floor, data) in (backups or {}).items():
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO backups (character, floor, data) VALUES (?, ?, ?)",
+                    (name, floor, dumps(data)))
+
+    def write_character(self, name, data):
+        player = data.get("player", {})
+        stats = data.get("persistent_stats", {})
+        rest = {k: v for k, v in player.items() if k not in item_slots}
+        self.conn.execute(
+            "INSERT INTO characters (name, level, health, max_health, floor, is_dead, player) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET level = excluded.level, health = excluded.health, "
+            "max_health = excluded.max_health, floor = excluded.floor, is_dead = excluded.is_dead, "
+            "player = excluded.player",
+            (name, player.get("level"), player.get("health"), player.get("max_health"),
+             stats.get("floor"), int(bool(stats.get("is_dead"))), dumps(rest)))
+        self.conn.execute("DELETE FROM items WHERE character = ?", (name,))
+        self.conn.execute("DELETE FROM run_state WHERE character = ?", (name,))
+        rows = []
+        for slot in item_slots:
+            for position, item in enumerate(player.get(slot, [])):
+                rows.append((name, slot, position, item.get("name"), item.get("type"), dumps(item)))
+        self.conn.executemany(
+            "INSERT INTO items (character, slot, position, name, type, data) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self.conn.executemany(
+            "INSERT INTO run_state (character, key, value) VALUES (?, ?, ?)",
+            [(name, key, dumps(value)) for key, value in stats.items()])
+
+    def delete(self, name):
+        with self.conn:
+            self.conn.execute("DELETE FROM characters WHERE name = ?", (name,))
+
+    # === Import / Export ===
+    def import_directory(self, directory, conflicts=None):
+        """
+        Loads every save in the file layout (backups included) in one transaction.
+        When a save is there in both formats (X.json and X.sav) the newer file
+        wins, and (kept, skipped) filenames are added to conflicts if given.
+        """
+        from save_journal import read_save, save_extensions
+
+        newest = {}  # name without extension -> (mtime, filename)
+        for filename in sorted(os.listdir(directory)):
+            base, ext = os.path.splitext(filename)
+            if ext not in save_extensions:
+                continue
+            mtime = os.path.getmtime(os.path.join(directory, filename))
+            other = newest.get(base)
+            if other is not None:
+                newer = mtime > other[0]
+                if conflicts is not None:
+                    conflicts.append((filename, other[1]) if newer else (other[1], filename))
+                if not newer:
+                    continue
+            newest[base] = (mtime, filename)
+
+        saves = {}
+        backups = []
+        for base, (_, filename) in sorted(newest.items()):
+            data = read_save(os.path.join(directory, filename))
+            match = backup_file_pattern.match(base)
+            if match:
+                backups.append((match.group("name"), int(match.group("floor")), data))
+            else:
+                saves[base] = data
+        with self.conn:
+            for name, data in saves.items():
+                self.write_character(name, data)
+            for name, floor, data in backups:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO backups (character, floor, data) VALUES (?, ?, ?)",
+                    (name, floor, dumps(data)))
+        return len(saves), len(backups)
+
+    def export_directory(self, directory, extension=".json"):
+        """
+        Writes every character and backup back out in the file layout.
+        """
+        from save_journal import write_snapshot
+
+        os.makedirs(directory, exist_ok=True)
+        names = self.names()
+        for name in names:
+            write_snapshot(os.path.join(directory, name + extension), self.load(name))
+        rows = self.conn.execute("SELECT character, floor, data FROM backups").fetchall()
+        for name, floor, data in rows:
+            write_snapshot(os.path.join(directory, f"{name}_backup_floor{floor}{extension}"), json.loads(data))
+        return len(names), len(rows)
+
+
+if __name__ == "__main__":
+    from save_binary import binary_extension
+
+    parser = argparse.ArgumentParser(description="Move Eyum saves between the save folder and SQLite.")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("--dir", default="eyum/saves")
+    parser.add_argument("--db", default=None, help="defaults to <dir>/eyum.db")
+    parser.add_argument("--format", choices=["json", "binary"], default="json", help="file format for export")
+    args = parser.parse_args()
+
+    store = SqliteSaveStore(args.db or os.path.join(args.dir, database_name))
+    if args.command == "import":
+        conflicts = []
+        count, backup_count = store.import_directory(args.dir, conflicts)
+        for kept, skipped in conflicts:
+            print(f"  ! {kept} and {skipped} are the same save; imported the newer one, {kept}")
+        print(f"Imported {count} character(s) and {backup_count} backup(s) into {store.path}")
+    else:
+        ext = binary_extension if args.format == "binary" else ".json"
+        count, backup_count = store.export_directory(args.dir, ext)
+        print(f"Exported {count} character(s) and {backup_count} backup(s) to {args.dir}")
+    store.close()
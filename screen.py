@@ -0,0 +1,239 @@
+# screen.py
+# Draws the game one frame at a time instead of clearing the terminal and
+# printing everything again.
+#
+# A Screen stands in for sys.stdout. Everything printed after new_frame()
+# goes into a buffer, and flush() (which input() calls before reading, and
+# GameSession.pause() before waiting) compares it with what's already on the
+# terminal and rewrites only the lines that changed, in a single write.
+# Frames too tall for the terminal are printed as they come, and terminals
+# without ANSI support get plain output with no clearing at all.
+#
+#   python screen.py bench   compare a frame against spawning `clear`
+import os
+import re
+import time
+import shutil
+import argparse
+
+sgr_pattern = re.compile(r"\x1b\[[0-9;]*m")  # color and style codes
+ansi_pattern = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+
+RESET = "\x1b[0m"
+CLEAR_LINE_END = "\x1b[K"
+CLEAR_BELOW = "\x1b[J"
+CLEAR_ALL = "\x1b[H\x1b[2J"
+
+
+def move_to(row, column=1):
+    return f"\x1b[{row};{column}H"
+
+def visible_length(text):
+    return len(ansi_pattern.sub("", text))
+
+def carry_state(state, text):
+    # The color/style codes still in effect after text, starting from state
+    for match in sgr_pattern.finditer(text):
+        code = match.group()
+        state = "" if code in (RESET, "\x1b[m") else state + code
+    return state
+
+def supports_ansi(stream):
+    """
+    Whether stream is a terminal that understands cursor movement. On
+    Windows this switches the console into VT mode if it can.
+    """
+    try:
+        if not stream.isatty():
+            return False
+    except (AttributeError, ValueError):
+        return False
+    if os.environ.get("TERM") == "dumb":
+        return False
+    if os.name != "nt":
+        return True
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+        mode = ctypes.c_uint32()
+        if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            return False
+        return bool(kernel32.SetConsoleMode(handle, mode.value | 0x0004))  # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+    except (AttributeError, OSError):
+        return False
+
+
+class Screen:
+    """
+    Frame buffer that diffs each frame against the terminal. Use it as
+    sys.stdout, call new_frame() instead of clearing the screen, and
+    typed(text) after reading input so it knows the terminal echoed it.
+    frames and render_time count the flushes that drew something.
+    """
+
+    def __init__(self, out, ansi=None, rows=None):
+        self.out = out
+        self.ansi = supports_ansi(out) if ansi is None else ansi
+        self.rows = rows  # terminal height, looked up on each frame if None
+        self.lines = [""]  # the frame so far; the last line is unfinished
+        self.states = [""]  # color state at the start of each line
+        self.state = ""  # color state at the end of the frame so far
+        self.shown = None  # (state, line) for each terminal row, None if unknown
+        self.streamed = None  # (line, column) printed so far, for frames too tall to diff
+        self.fresh = True  # nothing of this frame is on the terminal yet
+        self.frames = 0
+        self.render_time = 0.0
+
+    # === File interface ===
+    def write(self, text):
+        if not self.ansi:
+            return self.out.write(text)
+        parts = text.split("\n")
+        self.lines[-1] += parts[0]
+        self.state = carry_state(self.state, parts[0])
+        for part in parts[1:]:
+            self.lines.append(part)
+            self.states.append(self.state)
+            self.state = carry_state(self.state, part)
+        return len(text)
+
+    def flush(self):
+        if not self.ansi:
+            self.out.flush()
+            return
+        start = time.perf_counter()
+        output = self.render()
+        if output:
+            self.out.write(output)
+            self.frames += 1
+            self.render_time += time.perf_counter() - start
+        self.out.flush()
+
+    def isatty(self):
+        return self.out.isatty()
+
+    def fileno(self):
+        return self.out.fileno()
+
+    @property
+    def encoding(self):
+        return getattr(self.out, "encoding", "utf-8")
+
+    # === Frames ===
+    def new_frame(self):
+        """
+        Starts a new frame, which replaces the old one when it's flushed.
+        """
+        if not self.ansi:
+            return
+        self.flush()
+        self.lines = [""]
+        self.states = [self.state]
+        self.streamed = None
+        self.fresh = True
+
+    def typed(self, text):
+        """
+        Records a line the terminal echoed while reading input, so it isn't
+        drawn again.
+        """
+        if not self.ansi:
+            return
+        self.lines[-1] += text
+        self.lines.append("")
+        self.states.append(self.state)
+        if self.streamed is not None:
+            self.streamed = (len(self.lines) - 1, 0)
+        elif self.shown is not None:
+            row = len(self.lines) - 2
+            self.shown[row] = (self.states[row], self.lines[row])
+            self.shown.append((self.state, ""))
+
+    def render(self):
+        rows = self.rows or shutil.get_terminal_size().lines
+        if self.streamed is None and len(self.lines) >= rows:
+            # Too tall to position by row: the terminal is going to scroll, so just print in order
+            if self.fresh or not self.shown:
+                prefix = CLEAR_ALL
+                self.streamed = (0, 0)
+            else:
+                # Carry on from the part of this frame that's already drawn
+                last = self.shown[-1][1]
+                prefix = move_to(len(self.shown), visible_length(last) + 1) + RESET + self.shown[-1][0] + carry_state("", last)
+                self.streamed = (len(self.shown) - 1, len(last))
+            self.shown = None  # unknown once it scrolls, so the next frame starts from a clear screen
+            self.fresh = False
+            return prefix + self.stream_rest()
+        if self.streamed is not None:
+            return self.stream_rest()
+        self.fresh = False
+
+        parts = []
+        if self.shown is None:
+            parts.append(CLEAR_ALL)
+            self.shown = []
+        shown = self.shown
+        for row, entry in enumerate(zip(self.states, self.lines)):
+            if row >= len(shown) or shown[row] != entry:
+                parts.append(f"{move_to(row + 1)}{RESET}{entry[0]}{entry[1]}{CLEAR_LINE_END}")
+        if len(shown) > len(self.lines):
+            parts.append(f"{move_to(len(self.lines) + 1)}{RESET}{CLEAR_BELOW}")
+        if not parts:
+            return ""
+        # Leave the cursor (and colors) where the frame ends, ready for input
+        parts.append(move_to(len(self.lines), visible_length(self.lines[-1]) + 1) + RESET + self.state)
+        self.shown = list(zip(self.states, self.lines))
+        return "".join(parts)
+
+    def stream_rest(self):
+        line, column = self.streamed
+        text = self.lines[line][column:]
+        if line + 1 < len(self.lines):
+            text += "\n" + "\n".join(self.lines[line + 1:])
+        self.streamed = (len(self.lines) - 1, len(self.lines[-1]))
+        return text
+
+
+# === Benchmark ===
+def sample_frame(hp):
+    green, red, gray, reset = "\x1b[32m", "\x1b[31m", "\x1b[90m", RESET
+    bar = lambda n: f"\x1b[1m{green}{'█' * n}\x1b[37m{'░' * (40 - n)}{reset}"
+    lines = [reset, f"{green}Lucian (Lv4 {hp}/60)", f"{gray}Floor 2 - Room 5", "", f"{gray}--- Allies ---",
+             "George: 25 / 25 HP", "Ilana: 30 / 30 HP", "", "", f"{green}HP: {hp} / 60", bar(hp * 40 // 60),
+             "MP: 7 / 7", bar(40), f"{red}", "--- Monsters ---"]
+    for i in range(3):
+        lines += [f"{red}[{i + 1}] Goblin HP: {13 - i} / 13", bar(40 - i)]
+    lines += [f"{green}", "[1] Attack  [2] Use Skill  [3] Retreat  [4] Upgrade Menu  [5] Equipment  [6] Character Selection"]
+    return "\n".join(lines) + "\n" + green + "> "
+
+def bench(frames):
+    import io
+    out = io.StringIO()
+    screen = Screen(out, ansi=True, rows=50)
+    start = time.perf_counter()
+    for n in range(frames):
+        screen.new_frame()
+        screen.write(sample_frame(60 - n % 50))
+        screen.flush()
+    per_frame = (time.perf_counter() - start) / frames
+    print(f"diffed frame: {per_frame * 1e6:8.1f} us  ({len(out.getvalue()) / frames:.0f} bytes per frame)")
+
+    import subprocess
+    clear = ["cmd", "/c", "cls"] if os.name == "nt" else ["clear"]
+    runs = 20
+    try:
+        start = time.perf_counter()
+        for _ in range(runs):
+            subprocess.run(clear, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        print(f"spawning clear: {(time.perf_counter() - start) / runs * 1e6:8.1f} us")
+    except OSError:
+        print("spawning clear: not available here")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the frame renderer.")
+    parser.add_argument("command", choices=["bench"])
+    parser.add_argument("--frames", type=int, default=2000)
+    args = parser.parse_args()
+    bench(args.frames)
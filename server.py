@@ -0,0 +1,282 @@
+# server.py
+# Eyum for many players at once from one process, over plain TCP:
+#   python main.py --serve 4000 [--host 0.0.0.0]   then: telnet localhost 4000
+#   python server.py load [--clients 200]          time a local server with scripted players
+#
+# Each connection asks for a name and then plays its own main.GameSession,
+# with its saves in eyum/saves/<name>/. The game itself is ordinary
+# blocking code, so every session runs on a worker thread: its prints go
+# to its socket (through a sessions.ThreadOutput standing in for
+# sys.stdout) and its ask() waits for the next line the asyncio loop reads
+# off the socket. After every prompt the server sends telnet's Go Ahead
+# (IAC GA), which telnet clients ignore and bots can wait for.
+#
+# The combat odds are off unless the server is started with --odds: the
+# solver is most of the work in a turn, and every session shares the GIL.
+# Players who don't answer for idle_timeout seconds are disconnected, so
+# abandoned connections don't keep a worker thread each.
+import os
+import re
+import sys
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
+from main import GameSession, characters, save_directory
+from pacing import Pacer
+from sessions import ThreadOutput, RandomInput
+
+go_ahead = b"\xff\xf9"  # IAC GA
+telnet_command = re.compile(rb"\xff[\xfb-\xfe].|\xff[\xf0-\xfa]")  # option negotiation and other IAC commands
+valid_name = re.compile(r"[A-Za-z0-9_-]{1,24}")
+idle_timeout = 600  # seconds a player can leave a prompt unanswered before being disconnected
+
+
+class Connection:
+    """
+    One player's socket, seen from their game's thread: the output stream
+    their prints go to, and the input source for GameSession.ask(). Output
+    is buffered and sent when the game flushes or asks for input.
+    """
+
+    def __init__(self, loop, reader, writer, timeout=idle_timeout):
+        self.loop = loop
+        self.reader = reader
+        self.writer = writer
+        self.timeout = timeout
+        self.lines = asyncio.Queue()
+        self.pending = []
+
+    async def read_lines(self):
+        # Runs on the event loop, queueing every line the player sends (None once they're gone)
+        try:
+            while True:
+                data = await self.reader.readline()
+                if not data:
+                    break
+                text = telnet_command.sub(b"", data).decode("utf-8", "replace")
+                await self.lines.put(text.rstrip("\r\n"))
+        finally:
+            await self.lines.put(None)
+
+    async def prompt(self, text):
+        # Runs on the event loop: sends text and Go Ahead, then waits for the answer
+        self.writer.write(text.encode() + go_ahead)
+        await self.writer.drain()
+        try:
+            line = await asyncio.wait_for(self.lines.get(), self.timeout)
+        except asyncio.TimeoutError:
+            self.writer.write(b"\r\nDisconnected for being idle.\r\n")
+            line = None
+        if line is None:
+            self.lines.put_nowait(None)  # anyone asking after this gets None too
+        return line
+
+    # The game's side, called on its worker thread
+    def write(self, text):
+        self.pending.append(text)
+        return len(text)
+
+    def flush(self):
+        if self.pending:
+            data = "".join(self.pending).replace("\n", "\r\n").encode()
+            self.pending = []
+            try:
+                self.loop.call_soon_threadsafe(self.writer.write, data)
+            except RuntimeError:
+                pass  # the server has shut down, there's no one to send it to
+
+    def input(self, prompt=""):
+        self.flush()
+        try:
+            line = asyncio.run_coroutine_threadsafe(self.prompt(prompt.replace("\n", "\r\n")), self.loop).result()
+        except (CancelledError, RuntimeError):
+            line = None  # the server is shutting down
+        if line is None:
+            raise EOFError()  # disconnected, same as input() at the end of a pipe
+        return line
+
+
+class GameServer:
+    """
+    Hosts a GameSession per connection. Saves go in save_root/<name>/, each
+    name can only be playing once at a time, and up to max_players games
+    run at once (the rest wait for a free thread). show_odds turns the
+    combat odds on for every session.
+    """
+
+    def __init__(self, save_root=save_directory, pace="normal", max_players=256, show_odds=False, timeout=idle_timeout):
+        self.save_root = save_root
+        self.pace = pace
+        self.show_odds = show_odds
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_players, thread_name_prefix="eyum-session")
+        self.players = set()
+        self.lock = threading.Lock()
+        self.finished_turns = 0
+        self.sessions = set()
+
+    def turns(self):
+        # Combat turns played on this server so far
+        with self.lock:
+            return self.finished_turns + sum(session.counts["turns"] for session in self.sessions)
+
+    async def handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        connection = Connection(loop, reader, writer, self.timeout)
+        reading = asyncio.create_task(connection.read_lines())
+        name = None
+        try:
+            writer.write(b"Welcome to Eyum Terminal Adventure!\r\n")
+            while name is None:
+                answer = await connection.prompt("Name: ")
+                if answer is None:
+                    return
+                answer = answer.strip()
+                with self.lock:
+                    if not valid_name.fullmatch(answer):
+                        writer.write(b"Names are 1-24 letters, digits, - or _.\r\n")
+                    elif answer.lower() in self.players:
+                        writer.write(b"That name is already playing.\r\n")
+                    else:
+                        name = answer.lower()
+                        self.players.add(name)
+            await loop.run_in_executor(self.executor, self.play, connection, name)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            pass  # the server is shutting down, the game thread gets EOFError from its next ask()
+        finally:
+            reading.cancel()
+            if name is not None:
+                with self.lock:
+                    self.players.discard(name)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def play(self, connection, name):
+        # Runs on a worker thread until the player quits or disconnects
+        session = GameSession(os.path.join(self.save_root, name), input_source=connection,
+                              pacer=Pacer(self.pace, skip_on_key=False))
+        session.show_odds = self.show_odds
+        with self.lock:
+            self.sessions.add(session)
+        sys.stdout.bind(connection)
+        try:
+            session.play()
+        except (EOFError, SystemExit):
+            pass
+        finally:
+            connection.flush()
+            sys.stdout.unbind()
+            if session.party_store is not None and session.party_store.database is not None:
+                session.party_store.database.close()
+            with self.lock:
+                self.sessions.discard(session)
+                self.finished_turns += session.counts["turns"]
+
+    async def start(self, host, port):
+        if not isinstance(sys.stdout, ThreadOutput):
+            sys.stdout = ThreadOutput(sys.stdout)
+        return await asyncio.start_server(self.handle, host, port)
+
+
+def serve(port, host="127.0.0.1", pace="normal", max_players=256, show_odds=False):
+    """
+    Runs a GameServer on host:port until interrupted.
+    """
+    async def run():
+        game_server = GameServer(pace=pace, max_players=max_players, show_odds=show_odds)
+        server = await game_server.start(host, port)
+        print(f"Serving Eyum on {host}:{port} (saves in {game_server.save_root}/<name>/), Ctrl+C to stop", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+# === Load generator ===
+async def scripted_client(host, port, number, answers, seed, latencies):
+    """
+    Logs in as load-<number> and gives answers random answers (the same
+    kind sessions.py uses), timing how long each reply takes to come back.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    script = RandomInput(characters[number % len(characters)], answers, seed + number)
+    sent = None
+    try:
+        await reader.readuntil(go_ahead)
+        writer.write(f"load-{number}\r\n".encode())
+        for _ in range(answers + 1):
+            await reader.readuntil(go_ahead)
+            if sent is not None:
+                latencies.append(time.perf_counter() - sent)
+            answer = script.rng.choice(script.answers + [script.character]) if script.position else script.character
+            script.position += 1
+            writer.write(answer.encode() + b"\r\n")
+            await writer.drain()
+            sent = time.perf_counter()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass  # the game ended first
+    finally:
+        writer.close()
+
+async def load_test(clients, answers, seed, max_players, show_odds=False):
+    save_root = tempfile.mkdtemp(prefix="eyum-load-")
+    game_server = GameServer(save_root, pace="instant", max_players=max_players, show_odds=show_odds)
+    server = await game_server.start("127.0.0.1", 0)
+    host, port = server.sockets[0].getsockname()[:2]
+    latencies = []
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(scripted_client(host, port, i, answers, seed, latencies) for i in range(clients)))
+        # Let the last games notice their players left
+        while game_server.sessions:
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - start
+    finally:
+        server.close()
+        await server.wait_closed()
+        game_server.executor.shutdown()
+        shutil.rmtree(save_root, ignore_errors=True)
+    return elapsed, game_server.turns(), sorted(latencies)
+
+def print_load_report(clients, elapsed, turns, latencies):
+    def ms(p):
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000
+    print(f"{clients} clients in {elapsed:.2f}s: {turns} combat turns ({turns / elapsed:.0f}/s), "
+          f"{len(latencies)} answers ({len(latencies) / elapsed:.0f}/s)")
+    if latencies:
+        print(f"Reply latency (answer to next prompt): p50 {ms(50):.2f} ms, p95 {ms(95):.2f} ms, "
+              f"p99 {ms(99):.2f} ms, max {latencies[-1] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run or load-test the Eyum game server.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("serve", help="same as python main.py --serve PORT")
+    run.add_argument("port", type=int)
+    run.add_argument("--host", default="127.0.0.1")
+    run.add_argument("--odds", action="store_true", help="show the combat odds (slow with many players)")
+    load = commands.add_parser("load", help="start a local server and drive it with scripted players")
+    load.add_argument("--clients", type=int, default=200)
+    load.add_argument("--answers", type=int, default=200, help="answers each player gives before disconnecting")
+    load.add_argument("--seed", type=int, default=1)
+    load.add_argument("--max-players", type=int, default=256, help="games running at once")
+    load.add_argument("--odds", action="store_true", help="show the combat odds in every game")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.port, args.host, show_odds=args.odds)
+    else:
+        elapsed, turns, latencies = asyncio.run(load_test(args.clients, args.answers, args.seed, args.max_players, args.odds))
+        print_load_report(args.clients, elapsed, turns, latencies)
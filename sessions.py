@@ -0,0 +1,160 @@
+# sessions.py
+# Runs several games at once in one process, each a main.GameSession on a
+# thread from a pool, with its own save folder, seed and answers. Usage:
+#   python sessions.py [--sessions 8] [--threads 4] [--inputs 400] [--seed 1] [--check]
+#
+# Each session picks a character and then answers every prompt at random
+# (mostly attacking, sometimes leaving the shop), like someone mashing
+# keys, until it has given --inputs answers. Sessions print as usual: a
+# ThreadOutput stands in for sys.stdout and sends each thread's writes to
+# its own session's buffer.
+# With --check every session is also played on its own first, and the
+# saves and output from the concurrent run have to match those exactly.
+import io
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from main import GameSession, characters
+from pacing import Pacer
+from replay import snapshot
+
+
+class ThreadOutput:
+    """
+    Stands in for sys.stdout, sending what each thread writes to the stream
+    bind() gave it, and everything else to the stream it replaced.
+    """
+
+    def __init__(self, default):
+        self.default = default
+        self.local = threading.local()
+
+    def bind(self, stream):
+        self.local.stream = stream
+
+    def unbind(self):
+        self.local.stream = None
+
+    def stream(self):
+        return getattr(self.local, "stream", None) or self.default
+
+    def write(self, text):
+        return self.stream().write(text)
+
+    def flush(self):
+        self.stream().flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream(), name)
+
+
+class RandomInput:
+    """
+    Input source for GameSession.ask(): the character's name first, then
+    count random menu answers, then EOFError (like input() at the end of a
+    pipe).
+    """
+    answers = ["1", "1", "1", "1", "2", "2", "3", "e"]
+
+    def __init__(self, character, count, seed):
+        self.character = character
+        self.count = count
+        self.position = 0
+        self.rng = random.Random(seed)
+
+    def input(self, prompt=""):
+        if self.position > self.count:
+            raise EOFError()
+        value = self.character if self.position == 0 else self.rng.choice(self.answers + [self.character])
+        self.position += 1
+        print(prompt + value)
+        return value
+
+
+def play_session(number, directory, inputs, seed):
+    """
+    Plays session number in directory (a fresh save folder) until its
+    answers run out. Returns its saves, its output and the turns and rooms
+    it played.
+    """
+    character = characters[number % len(characters)]
+    session = GameSession(
+        directory,
+        seed=seed + number,
+        input_source=RandomInput(character, inputs, seed + number),
+        pacer=Pacer("instant"),
+        turbo=True,
+    )
+    output = io.StringIO()
+    sys.stdout.bind(output)
+    try:
+        session.play()
+    except EOFError:
+        pass
+    finally:
+        sys.stdout.unbind()
+        if session.party_store is not None and session.party_store.database is not None:
+            session.party_store.database.close()
+    return {
+        "character": character,
+        "saves": snapshot(directory),
+        "output": output.getvalue(),
+        "turns": session.counts["turns"],
+        "rooms": session.counts["rooms"],
+    }
+
+def run_sessions(count, threads, inputs, seed, root):
+    # Plays count sessions on a pool of threads, each in its own folder under root
+    folders = [os.path.join(root, f"session-{i}") for i in range(count)]
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [pool.submit(play_session, i, folders[i], inputs, seed) for i in range(count)]
+        return [future.result() for future in futures]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play several games at once, one GameSession per thread.")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--inputs", type=int, default=400, help="answers each session gives before it stops")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--check", action="store_true",
+                        help="also play every session on its own and check the concurrent ones ended the same")
+    args = parser.parse_args()
+
+    terminal = sys.stdout
+    sys.stdout = ThreadOutput(terminal)
+    root = tempfile.mkdtemp(prefix="eyum-sessions-")
+    try:
+        alone = None
+        if args.check:
+            start = time.perf_counter()
+            alone = run_sessions(args.sessions, 1, args.inputs, args.seed, os.path.join(root, "alone"))
+            alone_time = time.perf_counter() - start
+        start = time.perf_counter()
+        results = run_sessions(args.sessions, args.threads, args.inputs, args.seed, os.path.join(root, "together"))
+        elapsed = time.perf_counter() - start
+    finally:
+        sys.stdout = terminal
+        shutil.rmtree(root, ignore_errors=True)
+
+    turns = sum(r["turns"] for r in results)
+    rooms = sum(r["rooms"] for r in results)
+    print(f"{args.sessions} sessions on {args.threads} threads in {elapsed:.2f}s: "
+          f"{turns} turns ({turns / elapsed:.0f}/s), {rooms} rooms ({rooms / elapsed:.0f}/s)")
+    for i, r in enumerate(results):
+        print(f"  session {i:<3} {r['character']:<8} {r['turns']:>5} turns {r['rooms']:>4} rooms {len(r['saves']):>3} save files")
+    if alone is not None:
+        print(f"One at a time: {alone_time:.2f}s")
+        different = [i for i, (a, b) in enumerate(zip(alone, results))
+                     if a["saves"] != b["saves"] or a["output"] != b["output"]]
+        if different:
+            print(f"Sessions {', '.join(map(str, different))} ended differently when run together")
+            sys.exit(1)
+        print("Every session ended with the same saves and output as when it ran on its own")
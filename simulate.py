@@ -0,0 +1,224 @@
+# simulate.py
+# Plays whole runs headlessly to check game balance. Usage:
+#   python simulate.py [--runs 1000] [--character Lucian] [--policy basic] [--workers N] [--seed 1]
+#
+# Each run follows explore_floor(): 10 rooms per floor (fights, shops and
+# treasure rooms), then the floor boss, rotate_monsters() and the next floor,
+# until the character dies. The choices a player would make (what to do in
+# combat, what to buy, where skill points go) come from a policy (see
+# policies.py); pass --policy module:Class to plug in your own.
+#
+# Runs draw from the same rng_streams positions as the game, so a run's
+# rooms, monsters and loot only depend on its seed and the choices made.
+# Combat gets one stream per fight rather than one per turn like the game
+# (which has to be able to resume a fight from its save), since reseeding
+# every turn would cost more than the turn itself.
+import os
+import time
+import argparse
+import multiprocessing
+
+import dungeon
+from combat_engine import make_state, resolve_turn
+from game_data import character_skills
+from policies import policies, load_policy
+from rng_streams import RngStreams
+
+characters = list(character_skills.keys())
+metrics = ("floor", "coins", "level", "turns")
+
+
+# === Runs ===
+def ally_entry(player):
+    return {
+        "name": player["character"],
+        "level": player["level"],
+        "health": player["health"],
+        "max_health": player["max_health"],
+        "is_dead": False,
+    }
+
+def fight(run, monsters, policy):
+    """
+    Plays one combat to the end and returns its outcome ("won", "fled", "died").
+    """
+    stats = run["stats"]
+    state = make_state(run["player"], monsters, run["allies"], characters, stats["floor"])
+    rng = run["streams"].stream("combat", stats["floor"], stats["room"])
+    while state["outcome"] is None:
+        if run["turns"] >= run["max_turns"]:
+            state["outcome"] = "turn limit"
+            break
+        state, events = resolve_turn(state, policy.combat_action(state, rng), rng)
+        if events and events[0]["type"] == "invalid":
+            raise ValueError(f"{type(policy).__name__} chose an invalid action: {events[0]['reason']}")
+        run["turns"] += 1
+        stats["turns"] = run["turns"]
+    run["player"] = state["player"]
+    run["allies"] = state["allies"]
+    return state["outcome"]
+
+def play_floor(run, policy):
+    player, stats, streams = run["player"], run["stats"], run["streams"]
+    floor = stats["floor"]
+
+    # Regular rooms (10 per floor)
+    for _ in range(10):
+        stats["room"] += 1
+        run["rooms"] += 1
+        room = stats["room"]
+        rooms = streams.stream("rooms", floor, room)
+        kind = dungeon.room_kind(stats, player["coins"], rooms)
+        if kind == "shop":
+            stats["rooms_since_shop"] = 0
+            loot = streams.stream("loot", floor, room)
+            stock = dungeon.shop_stock(player, loot)
+            if stock:
+                items, skill_offer = stock
+                choice = policy.shop(player, items, skill_offer, floor, loot)
+                if choice and choice[0] == "skill":
+                    dungeon.buy_skill(player, skill_offer)
+                elif choice:
+                    dungeon.buy_item(player, items[choice[1]])
+        elif kind == "treasure":
+            stats["rooms_since_treasure"] = 0
+            dungeon.open_treasure(player, streams.stream("loot", floor, room))
+        else:
+            stats["rooms_since_shop"] += 1
+            stats["rooms_since_treasure"] += 1
+            monsters = dungeon.monster_group(stats["monster_rotation_index"], streams.stream("encounters", floor, room))
+            outcome = fight(run, monsters, policy)
+            player = run["player"]
+            if outcome not in ("won", "fled"):
+                return outcome
+        policy.upkeep(player, floor, rooms)
+
+    # Boss encounter (fleeing the boss still clears the floor, same as in the game)
+    outcome = fight(run, dungeon.boss_group(stats["monster_rotation_index"]), policy)
+    if outcome not in ("won", "fled"):
+        return outcome
+    policy.upkeep(run["player"], floor, streams.stream("rooms", floor, stats["room"]))
+    stats["room"] = 1
+    stats["floor"] += 1
+    stats["monster_rotation_index"] = dungeon.next_rotation(stats["monster_rotation_index"])
+    return "cleared"
+
+def new_run(streams, character="Lucian", max_turns=200000):
+    """
+    A fresh run for character at floor 1, ready for play_floor(). streams is
+    an RngStreams or a seed for one.
+    """
+    if not isinstance(streams, RngStreams):
+        streams = RngStreams(streams)
+    return {
+        "streams": streams,
+        "player": dungeon.new_player(character),
+        "stats": dungeon.new_run_stats(streams.seed),
+        # The other characters join in as idle allies, at their starting stats
+        "allies": [ally_entry(dungeon.new_player(name)) for name in characters if name != character],
+        "turns": 0,
+        "rooms": 0,
+        "max_turns": max_turns,
+    }
+
+def play_run(streams, policy, character="Lucian", max_floor=100, max_turns=200000):
+    """
+    Plays one run from a fresh character until it dies (or reaches max_floor)
+    and returns its stats. streams is an RngStreams or a seed for one.
+    """
+    run = new_run(streams, character, max_turns)
+    end = "cleared"
+    while end == "cleared" and run["stats"]["floor"] <= max_floor:
+        end = play_floor(run, policy)
+    return {
+        "seed": run["streams"].seed,
+        "end": end if end != "cleared" else "floor limit",
+        "floor": run["stats"]["floor"],
+        "coins": run["player"]["coins"],
+        "level": run["player"]["level"],
+        "turns": run["turns"],
+        "rooms": run["rooms"],
+    }
+
+def run_batch(job):
+    base_seed, start, count, policy_spec, character, max_floor = job
+    policy = load_policy(policy_spec)
+    # Forking by run number gives every run its own streams, no matter how runs are split between workers
+    root = RngStreams(base_seed)
+    results = []
+    for i in range(start, start + count):
+        result = play_run(root.fork(i), policy, character, max_floor)
+        result["run"] = i
+        results.append(result)
+    return results
+
+def simulate(runs, character="Lucian", policy="basic", workers=None, seed=1, max_floor=100, batch_size=200):
+    """
+    Plays runs complete runs, spread over a pool of worker processes, and
+    returns the per-run stats in run order.
+    """
+    jobs = [(seed, start, min(batch_size, runs - start), policy, character, max_floor)
+            for start in range(0, runs, batch_size)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) == 1:
+        batches = map(run_batch, jobs)
+        results = [r for batch in batches for r in batch]
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            results = [r for batch in pool.imap_unordered(run_batch, jobs) for r in batch]
+    results.sort(key=lambda r: r["run"])
+    return results
+
+
+# === Report ===
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
+
+def summarize(results):
+    summary = {}
+    for key in metrics:
+        values = sorted(r[key] for r in results)
+        summary[key] = {
+            "mean": sum(values) / len(values),
+            "min": values[0],
+            "p10": percentile(values, 10),
+            "p50": percentile(values, 50),
+            "p90": percentile(values, 90),
+            "max": values[-1],
+        }
+    return summary
+
+def print_report(results, elapsed):
+    print(f"{len(results)} runs in {elapsed:.1f}s ({len(results) / elapsed:.0f} runs/s)")
+    ends = {}
+    for r in results:
+        ends[r["end"]] = ends.get(r["end"], 0) + 1
+    print("Ended by: " + ", ".join(f"{end} {count}" for end, count in sorted(ends.items())))
+
+    print(f"\n{'':8}{'mean':>10}{'min':>8}{'p10':>8}{'p50':>8}{'p90':>8}{'max':>10}")
+    for key, s in summarize(results).items():
+        print(f"{key:8}{s['mean']:>10.1f}{s['min']:>8}{s['p10']:>8}{s['p50']:>8}{s['p90']:>8}{s['max']:>10}")
+
+    print("\nFloor reached:")
+    floors = {}
+    for r in results:
+        floors[r["floor"]] = floors.get(r["floor"], 0) + 1
+    widest = max(floors.values())
+    for floor in sorted(floors):
+        count = floors[floor]
+        print(f"  {floor:>3} {'#' * max(1, round(40 * count / widest)):40} {count} ({100 * count / len(results):.1f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play Eyum runs headlessly and report how far they get.")
+    parser.add_argument("--runs", type=int, default=1000)
+    parser.add_argument("--character", choices=characters, default="Lucian")
+    parser.add_argument("--policy", default="basic", help=f"{', '.join(policies)} or module:Class")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (defaults to the CPU count)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-floor", type=int, default=100)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = simulate(args.runs, args.character, args.policy, args.workers, args.seed, args.max_floor)
+    print_report(results, time.perf_counter() - start)
@@ -0,0 +1,72 @@
+# startup_profile.py
+# Where the time goes between main.py starting and the first menu showing
+# up (python main.py --startup-profile). Like python -X importtime, but
+# built in: it times every module imported from then on, how much of that
+# was the module itself and how much what it imported, and the startup
+# phases main.py marks along the way.
+import sys
+import time
+import builtins
+
+
+class StartupProfile:
+    """
+    install() before the imports to time, mark(phase) at each step, and
+    report() at the end. imports holds (depth, name, self seconds, total
+    seconds) for each module, in the order they finished importing.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.imports = []
+        self.phases = []  # (phase, seconds since start)
+        self.open = []  # time spent in nested imports, for each import in progress
+        self.original_import = None
+
+    def install(self):
+        self.original_import = builtins.__import__
+        builtins.__import__ = self.timed_import
+
+    def uninstall(self):
+        if self.original_import is not None:
+            builtins.__import__ = self.original_import
+            self.original_import = None
+
+    def timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self.original_import(name, globals, locals, fromlist, level)
+        depth = len(self.open)
+        self.open.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self.original_import(name, globals, locals, fromlist, level)
+        finally:
+            total = time.perf_counter() - start
+            nested = self.open.pop()
+            if self.open:
+                self.open[-1] += total
+            self.imports.append((depth, name, total - nested, total))
+
+    def mark(self, phase):
+        self.phases.append((phase, time.perf_counter() - self.start))
+
+    def report(self, out=None, top=15):
+        self.uninstall()
+        out = out or sys.stderr
+        out.write("Startup profile (from main.py starting)\n\n")
+        out.write(f"  {'phase':<28}{'at ms':>9}{'took ms':>9}\n")
+        last = 0.0
+        for phase, at in self.phases:
+            out.write(f"  {phase:<28}{at * 1000:>9.1f}{(at - last) * 1000:>9.1f}\n")
+            last = at
+
+        out.write(f"\n  {'slowest imports':<28}{'self ms':>9}{'total ms':>9}\n")
+        for depth, name, own, total in sorted(self.imports, key=lambda i: -i[2])[:top]:
+            out.write(f"  {name:<28}{own * 1000:>9.1f}{total * 1000:>9.1f}\n")
+
+        out.write(f"\n  {'imported by main.py':<28}{'self ms':>9}{'total ms':>9}\n")
+        for depth, name, own, total in self.imports:
+            if depth == 0:
+                out.write(f"  {name:<28}{own * 1000:>9.1f}{total * 1000:>9.1f}\n")
+        out.write(f"\n  {len(self.imports)} modules imported\n")
+        out.flush()
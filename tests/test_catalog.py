@@ -0,0 +1,56 @@
+# Ownership bitsets kept on a character's inventory and skills.
+#   python -m pytest tests
+import copy
+import json
+import os
+import pickle
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import catalog, OwnedList
+from game_data import drop_table, skill_table, character_skills
+from dungeon import new_player
+
+
+def counted(entries, kind):
+    # The bitset worked out from scratch, to compare against
+    return catalog.owned_items(list(entries)) if kind == "items" else catalog.owned_skills(list(entries))
+
+
+def test_bits_follow_every_change():
+    a, b, c = drop_table[0], drop_table[1], drop_table[2]
+    inventory = OwnedList([a, b], "items")
+    assert inventory.bits == counted(inventory, "items")
+    inventory.append(dict(a))  # a second copy
+    inventory.remove(a)
+    assert catalog.owns_item(inventory, a["name"])
+    inventory.pop()
+    assert not catalog.owns_item(inventory, a["name"])
+    inventory += [c]
+    inventory.insert(0, a)
+    inventory[1] = {"name": "Not in the catalog"}
+    del inventory[0]
+    assert inventory.bits == counted(inventory, "items")
+    inventory[:] = [i for i in inventory if i["name"] != c["name"]]
+    assert inventory.bits == counted(inventory, "items") == 0
+    inventory.clear()
+    assert inventory.bits == 0
+
+
+def test_skills_and_new_players():
+    player = new_player(next(iter(character_skills)))
+    assert isinstance(player["inventory"], OwnedList)
+    assert isinstance(player["skills"], OwnedList)
+    name = skill_table[-1]["name"]
+    player["skills"].append(name)
+    assert catalog.owns_skill(player["skills"], name)
+    assert player["skills"].bits == counted(player["skills"], "skills")
+
+
+def test_copies_and_saves_are_plain():
+    inventory = OwnedList(drop_table[:3], "items")
+    for clone in (copy.deepcopy(inventory), pickle.loads(pickle.dumps(inventory))):
+        assert clone == inventory and clone.bits == inventory.bits
+        assert clone.counts == inventory.counts
+    assert json.loads(json.dumps(inventory)) == list(inventory)
@@ -0,0 +1,46 @@
+# Statistical tests of dice.py's roll methods against the exact distribution
+# of the sum. Seeded, so they pass or fail the same way every run.
+#   python -m pytest tests
+import os
+import sys
+import random
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dice import parse, method_of, fit_to_distribution
+
+samples = 200000  # enough to catch an off-by-one or a normal curve 10% too wide
+threshold = 0.001
+
+
+@pytest.mark.parametrize("text, method", [
+    ("d6", "each"), ("6d4", "each"), ("8d6+2", "each"),
+    ("9d2", "table"), ("40d4", "table"), ("64d6", "table"),
+    ("65d2", "normal"), ("300d4", "normal"), ("2000d2", "normal"),
+])
+def test_rolls_match_exact_distribution(text, method):
+    d = parse(text)
+    assert method_of(d) == method
+    rng = random.Random(text)
+    rolls = [d.roll(rng) for _ in range(samples)]
+    statistic, dof, p = fit_to_distribution(rolls, d)
+    assert p > threshold, f"{text} ({method}): chi2 {statistic:.1f} on {dof} dof, p {p:.2g}"
+
+
+@pytest.mark.parametrize("text", ["6d4", "40d4", "300d4"])
+def test_off_by_one_rolls_are_caught(text):
+    # The test has to be able to fail: rolls one point too high never pass
+    d = parse(text)
+    rng = random.Random(text)
+    rolls = [d.roll(rng) + 1 for _ in range(samples)]
+    assert fit_to_distribution(rolls, d)[2] < threshold
+
+
+def test_normal_spread_is_checked():
+    # A normal curve with the right mean but 10% too wide is caught too
+    d = parse("300d4")
+    rng = random.Random(1)
+    rolls = [round(rng.gauss(d.mean, d.deviation * 1.1)) for _ in range(samples)]
+    assert fit_to_distribution(rolls, d)[2] < threshold
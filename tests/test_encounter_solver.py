@@ -0,0 +1,65 @@
+# Bounds on how long the combat odds take to solve with the game's own
+# settings, for the big groups where it gets slow.
+#   python -m pytest tests
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import catalog
+from encounter_solver import Encounter
+from main import odds_buckets, odds_budget
+
+allies = [{"name": "George", "level": 3}, {"name": "Lucian", "level": 2}, {"name": "Ilana", "level": 3}]
+
+
+def group(*names):
+    monsters = []
+    for name in names:
+        m = dict(catalog.monster(name))
+        m["max_health"] = m["health"]
+        monsters.append(m)
+    return monsters
+
+def timed_solve(encounter, player, monsters):
+    start = time.perf_counter()
+    result = encounter.solve(encounter.state_of(player, monsters), player["health"])
+    return result, time.perf_counter() - start
+
+
+def test_five_monster_group_solves_in_bounded_time():
+    # About a second on a slow machine; the state count is what actually regresses
+    player = {"health": 60, "max_health": 60, "damage": 4}
+    monsters = group("Slime", "Goblin", "Wolf", "Slime", "Goblin")
+    encounter = Encounter(player, monsters, allies, 2, buckets=odds_buckets, budget=odds_budget)
+    result, elapsed = timed_solve(encounter, player, monsters)
+    assert result["states"] <= 4000
+    assert elapsed < 5.0
+    assert abs(result["win"] + result["death"] + result["unresolved"] - 1) < 1e-6
+
+    # Later turns reuse the transitions already worked out, and the same state is a lookup
+    monsters[0]["health"] = 3
+    player["health"] = 50
+    later, elapsed = timed_solve(encounter, player, monsters)
+    assert elapsed < 1.0
+    again, elapsed = timed_solve(encounter, player, monsters)
+    assert again == later
+    assert elapsed < 0.005
+
+def test_four_monster_group_solves_in_bounded_time():
+    player = {"health": 50, "max_health": 60, "damage": 4}
+    monsters = group("Slime", "Goblin", "Wolf", "Slime")
+    encounter = Encounter(player, monsters, allies, 2, buckets=odds_buckets, budget=odds_budget)
+    result, elapsed = timed_solve(encounter, player, monsters)
+    assert result["states"] <= 3000
+    assert elapsed < 3.0
+
+def test_hp_lost_never_exceeds_health():
+    player = {"health": 400, "max_health": 400, "damage": 60}
+    monsters = group("Forest Spider")
+    monsters[0]["health"] = monsters[0]["max_health"] = 1876
+    monsters[0]["damage"] = 149
+    result, _ = timed_solve(Encounter(player, monsters), player, monsters)
+    assert result["death"] > 0.99
+    assert result["hp_lost"] <= player["health"]
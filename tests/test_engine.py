@@ -0,0 +1,104 @@
+# The JSON-lines engine: state patches and commands it can't play.
+#   python -m pytest tests
+import io
+import json
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine
+from engine import merge_patch
+
+save_directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "eyum", "saves")
+
+
+def apply_patch(target, patch):
+    # RFC 7396, the way a frontend applies each state message
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        elif isinstance(value, dict):
+            result[key] = apply_patch(result.get(key), value)
+        else:
+            result[key] = value
+    return result
+
+
+def play(tmp_path, *commands, seed=7):
+    folder = str(tmp_path / "saves")
+    if not os.path.isdir(folder):
+        shutil.copytree(save_directory, folder)
+    out = io.StringIO()
+    lines = [c if isinstance(c, str) else json.dumps(c) for c in commands]
+    engine.run(seed=seed, commands=io.StringIO("\n".join(lines) + "\n"), out=out, save_directory=folder)
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_merge_patch_round_trips():
+    old = {"menu": "combat", "player": {"health": 10, "equipped": {"weapon": "Stick"}, "skills": [1, 2]},
+           "monsters": [{"name": "Goblin"}], "shop": {"items": []}}
+    new = {"menu": "combat", "player": {"health": 7, "equipped": {}, "skills": [1]},
+           "monsters": [{"name": "Goblin"}, {"name": "Slime"}]}
+    patch = merge_patch(old, new)
+    assert patch == {"player": {"health": 7, "equipped": {"weapon": None}, "skills": [1]},
+                     "monsters": [{"name": "Goblin"}, {"name": "Slime"}], "shop": None}
+    assert apply_patch(old, patch) == new
+    assert merge_patch(new, new) == {}
+    assert apply_patch({}, merge_patch({}, new)) == new
+
+
+def test_invalid_commands_are_reported_and_skipped(tmp_path):
+    messages = play(tmp_path,
+                    "not json",
+                    "[1, 2]",
+                    {"action": "attack"},
+                    {"action": "play", "character": "Nobody"},
+                    {"action": "reset"},
+                    {"action": "play", "character": "Lucian"},
+                    {"action": "skill", "index": 99, "target": 0},
+                    {"action": "buy", "item": 0},
+                    {"action": "exit"})
+    reasons = [m["reason"] for m in messages if m["type"] == "invalid"]
+    assert reasons[0] == "Commands are one JSON object per line."
+    assert reasons[1].startswith("Can't 'None' here")
+    assert reasons[2].startswith("Can't 'attack' here")
+    assert reasons[3].startswith("Unknown character")
+    assert "confirm" in reasons[4]
+    assert reasons[5:] == ["Invalid skill.", "Can't 'buy' here, expected one of " + ", ".join(engine.menu_actions["combat"]) + "."]
+    # Nothing was deleted by the unconfirmed reset, and every command was waited for
+    # (plus the character menu the exit went back to)
+    assert os.path.exists(tmp_path / "saves" / "Lucian.json")
+    assert sum(m["type"] == "ready" for m in messages) == 10
+
+
+def test_patches_rebuild_the_state(tmp_path):
+    messages = play(tmp_path,
+                    {"action": "play", "character": "Lucian"},
+                    {"action": "attack", "target": 0},
+                    {"action": "auto"},
+                    {"action": "state"},
+                    {"action": "exit"})
+    state = None
+    resent = False
+    answering = -1  # which command the messages are answering
+    for m in messages:
+        if m["type"] == "ready":
+            answering += 1
+        elif m["type"] == "state":
+            if answering == 3:
+                # {"action": "state"} sends the whole state again, which must match what the patches built
+                assert m["patch"] == state
+                resent = True
+            state = apply_patch(state, m["patch"])
+    assert resent and state["menu"] == "characters"
+    assert state["characters"]["Lucian"]["level"] >= 1
+
+
+def test_same_seed_same_game(tmp_path):
+    commands = [{"action": "play", "character": "Ilana"}, {"action": "auto"}, {"action": "auto"}, {"action": "exit"}]
+    first = play(tmp_path / "a", *commands)
+    second = play(tmp_path / "b", *commands)
+    assert first == second
@@ -0,0 +1,54 @@
+# The Policy base class and handing a fight back from the auto player.
+#   python -m pytest tests
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+import policies
+from pacing import Pacer
+from replay import Recorder, ReplayInput, auto_stop
+
+
+class KeyPressed(Pacer):
+    # A pacer whose pauses are always cut short by a key
+    def wait(self, event):
+        return event == "auto"
+
+
+def test_policies_must_choose_combat_actions():
+    with pytest.raises(TypeError):
+        policies.Policy()
+
+    class ShopsOnly(policies.Policy):
+        pass
+
+    with pytest.raises(TypeError):
+        ShopsOnly()
+    for name in policies.policies:
+        assert isinstance(policies.load_policy(name), policies.Policy)
+
+
+def test_default_auto_policy_is_efficient():
+    assert isinstance(main.GameSession(pacer=Pacer("instant")).auto(), policies.Efficient)
+
+
+def test_taking_over_from_auto_is_recorded_and_replayed(tmp_path):
+    session = main.GameSession(str(tmp_path), pacer=KeyPressed("instant"))
+    assert session.auto_interrupted()
+
+    session.input_source = Recorder(None, session.save_settings(), str(tmp_path))
+    assert session.auto_interrupted()
+    assert session.input_source.inputs == [auto_stop]
+
+    session.input_source = ReplayInput([auto_stop, "1"])
+    assert session.auto_interrupted()
+    assert not session.auto_interrupted()  # the "1" is for the prompt after it
+    assert session.input_source.input() == "1"
+
+    session.pacer = Pacer("instant")
+    session.input_source = None
+    assert not session.auto_interrupted()
@@ -0,0 +1,79 @@
+# Binary saves: round trips, version 1 headers and mods changing the catalog.
+#   python -m pytest tests
+import os
+import sys
+import zlib
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import save_binary
+from save_binary import encode, decode, late_game_save, read_header, CatalogChanged, MAGIC
+from save_journal import read_save
+from game_data import drop_table, skill_table, monster_list
+
+save_directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "eyum", "saves")
+shipped = sorted(f for f in os.listdir(save_directory) if f.endswith(".json"))
+
+
+def sample_save():
+    return read_save(os.path.join(save_directory, shipped[0]))
+
+
+def swap_tables(monkeypatch, **tables):
+    # What a mod loaded at startup would leave behind, fingerprints included
+    for name, table in tables.items():
+        monkeypatch.setattr(save_binary, name, table)
+    monkeypatch.setattr(save_binary, "prefix_crcs", None)
+    monkeypatch.setattr(save_binary, "fingerprints", {})
+
+
+@pytest.mark.parametrize("filename", shipped)
+def test_shipped_saves_round_trip(filename):
+    data = read_save(os.path.join(save_directory, filename))
+    assert decode(encode(data)) == data
+    assert decode(encode(late_game_save(data))) == late_game_save(data)
+
+
+def test_version_1_header_still_loads():
+    data = late_game_save(sample_save())
+    raw = encode(data)
+    magic, version, fingerprint, mask, bools, size = read_header(raw)
+    names = [e["name"] for table in (drop_table, skill_table, monster_list) for e in table]
+    v1 = save_binary.header_struct_v1.pack(MAGIC, 1, zlib.crc32("\n".join(names).encode("utf-8")), mask, bools)
+    assert decode(v1 + raw[size:]) == data
+
+    stale = save_binary.header_struct_v1.pack(MAGIC, 1, fingerprint ^ 1, mask, bools)
+    with pytest.raises(CatalogChanged):
+        decode(stale + raw[size:])
+
+
+def test_mod_adding_entries_keeps_saves_loading(monkeypatch):
+    data = late_game_save(sample_save())
+    raw = encode(data)
+    mod_item = dict(drop_table[0], name="Mod Blade")
+    swap_tables(monkeypatch, drop_table=drop_table + [mod_item],
+                skill_table=skill_table + [dict(skill_table[0], name="Mod Bolt")])
+    assert decode(raw) == data
+
+
+def test_mod_renaming_an_entry_is_caught(monkeypatch):
+    data = sample_save()
+    data["player"]["inventory"] = [dict(drop_table[0])]
+    data["player"]["equipped"] = []
+    raw = encode(data)
+    renamed = [dict(drop_table[0], name="Renamed")] + drop_table[1:]
+    swap_tables(monkeypatch, drop_table=renamed)
+    with pytest.raises(CatalogChanged):
+        decode(raw)
+
+
+def test_entries_past_the_save_dont_matter(monkeypatch):
+    # A save that only uses the first item doesn't care what comes after it
+    data = sample_save()
+    data["player"]["inventory"] = [dict(drop_table[0])]
+    data["player"]["equipped"] = []
+    raw = encode(data)
+    swap_tables(monkeypatch, drop_table=drop_table[:1] + [dict(e, name=e["name"] + "!") for e in drop_table[1:]])
+    assert decode(raw)["player"]["inventory"] == data["player"]["inventory"]
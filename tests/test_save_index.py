@@ -0,0 +1,101 @@
+# When the save index trusts its entries, and when it goes back to the save.
+#   python -m pytest tests
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from save_index import SaveIndex, index_name
+from save_journal import SaveJournal, read_save, write_snapshot
+from party_store import PartyStore
+
+save_directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "eyum", "saves")
+name = "Lucian"
+
+
+def counting_reader(calls):
+    def read(path):
+        calls.append(os.path.basename(path))
+        return read_save(path)
+    return read
+
+
+def save_folder(tmp_path):
+    folder = str(tmp_path)
+    shutil.copy(os.path.join(save_directory, name + ".json"), folder)
+    return folder, os.path.join(folder, name + ".json")
+
+
+def test_written_entries_are_trusted(tmp_path):
+    folder, path = save_folder(tmp_path)
+    calls = []
+    index = SaveIndex(folder)
+    entry = index.summary(name, counting_reader(calls))
+    assert calls == [name + ".json"] and index.dirty
+    index.write()
+
+    reopened = SaveIndex(folder)
+    assert reopened.summary(name, counting_reader(calls)) == entry
+    assert calls == [name + ".json"] and not reopened.dirty
+
+
+def test_rewritten_snapshot_is_reread(tmp_path):
+    folder, path = save_folder(tmp_path)
+    index = SaveIndex(folder)
+    index.summary(name, read_save)
+    index.write()
+
+    data = read_save(path)
+    data["player"]["level"] += 1
+    write_snapshot(path, data)
+    stamp = os.stat(path).st_mtime_ns + 10**9
+    os.utime(path, ns=(stamp, stamp))  # in case the clock didn't tick between the two writes
+
+    calls = []
+    reopened = SaveIndex(folder)
+    assert reopened.summary(name, counting_reader(calls))["level"] == data["player"]["level"]
+    assert calls and reopened.dirty
+
+
+def test_journal_replayed_without_rewriting_the_index(tmp_path):
+    folder, path = save_folder(tmp_path)
+    index = SaveIndex(folder)
+    index.summary(name, read_save)
+    index.write()
+    on_disk = open(index.path).read()
+
+    journal = SaveJournal(path)
+    data = read_save(path, journal)
+    data["player"]["health"] -= 1
+    journal.record(data)
+
+    calls = []
+    reopened = SaveIndex(folder)
+    assert reopened.summary(name, counting_reader(calls))["health"] == data["player"]["health"]
+    assert calls and not reopened.dirty
+    reopened.write()
+    assert open(index.path).read() == on_disk
+
+
+def test_missing_save_drops_its_entry(tmp_path):
+    folder, path = save_folder(tmp_path)
+    index = SaveIndex(folder)
+    index.summary(name, read_save)
+    index.write()
+    os.remove(path)
+    reopened = SaveIndex(folder)
+    assert reopened.summary(name, read_save) is None
+    assert reopened.dirty and name not in reopened.entries
+
+
+def test_party_summaries_wait_for_write_index(tmp_path):
+    folder, path = save_folder(tmp_path)
+    store = PartyStore(folder, [name, "Nobody"])
+    assert store.summary(name)["level"] == read_save(path)["player"]["level"]
+    assert store.summary("Nobody") is None
+    assert not os.path.exists(os.path.join(folder, index_name))
+    store.write_index()
+    written = SaveIndex(folder)
+    written.load()
+    assert list(written.entries) == [name]
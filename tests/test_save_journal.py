@@ -0,0 +1,109 @@
+# Journal replay, torn tails and crashes in the middle of a compaction.
+#   python -m pytest tests
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import save_journal
+from save_journal import SaveJournal, read_save, write_snapshot, dump_snapshot, journal_path_for
+
+
+def new_save(health=25, coins=0):
+    return {"player": {"health": health, "coins": coins},
+            "persistent_stats": {"floor": 1, "current_monsters": None}}
+
+def journaled(path, every=50):
+    # A saved character with a journal started on it, the way load_from_file() sets one up
+    write_snapshot(path, new_save())
+    journal = SaveJournal(path, every)
+    data = read_save(path, journal)
+    return journal, data
+
+
+def test_entries_replay_on_top_of_the_snapshot(tmp_path):
+    path = str(tmp_path / "George.json")
+    journal, data = journaled(path)
+    for hp in (20, 15, 9):
+        data["player"]["health"] = hp
+        journal.record(data)
+    data["persistent_stats"]["current_monsters"] = [{"name": "Slime", "health": 4}]
+    journal.record(data)
+    data["persistent_stats"]["current_monsters"][0]["health"] = 1
+    journal.record(data)
+    assert read_save(path) == data
+    assert journal.entries == 5
+
+def test_compaction_folds_the_journal_in(tmp_path):
+    path = str(tmp_path / "George.json")
+    journal, data = journaled(path, every=3)
+    for coins in range(1, 6):
+        data["player"]["coins"] = coins
+        journal.record(data)
+    assert journal.entries < 3
+    assert read_save(path) == data
+
+def test_torn_tail_is_cut_off_and_later_entries_kept(tmp_path):
+    path = str(tmp_path / "George.json")
+    journal, data = journaled(path)
+    data["player"]["health"] = 20
+    journal.record(data)
+    with open(journal_path_for(path), "a") as f:
+        f.write('{"p":{"health":')  # crash halfway through an append
+
+    journal = SaveJournal(path)
+    data = read_save(path, journal)
+    assert data["player"]["health"] == 20
+    data["player"]["health"] = 12
+    journal.record(data)
+    assert read_save(path)["player"]["health"] == 12
+
+def test_line_without_newline_counts_as_torn(tmp_path):
+    path = str(tmp_path / "George.json")
+    journal, data = journaled(path)
+    data["player"]["health"] = 20
+    journal.record(data)
+    with open(journal_path_for(path), "a") as f:
+        f.write('{"p":{"health":1}}')
+    assert read_save(path)["player"]["health"] == 20
+    with open(journal_path_for(path)) as f:
+        assert f.read().endswith("\n")
+
+def test_crash_between_snapshot_and_journal_removal(tmp_path, monkeypatch):
+    path = str(tmp_path / "George.json")
+    journal, data = journaled(path)
+    for hp in (20, 15):
+        data["player"]["health"] = hp
+        journal.record(data)
+    data["player"]["health"] = 25  # healed since, then compacted
+    data["player"]["coins"] = 40
+
+    def crash(path):
+        raise KeyboardInterrupt()
+    monkeypatch.setattr(save_journal.os, "remove", crash)
+    try:
+        journal.compact(data)
+    except KeyboardInterrupt:
+        pass
+    monkeypatch.undo()
+    assert os.path.exists(journal_path_for(path))  # the old journal survived the crash
+
+    loaded = read_save(path)
+    assert loaded == data  # its entries aren't replayed over the newer snapshot
+    assert not os.path.exists(journal_path_for(path))
+
+def test_crash_mid_snapshot_keeps_the_old_save(tmp_path):
+    path = str(tmp_path / "George.json")
+    write_snapshot(path, new_save(coins=7))
+    with open(path + ".tmp", "w") as f:
+        f.write('{"player": {"hea')  # what a crash during dump_snapshot leaves behind
+    assert read_save(path)["player"]["coins"] == 7
+    dump_snapshot(path, new_save(coins=8))
+    assert read_save(path)["player"]["coins"] == 8
+
+def test_binary_saves_journal_too(tmp_path):
+    path = str(tmp_path / "George.sav")
+    journal, data = journaled(path)
+    data["player"]["health"] = 3
+    journal.record(data)
+    assert read_save(path) == data
@@ -0,0 +1,83 @@
+# Moving saves between the save folder and SQLite.
+#   python -m pytest tests
+import os
+import shutil
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from save_sqlite import SqliteSaveStore
+from save_journal import read_save, write_snapshot
+from save_binary import binary_extension
+
+save_directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "eyum", "saves")
+shipped = sorted(f for f in os.listdir(save_directory) if f.endswith(".json"))
+
+
+def copy_saves(directory):
+    os.makedirs(directory, exist_ok=True)
+    for filename in shipped:
+        shutil.copy(os.path.join(save_directory, filename), directory)
+
+
+def test_import_then_export_round_trips(tmp_path):
+    folder = str(tmp_path / "saves")
+    copy_saves(folder)
+    store = SqliteSaveStore(str(tmp_path / "eyum.db"))
+    characters, backups = store.import_directory(folder)
+    assert characters + backups == len(shipped)
+    assert backups == sum("_backup_floor" in f for f in shipped)
+
+    for filename in shipped:
+        name = filename[:-len(".json")]
+        if "_backup_floor" in name:
+            character, floor = name.split("_backup_floor")
+            assert store.load_backup(character, int(floor)) == read_save(os.path.join(folder, filename))
+        else:
+            data = read_save(os.path.join(folder, filename))
+            assert store.load(name) == data
+            assert store.summary(name)["level"] == data["player"]["level"]
+
+    for ext in (".json", binary_extension):
+        out = str(tmp_path / ("out" + ext))
+        assert store.export_directory(out, ext) == (characters, backups)
+        for filename in shipped:
+            exported = os.path.join(out, filename[:-len(".json")] + ext)
+            assert read_save(exported) == read_save(os.path.join(folder, filename))
+    store.close()
+
+
+def test_newer_file_wins_when_both_formats_exist(tmp_path):
+    folder = str(tmp_path / "saves")
+    copy_saves(folder)
+    name = next(f for f in shipped if "_backup" not in f)[:-len(".json")]
+    json_path = os.path.join(folder, name + ".json")
+    binary_path = os.path.join(folder, name + binary_extension)
+    data = read_save(json_path)
+    data["player"]["coins"] = data["player"].get("coins", 0) + 1000
+    write_snapshot(binary_path, data)
+
+    store = SqliteSaveStore(str(tmp_path / "eyum.db"))
+    for newer, older in ((binary_path, json_path), (json_path, binary_path)):
+        stamp = os.path.getmtime(older)
+        os.utime(newer, (stamp + 10, stamp + 10))
+        conflicts = []
+        store.import_directory(folder, conflicts)
+        assert conflicts == [(os.path.basename(newer), os.path.basename(older))]
+        assert store.load(name) == read_save(newer)
+    store.close()
+
+
+def test_save_many_is_one_transaction(tmp_path):
+    store = SqliteSaveStore(str(tmp_path / "eyum.db"))
+    name = next(f for f in shipped if "_backup" not in f)[:-len(".json")]
+    data = read_save(os.path.join(save_directory, name + ".json"))
+    store.save_many({name: data})
+    broken = {"player": {"inventory": [{"name": "Not JSON", "bonus": object()}]}, "persistent_stats": {}}
+    with pytest.raises(TypeError):
+        store.save_many({name: {"player": dict(data["player"], level=99), "persistent_stats": {}}, "Broken": broken})
+    assert store.load(name) == data
+    assert not store.exists("Broken")
+    store.close()